@@ -0,0 +1,149 @@
+"use strict";
+/**
+ * Times the rendering pipeline of the log viewer on a log file in Node.js, without a browser:
+ * splitting the log text into lines, tokenizing them for highlighting (as the highlighter worker does
+ * in chunks of HIGHLIGHT_CHUNK_SIZE lines), holding them in memory and rendering them to HTML.
+ * script.js and highlighter.js are loaded as they are, with the elements of the page replaced by stubs.
+ * Prints the results as JSON.
+ *
+ * Usage: node demo/benchmark.js <logfile> [max bytes] [runs]
+ */
+
+const fs = require("fs");
+const path = require("path");
+const vm = require("vm");
+
+const STATIC_DIR = path.join(__dirname, "..", "django_log_lens", "static", "django_log_lens");
+const DEFAULT_MAX_BYTES = 64 * 1024 * 1024;
+const DEFAULT_RUNS = 5;
+const VIEWPORT_HEIGHT = 800;
+const VIEWPORT_SAMPLES = 100;
+
+class StubElement {
+  constructor() {
+    this.style = {};
+    this.attributes = {};
+    this.innerHTML = "";
+    this.innerText = "";
+    this.value = "";
+    this.clientHeight = VIEWPORT_HEIGHT;
+    this.offsetHeight = 0;
+    this.offsetTop = 0;
+    this.scrollHeight = 0;
+    this.scrollTop = 0;
+  }
+
+  addEventListener() {}
+
+  getAttribute(name) {
+    return this.attributes[name] ?? null;
+  }
+
+  setAttribute(name, value) {
+    this.attributes[name] = String(value);
+  }
+
+  scrollTo(x, y) {
+    this.scrollTop = y;
+  }
+}
+
+/**
+ * Loads script.js and highlighter.js into a sandbox with stubs for the page, timers and the network.
+ * @returns {vm.Context}
+ */
+function loadViewer() {
+  const elements = {};
+  const context = vm.createContext({
+    atob,
+    btoa,
+    console: { ...console, debug() {}, assert() {} },
+    document: { getElementById: (id) => (elements[id] ??= new StubElement()) },
+    fetch: () => new Promise(() => {}),
+    window: { location: { hash: "" }, addEventListener() {} },
+    requestAnimationFrame() {},
+    setTimeout() {},
+    clearTimeout() {},
+    setInterval() {},
+  });
+  for (let name of ["highlighter.js", "script.js"]) {
+    vm.runInContext(fs.readFileSync(path.join(STATIC_DIR, name), "utf-8"), context, { filename: name });
+  }
+  return context;
+}
+
+/**
+ * Returns the given percentile of the sorted timings (nearest rank).
+ * @param {number[]} sorted
+ * @param {number} percentile
+ * @returns {number}
+ */
+function getPercentile(sorted, percentile) {
+  return sorted[Math.max(0, Math.ceil((percentile / 100) * sorted.length) - 1)];
+}
+
+/**
+ * Runs fn the given number of times and returns the p50 and p99 of its duration in milliseconds.
+ * @param {number} runs
+ * @param {Function} fn
+ * @returns {{p50_ms: number, p99_ms: number}}
+ */
+function time(runs, fn) {
+  const timings = [];
+  for (let run = 0; run < runs; run++) {
+    const start = process.hrtime.bigint();
+    fn();
+    timings.push(Number(process.hrtime.bigint() - start) / 1e6);
+  }
+  timings.sort((a, b) => a - b);
+  return { p50_ms: getPercentile(timings, 50), p99_ms: getPercentile(timings, 99) };
+}
+
+function main() {
+  const [filename, maxBytes = DEFAULT_MAX_BYTES, runArg = DEFAULT_RUNS] = process.argv.slice(2);
+  const runs = Number(runArg);
+  if (!filename) {
+    console.error("Usage: node demo/benchmark.js <logfile> [max bytes] [runs]");
+    process.exit(2);
+  }
+  const buffer = Buffer.alloc(Math.min(Number(maxBytes), fs.statSync(filename).size));
+  const fd = fs.openSync(filename, "r");
+  fs.readSync(fd, buffer, 0, buffer.length, 0);
+  fs.closeSync(fd);
+  const logText = buffer.toString("utf-8");
+  const viewer = loadViewer();
+  const { state, splitLogText, setLogLines, tokenizeLines, renderLogLine, renderViewport, HIGHLIGHT_CHUNK_SIZE } =
+    vm.runInContext(
+      "({ state, splitLogText, setLogLines, tokenizeLines, renderLogLine, renderViewport, HIGHLIGHT_CHUNK_SIZE })",
+      viewer
+    );
+  const lines = splitLogText(logText);
+  const divLogContent = viewer.document.getElementById("div-log-content");
+  const results = {
+    bytes: buffer.length,
+    lines: lines.length,
+    runs,
+    split: time(runs, () => splitLogText(logText)),
+    tokenize: time(runs, () => {
+      for (let i = 0; i < lines.length; i += HIGHLIGHT_CHUNK_SIZE) {
+        tokenizeLines(lines.slice(i, i + HIGHLIGHT_CHUNK_SIZE));
+      }
+    }),
+    set_lines: time(runs, () => setLogLines(lines)),
+    render_all: time(runs, () => {
+      for (let i = 0; i < lines.length; i++) {
+        renderLogLine(i);
+      }
+    }),
+  };
+  state.lineHeight = 16;
+  results.viewport = time(VIEWPORT_SAMPLES, () => {
+    divLogContent.scrollTop = Math.floor(Math.random() * lines.length) * state.lineHeight;
+    renderViewport();
+  });
+  results.heap_used_bytes = process.memoryUsage().heapUsed;
+  results.peak_rss_bytes = process.resourceUsage().maxRSS * 1024;
+  console.log(JSON.stringify(results));
+}
+
+main();
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+"""
+Benchmarks the Log Lens views on synthetic log files in LOG_FORMAT with mixed levels, tracebacks and long lines.
+
+Each view is requested with a superuser, without the middleware, in a fresh process so that the first
+(cold) request builds the indexes and the peak RSS can be told apart per view.
+The frontend pipeline is timed with Node.js, see benchmark.js. Results are written as JSON.
+
+Example:
+    python demo/benchmark.py --sizes 1MB 100MB 1GB --runs 10 --output bench.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+DEMO_DIR = Path(__file__).resolve().parent
+HANDLER_NAME = "benchmark"
+MIB = 1024 * 1024
+SIZE_UNITS = {"KB": 1024, "MB": MIB, "GB": 1024 * MIB}
+
+MESSAGES = [
+    "GET /api/orders/{n} HTTP/1.1 200 {n} bytes",
+    "User 'user{n}' logged in from 10.0.{m}.{m}",
+    "Cache miss for key \"order:{n}\", fetching from database",
+    "Slow query took {n} ms: SELECT * FROM orders WHERE id = {m}",
+    "Request timeout after {n} ms calling https://payments.example.com/charge (attempt {m})",
+    "Task {n} finished in {m} ms",
+]
+TRACEBACK = """Traceback (most recent call last):
+  File "/srv/app/orders/views.py", line {n}, in get_order
+    order = Order.objects.get(pk=pk)
+  File "/srv/app/.venv/lib/python3.12/site-packages/django/db/models/query.py", line 649, in get
+    raise self.model.DoesNotExist(
+orders.models.Order.DoesNotExist: Order matching query does not exist."""
+LEVELS = [logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR, logging.CRITICAL]
+LEVEL_WEIGHTS = [30, 50, 12, 6, 2]
+
+
+def parse_size(size: str) -> int:
+    unit = size[-2:].upper()
+    if unit in SIZE_UNITS:
+        return int(float(size[:-2]) * SIZE_UNITS[unit])
+    return int(size)
+
+
+def generate_logfile(path: Path, size: int, seed: int = 0) -> None:
+    """
+    Writes a log file of at least the given size in LOG_FORMAT. Records have increasing timestamps,
+    about every 30th record is followed by a traceback and about every 1000th message is 16 KB long.
+    """
+    rng = random.Random(seed)
+    timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < size:
+            records = []
+            for level in rng.choices(LEVELS, LEVEL_WEIGHTS, k=10000):
+                timestamp += timedelta(milliseconds=rng.randint(0, 200))
+                n, m = rng.randint(1, 99999), rng.randint(1, 255)
+                message = rng.choice(MESSAGES).format(n=n, m=m)
+                if rng.random() < 0.001:
+                    message += " " + "x" * 16384
+                records.append(f"[LVL:{level}]{timestamp:%Y-%m-%d %H:%M:%S},{timestamp.microsecond // 1000:03d} "
+                               f"{logging.getLevelName(level)}: {message}\n")
+                if level >= logging.ERROR and rng.random() < 0.2:
+                    records.append(TRACEBACK.format(n=n % 500) + "\n")
+            chunk = "".join(records)
+            f.write(chunk)
+            written += len(chunk.encode())
+
+
+def get_logfile(data_dir: Path, size: int) -> Path:
+    path = data_dir / f"synthetic-{size}.log"
+    if not path.exists() or path.stat().st_size < size:
+        print(f"Generating {path} ...", file=sys.stderr)
+        generate_logfile(path, size)
+    return path
+
+
+def get_endpoints(size: int) -> dict[str, tuple[str, dict]]:
+    """
+    Returns the benchmarked requests: name -> (view, GET parameters).
+    """
+    return {
+        "file": ("request_logfile", {}),
+        "file-text": ("request_logfile", {"format": "text"}),
+        "download": ("download_logfile", {}),
+        "timestamp": ("request_logfile_timestamp", {}),
+        "tail": ("request_logfile_tail", {"offset": str(max(0, size - MIB))}),
+        "lines": ("request_logfile_lines", {}),
+        "lines-records": ("request_logfile_lines", {"start": str(1), "records": "true"}),
+        "summary": ("request_logfile_summary", {}),
+        "templates": ("request_logfile_templates", {}),
+        "query": ("request_logfile_query", {"level": "ERROR", "pattern": "timeout"}),
+        "query-records": ("request_logfile_query", {"level": "ERROR", "pattern": "DoesNotExist", "records": "true"}),
+        "search": ("search_logfiles_view", {"pattern": "timeout", "rotated": "false"}),
+    }
+
+
+def setup_django(logfile: Path) -> None:
+    sys.path.insert(0, str(DEMO_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'demo.settings')
+    import django
+    django.setup()
+    from django_log_lens import registry
+    handler = logging.FileHandler(logfile, delay=True)
+    handler.set_name(HANDLER_NAME)
+    logging.getLogger(HANDLER_NAME).addHandler(handler)
+    registry.invalidate()
+
+
+def percentile(timings: list[float], p: float) -> float:
+    ordered = sorted(timings)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def request(view_name: str, params: dict, interface: str) -> int:
+    """
+    Requests the view and consumes the response, returns the number of bytes of the response body.
+    """
+    from asgiref.sync import async_to_sync
+    from django.contrib.auth.models import User
+    from django.test import AsyncRequestFactory, RequestFactory
+
+    from django_log_lens import views
+
+    view = getattr(views, view_name)
+    params = {"handler_name": HANDLER_NAME, **params}
+    user = User(username="benchmark", is_superuser=True)
+
+    async def request_async() -> int:
+        http_request = AsyncRequestFactory().get("/", params)
+        http_request.user = user
+        response = await view(http_request)
+        size = 0
+        if response.streaming and response.is_async:
+            async for chunk in response.streaming_content:
+                size += len(chunk)
+        elif response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        response.close()
+        return size
+
+    if interface == "asgi":
+        return asyncio.run(request_async())
+    http_request = RequestFactory().get("/", params)
+    http_request.user = user
+    response = async_to_sync(view)(http_request) if inspect.iscoroutinefunction(view) else view(http_request)
+    size = sum(len(chunk) for chunk in response) if response.streaming else len(response.content)
+    response.close()
+    return size
+
+
+def get_peak_rss() -> int | None:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024  # bytes on macOS, kilobytes on Linux
+
+
+def benchmark_endpoint(logfile: str, name: str, view_name: str, params: dict, runs: int, interface: str) -> dict:
+    setup_django(Path(logfile))
+    baseline_rss = get_peak_rss()
+    start = time.perf_counter()
+    response_bytes = request(view_name, params, interface)
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        request(view_name, params, interface)
+        timings.append(time.perf_counter() - start)
+    size = os.path.getsize(logfile)
+    p50 = percentile(timings, 50)
+    return {"endpoint": name, "view": view_name, "params": params, "file_bytes": size, "runs": runs,
+            "response_bytes": response_bytes, "first_ms": first * 1000, "p50_ms": p50 * 1000,
+            "p99_ms": percentile(timings, 99) * 1000, "mean_ms": sum(timings) / len(timings) * 1000,
+            "file_mb_per_s": size / MIB / p50 if p50 else None,
+            "requests_per_s": len(timings) / sum(timings) if sum(timings) else None,
+            "baseline_rss_bytes": baseline_rss, "peak_rss_bytes": get_peak_rss()}
+
+
+def benchmark_frontend(logfile: Path, max_bytes: int, runs: int) -> dict | None:
+    node = shutil.which("node")
+    if node is None:
+        print("Node.js not found, skipping the frontend benchmark", file=sys.stderr)
+        return None
+    result = subprocess.run([node, str(DEMO_DIR / "benchmark.js"), str(logfile), str(max_bytes), str(runs)],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", default=["1MB", "100MB"], help="sizes of the synthetic log files")
+    parser.add_argument("--runs", type=int, default=10, help="requests per view after the first one")
+    parser.add_argument("--endpoints", nargs="+", help="benchmark only these endpoints")
+    parser.add_argument("--interface", choices=["wsgi", "asgi"], default="wsgi",
+                        help="request the views like a WSGI or an ASGI server does")
+    parser.add_argument("--data-dir", type=Path, default=Path(tempfile.gettempdir()) / "log-lens-benchmark",
+                        help="where the synthetic log files are kept between runs")
+    parser.add_argument("--frontend-bytes", type=parse_size, default=64 * MIB,
+                        help="bytes of each log file loaded into the frontend benchmark")
+    parser.add_argument("--no-frontend", action="store_true", help="skip the frontend benchmark")
+    parser.add_argument("--output", type=Path, help="write the results to this file instead of stdout")
+    args = parser.parse_args()
+
+    args.data_dir.mkdir(parents=True, exist_ok=True)
+    results, frontend = [], []
+    for size in map(parse_size, args.sizes):
+        logfile = get_logfile(args.data_dir, size)
+        for name, (view_name, params) in get_endpoints(logfile.stat().st_size).items():
+            if args.endpoints and name not in args.endpoints:
+                continue
+            # a fresh process per view so that neither the indexes nor the peak RSS are shared between views
+            with multiprocessing.Pool(1) as pool:
+                result = pool.apply(benchmark_endpoint,
+                                    (str(logfile), name, view_name, params, args.runs, args.interface))
+            print(f"{name:>15} {size / MIB:>9.1f} MB  p50 {result['p50_ms']:>10.1f} ms  "
+                  f"p99 {result['p99_ms']:>10.1f} ms  first {result['first_ms']:>10.1f} ms", file=sys.stderr)
+            results.append(result)
+        if not args.no_frontend:
+            frontend_result = benchmark_frontend(logfile, args.frontend_bytes, min(args.runs, 5))
+            if frontend_result is not None:
+                frontend.append({"file_bytes": size, **frontend_result})
+
+    import django
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "version": json.loads((DEMO_DIR.parent / "VERSION.json").read_text())["version"],
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "interface": args.interface,
+        "views": results,
+        "frontend": frontend,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,30 @@
+import asyncio
+import gzip
+import json
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
+from django_log_lens import (LOG_FORMAT, JsonLinesFormatter, add_handler,
+                             get_cache_stats, use_client_log_queue)
+from django_log_lens.cache import ResultCache, get_file_identity, result_cache
+from django_log_lens.clustering import get_template_miner
+from django_log_lens.compressed import (get_compressed_index,
+                                        read_compressed_appended)
+from django_log_lens.handlers import file_handlers, registry
+from django_log_lens.pipeline import QueuePipeline, QueueStats
+from django_log_lens.search import get_executor, search_path
+from django_log_lens.views import file_handlers as views_file_handlers
+from django_log_lens.watch import stream_events, subscribe, unsubscribe
+
 
 class TestLogLens(TestCase):
 
@@ -61,6 +80,37 @@ class TestLogLens(TestCase):
             self.assertTrue(handler in recognized_handlers, f"Handler {handler} should be recognized.")
         assert len(handler_names) == len(recognized_handlers), "All handlers should be recognized."
 
+    def test_handler_registry(self):
+        self.assertEqual(registry.get('client').rotation, "size", "Rotation policy should be resolved.")
+        self.assertEqual(registry.get('requests').rotation, "time", "Custom handlers should be resolved.")
+        self.assertEqual(registry.get('client').log_format, LOG_FORMAT, "Log format should be resolved.")
+        with self.assertRaises(KeyError):
+            registry.get('console')
+        registry.build()
+        with mock.patch.object(registry, 'build', wraps=registry.build) as build:
+            for _ in range(3):
+                with self.assertRaises(KeyError):
+                    registry.get('unknown')
+        self.assertEqual(build.call_count, 0, "Unknown names should not rebuild an up-to-date registry.")
+        self.assertIs(views_file_handlers, file_handlers, "file_handlers should still be importable from views.")
+
+        path = os.path.join(settings.LOG_FOLDER, "runtime.log")
+        handler = logging.FileHandler(path)
+        self.addCleanup(os.remove, path)
+        self.addCleanup(registry.invalidate)
+        self.addCleanup(handler.close)
+        logger = logging.getLogger("test.runtime")
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        info = registry.get("test.runtime:runtime.log")
+        self.assertEqual(info.path, path, "Handlers attached at runtime should be found.")
+        self.assertIsNone(info.rotation, "Plain file handlers should not rotate.")
+
+        registry.get_paths()
+        add_handler("logging.StreamHandler")
+        self.addCleanup(file_handlers.discard, "logging.StreamHandler")
+        self.assertIsNone(registry._handlers, "Adding a handler should invalidate the registry.")
+
     def test_logfile_timestamp_request(self):
         url = reverse('log-lens:request-logfile-timestamp')
         self.client.force_login(self.regular_user)
@@ -96,6 +146,820 @@ class TestLogLens(TestCase):
         self.assertTrue(log_message in content, "Log message should be in response.")
         self.assertTrue(severity in content, "Severity must be found in response.")
 
+    @override_settings(LOG_LENS_CLIENT_BATCH_ENTRIES=3, LOG_LENS_CLIENT_RATE_LIMIT=5)
+    def test_post_log_batch(self):
+        url = reverse("log-lens:post-log")
+        cache.clear()
+        batch = [{"log_message": f"Batched message {i}", "severity": "WARNING"} for i in range(3)]
+        response = self.client.post(url, batch, content_type='application/json')
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        content = self.read_log_file("client")
+        for entry in batch:
+            self.assertIn(entry['log_message'], content, "All entries of the batch should be logged.")
+
+        response = self.client.post(url, {"logs": json.dumps([{"log_message": "Beacon message", "severity": "INFO"}])})
+        self.assertEqual(response.status_code, 200, "Batches sent as form data should be accepted.")
+        self.assertIn("Beacon message", self.read_log_file("client"), "Beacon entry should be logged.")
+
+        response = self.client.post(url, batch + batch[:1], content_type='application/json')
+        self.assertEqual(response.status_code, 413, "Batches exceeding the entry limit should be rejected.")
+        response = self.client.post(url, [{"severity": "INFO"}], content_type='application/json')
+        self.assertEqual(response.status_code, 400, "Invalid entries should return 400.")
+        response = self.client.post(url, "not json", content_type='application/json')
+        self.assertEqual(response.status_code, 400, "Malformed batches should return 400.")
+
+        response = self.client.post(url, batch[:1], content_type='application/json')
+        self.assertEqual(response.status_code, 200, "Fifth entry should be within the rate limit.")
+        response = self.client.post(url, batch[:1], content_type='application/json')
+        self.assertEqual(response.status_code, 429, "Entries exceeding the rate limit should be rejected.")
+
+    def test_post_log_batch_size(self):
+        url = reverse("log-lens:post-log")
+        cache.clear()
+        logs = json.dumps([{"log_message": "Nachricht über Größe " * 10, "severity": "INFO"}], ensure_ascii=False)
+        size = len(logs.encode())
+        self.assertGreater(size, len(logs))
+        for limit, status_code in ((size - 1, 413), (size, 200)):
+            with override_settings(LOG_LENS_CLIENT_BATCH_BYTES=limit):
+                response = self.client.post(url, {"logs": logs})
+                self.assertEqual(response.status_code, status_code, "Form batches should be limited in bytes.")
+                response = self.client.post(url, logs.encode(), content_type='application/json')
+                self.assertEqual(response.status_code, status_code, "JSON batches should be limited in bytes.")
+
+    def test_metrics(self):
+        url = reverse('log-lens:metrics')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should redirect to login page.")
+        with override_settings(LOG_LENS_METRICS_TOKEN="secret"):
+            response = self.client.get(url, headers={"Authorization": "Bearer wrong"})
+            self.assertEqual(response.status_code, 302, "Wrong tokens should be rejected.")
+            response = self.client.get(url, headers={"Authorization": "Bearer secret"})
+            self.assertEqual(response.status_code, 200, "The metrics token should be accepted.")
+
+        self.client.force_login(self.superuser)
+        logging.getLogger("django_log_lens.client").error("Message to be measured")
+        response = self.client.get(reverse('log-lens:request-logfile-lines') + "?handler_name=client")
+        self.assertIn("total;dur=", response['Server-Timing'], "Responses should carry a Server-Timing header.")
+        self.assertIn("read;dur=", response['Server-Timing'], "Reading the file should be timed.")
+        self.client.post(reverse('log-lens:post-log'), [{"log_message": "Measured", "severity": "INFO"}],
+                         content_type='application/json')
+
+        response = self.client.get(url)
+        self.assertTrue(response['Content-Type'].startswith("text/plain"), "Metrics should be in Prometheus format.")
+        content = response.content.decode()
+        self.assertIn('log_lens_requests_total{view="request_logfile_lines",status="200"}', content)
+        self.assertIn('log_lens_request_duration_seconds_bucket{view="request_logfile_lines",le="+Inf"}', content)
+        self.assertIn('log_lens_served_bytes_total{view="request_logfile_lines"}', content)
+        self.assertIn('log_lens_cache_requests_total{cache="lines",result=', content)
+        self.assertIn('log_lens_client_log_batches_total{result="accepted"}', content)
+
+        with override_settings(LOG_LENS_PROFILE_SLOW_REQUESTS=0):
+            with self.assertLogs("django_log_lens.profile", logging.WARNING) as logs:
+                self.client.get(reverse('log-lens:request-logfile') + "?handler_name=client")
+        self.assertIn("Slow request to request_logfile", logs.output[0], "Slow requests should be logged.")
+
+    def test_client_log_queue(self):
+        logger = logging.getLogger("log_lens.queue_test")
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+
+        pipeline = QueuePipeline("log_lens.queue_test", max_size=2)
+        pipeline.install()
+        self.assertEqual(logger.handlers, [pipeline.handler], "Handlers should be replaced by the queue.")
+        pipeline.listener.stop()  # pause draining the queue to fill it up
+        for i in range(3):
+            logger.warning(f"Queued message {i}")
+        self.assertEqual(pipeline.stats(), QueueStats(queued=2, dropped=1, pending=2),
+                         "Records exceeding the queue size should be dropped.")
+        pipeline.listener.start()
+        pipeline.uninstall()
+        self.assertEqual([record.getMessage() for record in records], ["Queued message 0", "Queued message 1"],
+                         "Queued records should be handled before uninstalling.")
+        self.assertIn(handler, logger.handlers, "Original handlers should be restored.")
+
+        with self.assertRaises(ValueError):
+            use_client_log_queue(policy="ignore")
+
+    def test_conditional_logfile_requests(self):
+        self.client.force_login(self.superuser)
+        logging.getLogger("django_log_lens.client").info("Message before the first request")
+        for url in [reverse('log-lens:request-logfile'), reverse('log-lens:request-logfile-timestamp'),
+                    reverse('log-lens:download-logfile')]:
+            url += "?handler_name=client"
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+            etag, last_modified = response['ETag'], response['Last-Modified']
+            self.assertIn("no-cache", response['Cache-Control'], "Clients should revalidate the response.")
+
+            response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 304, "Unchanged file should return 304 Not Modified.")
+            response = self.client.get(url, headers={"If-Modified-Since": last_modified})
+            self.assertEqual(response.status_code, 304, "Unmodified file should return 304 Not Modified.")
+
+            logging.getLogger("django_log_lens.client").info("Message after the first request")
+            response = self.client.get(url, headers={"If-None-Match": etag})
+            self.assertEqual(response.status_code, 200, "Changed file should be returned.")
+            self.assertNotEqual(response['ETag'], etag, "ETag should change with the file.")
+
+    def test_logfile_text_format(self):
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        logger = logging.getLogger("django_log_lens.client")
+        for i in range(200):
+            logger.info(f"A \"quoted\" message number {i}")
+        url = reverse('log-lens:request-logfile') + "?handler_name=client&format=text"
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        self.assertTrue(response['Content-Type'].startswith("text/plain"), "Text should not be wrapped in JSON.")
+        text = b"".join(response.streaming_content).decode()
+        self.assertEqual(text, self.read_log_file("client"), "The log file should be returned as is.")
+        cursor = json.loads(response['X-Log-Lens-Cursor'])
+        self.assertEqual(cursor['offset'], len(text.encode()), "Cursor should be passed in a header.")
+        self.assertIn('X-Log-Lens-Timestamp', response)
+
+        response = self.client.get(url + "&max_lines=10")
+        self.assertEqual(json.loads(response['X-Log-Lens-Too-Large']), True, "Metadata should be passed in headers.")
+
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response['Content-Encoding'], "gzip", "Text should be compressed if accepted.")
+        self.assertIn("Accept-Encoding", response['Vary'])
+        self.assertTrue(response['ETag'].startswith('W/'), "ETag of a compressed response should be weak.")
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)).decode(), text)
+
+        response = self.client.get(reverse('log-lens:request-logfile-lines') + "?handler_name=client",
+                                   headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(json.loads(gzip.decompress(response.content))['total'], 200, "JSON should be compressed.")
+        response = self.client.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+        self.assertFalse(response.has_header('Content-Encoding'), "Refused encodings should not be used.")
+
+    def test_logfile_tail_request(self):
+        url = reverse('log-lens:request-logfile-tail')
+        self.client.force_login(self.regular_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject non-superusers.")
+
+        self.client.force_login(self.superuser)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 400, "Missing handler_name should return 400.")
+        response = self.client.get(url + "?handler_name=client&offset=abc")
+        self.assertEqual(response.status_code, 400, "Invalid offset should return 400.")
+
+        logger = logging.getLogger("django_log_lens.client")
+        logger.error("Message before fetching the file")
+        response = self.client.get(reverse('log-lens:request-logfile') + "?handler_name=client")
+        cursor = response.json()['cursor']
+        self.assertEqual(cursor['offset'], cursor['size'], "Cursor should point to the end of the file.")
+
+        logger.error("Message after fetching the file")
+        response = self.client.get(url + f"?handler_name=client&offset={cursor['offset']}&inode={cursor['inode']}")
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        dict_response = response.json()
+        self.assertFalse(dict_response['resync'], "Appending lines should not require a resync.")
+        self.assertIn("Message after fetching the file", dict_response['text'], "New line should be returned.")
+        self.assertNotIn("Message before fetching the file", dict_response['text'], "Old line should be omitted.")
+        self.assertTrue(dict_response['text'].endswith("\n"), "Only complete lines should be returned.")
+
+        cursor = dict_response['cursor']
+        response = self.client.get(url + f"?handler_name=client&offset={cursor['offset']}&inode={cursor['inode']}")
+        self.assertEqual(response.json()['text'], "", "No new lines should be returned.")
+
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        response = self.client.get(url + f"?handler_name=client&offset={cursor['offset']}&inode={cursor['inode']}")
+        self.assertTrue(response.json()['resync'], "Truncated file should require a resync.")
+
+        filename = settings.LOGGING['handlers']['client']['filename']
+        with open(filename, 'ab') as f:
+            f.write(b"X" * 5 + b"\n" + b"Y" * cursor['offset'] + b"\n")
+        response = self.client.get(url + f"?handler_name=client&offset={cursor['offset']}&inode={cursor['inode']}")
+        self.assertTrue(response.json()['resync'], "File rewritten past the cursor should require a resync.")
+
+        response = self.client.get(url + f"?handler_name=client&offset=0&inode={cursor['inode'] + 1}")
+        self.assertTrue(response.json()['resync'], "Rotated file should require a resync.")
+
+    def test_stream_logfile_wsgi(self):
+        url = reverse('log-lens:stream-logfile')
+        response = self.client.get(url + "?handler_name=client")
+        self.assertEqual(response.status_code, 302, "View should reject anonymous users.")
+
+        self.client.force_login(self.superuser)
+        response = self.client.get(url + "?handler_name=client")
+        self.assertEqual(response.status_code, 204, "Streaming should be refused under WSGI.")
+
+    async def test_stream_logfile(self):
+        url = reverse('log-lens:stream-logfile')
+        await sync_to_async(self.async_client.force_login)(self.superuser)
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 400, "Missing handler_name should return 400.")
+        response = await self.async_client.get(url + "?handler_name=client&offset=abc")
+        self.assertEqual(response.status_code, 400, "Invalid offset should return 400.")
+
+        logger = logging.getLogger("django_log_lens.client")
+        size = await sync_to_async(os.path.getsize)(settings.LOGGING['handlers']['client']['filename'])
+        logger.error("Message streamed to the client")
+        response = await self.async_client.get(url + f"?handler_name=client&offset={size}")
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        self.assertEqual(response['Content-Type'], "text/event-stream")
+        events = response.streaming_content
+        try:
+            event = (await anext(events)).decode()
+        finally:
+            await events.aclose()
+        self.assertIn("event: append", event, "Appended lines should be pushed.")
+        self.assertIn("Message streamed to the client", event, "Event should contain the new line.")
+
+    @override_settings(LOG_LENS_WATCH_INTERVAL=0.05)
+    async def test_watch_logfile(self):
+        path = self.create_backup_file('client', '.watched', "line1\npartial")
+        events = stream_events(path, 6, os.stat(path).st_ino)
+        event = asyncio.ensure_future(anext(events))
+        try:
+            await asyncio.sleep(0.2)
+            with open(path, 'ab') as f:
+                f.write(b" done\nline3\n")
+            event = (await asyncio.wait_for(event, 5)).decode()
+        finally:
+            await events.aclose()
+        self.assertIn("event: append", event, "Completing a partial line should not require a resync.")
+        self.assertIn("partial done\\nline3\\n", event, "Event should contain the completed lines.")
+
+        watcher, queue = subscribe(path)
+        try:
+            with (mock.patch('django_log_lens.watch.read_appended', side_effect=PermissionError),
+                  self.assertLogs('django_log_lens.watch', 'ERROR')):
+                await asyncio.sleep(0.1)
+                with open(path, 'ab') as f:
+                    f.write(b"line4\n")
+                tail = await asyncio.wait_for(queue.get(), 5)
+            self.assertTrue(tail.resync, "Subscribers should be resynced if the watcher fails.")
+            await asyncio.wait_for(asyncio.shield(watcher.task), 5)
+            other_watcher, other_queue = subscribe(path)
+            self.assertIsNot(other_watcher, watcher, "A failed watcher should not be reused.")
+            unsubscribe(other_watcher, other_queue)
+        finally:
+            unsubscribe(watcher, queue)
+
+    async def test_async_views(self):
+        url = reverse('log-lens:request-logfile') + "?handler_name=client&format=text"
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject anonymous users.")
+
+        await sync_to_async(self.async_client.force_login)(self.superuser)
+        logging.getLogger("django_log_lens.client").error("Message read asynchronously")
+        response = await self.async_client.get(url)
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        self.assertTrue(response.is_async, "Text should be streamed without blocking the event loop.")
+        text = b"".join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(text, await sync_to_async(self.read_log_file)("client"), "The log file should be returned.")
+
+        response = await self.async_client.get(reverse('log-lens:download-logfile') + "?handler_name=client")
+        self.assertTrue(response.is_async, "Download should be streamed without blocking the event loop.")
+        self.assertEqual(b"".join([chunk async for chunk in response.streaming_content]).decode(), text)
+
+        response = await self.async_client.get(reverse('log-lens:request-logfile-lines') + "?handler_name=client")
+        self.assertIn("Message read asynchronously", response.json()['text'], "Lines should be returned.")
+
+    def test_logfile_lines_request(self):
+        url = reverse('log-lens:request-logfile-lines')
+        self.client.force_login(self.regular_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject non-superusers.")
+
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        logger = logging.getLogger("django_log_lens.client")
+        for i in range(1, 31):
+            logger.info(f"Line number {i}")
+
+        response = self.client.get(url + "?handler_name=client&start=10&end=12")
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        dict_response = response.json()
+        self.assertEqual((dict_response['start'], dict_response['end'], dict_response['total']), (10, 12, 30))
+        lines = dict_response['text'].splitlines()
+        self.assertEqual(len(lines), 3, "Three lines should be returned.")
+        self.assertTrue(lines[0].endswith("Line number 10"), "First line of the window should be line 10.")
+        self.assertTrue(lines[-1].endswith("Line number 12"), "Last line of the window should be line 12.")
+
+        logger.info("Line number 31")
+        response = self.client.get(url + "?handler_name=client")
+        dict_response = response.json()
+        self.assertEqual(dict_response['total'], 31, "Index should be extended as the file grows.")
+        self.assertTrue(dict_response['text'].splitlines()[-1].endswith("Line number 31"))
+
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        logger.info("First line after clearing")
+        dict_response = self.client.get(url + "?handler_name=client&start=1").json()
+        self.assertEqual(dict_response['total'], 1, "Index should be rebuilt after truncation.")
+
+        try:
+            raise ValueError("Something went wrong")
+        except ValueError:
+            logger.exception("Request failed")
+        logger.info("Last line")
+        dict_response = self.client.get(url + "?handler_name=client").json()
+        traceback_end = dict_response['total'] - 1
+        dict_response = self.client.get(url + f"?handler_name=client&start=3&end={traceback_end - 1}"
+                                        "&records=true").json()
+        self.assertEqual((dict_response['start'], dict_response['end']), (2, traceback_end),
+                         "Window should be widened to whole records.")
+
+        response = self.client.get(reverse('log-lens:request-logfile') + "?handler_name=client&max_lines=0")
+        self.assertTrue(response.json()['too_large'], "Files with more than max_lines lines should be refused.")
+
+        response = self.client.get(url + "?handler_name=client&start=x")
+        self.assertEqual(response.status_code, 400, "Invalid line numbers should return 400.")
+
+    def test_logfile_summary_request(self):
+        url = reverse('log-lens:request-logfile-summary')
+        self.client.force_login(self.regular_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject non-superusers.")
+
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        logger = logging.getLogger("django_log_lens.client")
+        logger.info("Everything is fine")
+        try:
+            raise ValueError("Something went wrong")
+        except ValueError:
+            logger.exception("Request failed")
+        logger.warning("Something is odd")
+
+        response = self.client.get(url + "?handler_name=client")
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        summary = response.json()
+        self.assertEqual(summary['counts'], {"20": 1, "30": 1, "40": 1}, "Traceback lines should not be counted.")
+        self.assertEqual((summary['errors'], summary['warnings']), (1, 1))
+        self.assertEqual(sum(counts.get("40", 0) for counts in summary['minutes'].values()), 1,
+                         "Records should be counted per minute.")
+        line, offset = summary['error_records'][0]
+        self.assertEqual(line, 2, "Line number of the error record should be returned.")
+        filename = settings.LOGGING['handlers']['client']['filename']
+        with open(filename, 'rb') as f:
+            f.seek(offset)
+            self.assertTrue(f.readline().rstrip().endswith(b"Request failed"), "Offset should point to the record.")
+
+        logger.critical("Service unavailable")
+        summary = self.client.get(url + "?handler_name=client&max_errors=1").json()
+        self.assertEqual(summary['errors'], 2, "Summary should be updated as the file grows.")
+        self.assertEqual(summary['error_records'][0][0], summary['line_count'], "Last error should be listed.")
+        self.assertTrue(summary['error_records_truncated'], "Error records should be truncated.")
+
+        etag = self.client.get(url + "?handler_name=client").headers['ETag']
+        response = self.client.get(url + "?handler_name=client", headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304, "Unchanged file should return 304 Not Modified.")
+
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        summary = self.client.get(url + "?handler_name=client").json()
+        self.assertEqual((summary['line_count'], summary['counts']), (0, {}), "Summary should be rebuilt.")
+
+        response = self.client.get(url + "?handler_name=client&max_errors=x")
+        self.assertEqual(response.status_code, 400, "Invalid max_errors should return 400.")
+
+    def test_logfile_templates_request(self):
+        url = reverse('log-lens:request-logfile-templates')
+        self.client.force_login(self.regular_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject non-superusers.")
+
+        self.client.force_login(self.superuser)
+        logger = logging.getLogger("django_log_lens.client")
+        for mmap_enabled in (True, False):
+            with override_settings(LOG_LENS_MMAP=mmap_enabled):
+                self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+                for order in range(3):
+                    logger.info("GET /api/orders/%d took %d ms", order, 10 * order + 5)
+                try:
+                    raise ValueError("Something went wrong")
+                except ValueError:
+                    logger.exception("Order 0x%08x failed", 3054)
+                logger.info("GET /api/users/alice took 7 ms")
+
+                response = self.client.get(url + "?handler_name=client")
+                self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+                result = response.json()
+                self.assertEqual((result['record_count'], result['template_count']), (5, 2),
+                                 "Messages differing in variables only should share a template.")
+                template = result['templates'][0]
+                self.assertEqual((template['template'], template['count']), ("INFO: GET <*> took <*> ms", 4),
+                                 "Most frequent template should be listed first.")
+                self.assertEqual([line for line, _ in template['samples']], [1, 2, 3],
+                                 "Line numbers of the first records should be returned.")
+                self.assertTrue(template['first_seen'] <= template['last_seen'], "Timestamps should be returned.")
+                error = result['templates'][1]
+                self.assertEqual((error['template'], error['level']), ("ERROR: Order <*> failed", logging.ERROR),
+                                 "Traceback lines should not be mined.")
+                line, offset = error['samples'][0]
+                self.assertEqual(line, 4, "Line number of the record should be returned.")
+                filename = settings.LOGGING['handlers']['client']['filename']
+                with open(filename, 'rb') as f:
+                    f.seek(offset)
+                    self.assertIn(b"ERROR: Order", f.readline(), "Offset should point to the record.")
+
+                logger.warning("Disk almost full")
+                result = self.client.get(url + "?handler_name=client&limit=1").json()
+                self.assertEqual((result['record_count'], result['template_count']), (6, 3),
+                                 "Templates should be updated as the file grows.")
+                self.assertEqual(len(result['templates']), 1, "Templates should be limited.")
+                self.assertTrue(result['templates_truncated'], "Templates should be truncated.")
+
+        with override_settings(LOG_LENS_MAX_TEMPLATES=1):
+            self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+            logger.info("First message")
+            for words in range(1, 10):
+                logger.info("Other message" + " with more words" * words)
+            result = self.client.get(url + "?handler_name=client").json()
+            self.assertEqual((result['template_count'], result['unclustered']), (1, 9),
+                             "Records beyond the maximum number of templates should not be mined.")
+            miner = get_template_miner(settings.LOGGING['handlers']['client']['filename'])
+            self.assertEqual(len(miner.groups), 1, "Records beyond the maximum should not add groups.")
+
+        response = self.client.get(url + "?handler_name=unknown")
+        self.assertEqual(response.json()['templates'], [], "Unknown handler should return no templates.")
+        response = self.client.get(url + "?handler_name=client&limit=x")
+        self.assertEqual(response.status_code, 400, "Invalid limit should return 400.")
+
+    def query_logfile(self, query):
+        """
+        Requests the query endpoint and returns the parsed JSON lines.
+        """
+        response = self.client.get(reverse('log-lens:request-logfile-query') + "?" + query)
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        return [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+    def test_mmap_scanning(self):
+        self.client.force_login(self.superuser)
+        self.create_backup_file('client', '.1', "preamble with needle\n"
+                                "[LVL:20]2000-01-01 10:00:00,000 INFO django.request: first needle\n"
+                                "Traceback (most recent call last):\n  needle in a traceback\n"
+                                "[LVL:40]2000-01-01 10:01:00,000 ERROR app.views: needle\n"
+                                "[LVL:40]2000-01-01 10:02:00,000 ERROR app.views: other\n"
+                                "needle without line break")
+        queries = ["pattern=needle", "pattern=^needle", "pattern=needle$", "pattern=NEEDLE&ignore_case=true",
+                   "pattern=needle&level=ERROR", "pattern=needle&since=2000-01-01T10:01", "pattern=%5CAneedle"]
+        for query in queries:
+            query = "handler_name=client&backup=client.log.1&" + query
+            mapped = self.query_logfile(query)
+            with override_settings(LOG_LENS_MMAP=False):
+                read = self.query_logfile(query)
+            self.assertEqual(mapped, read, f"Memory-mapped search should find the lines read line by line: {query}")
+        self.assertEqual([match['line'] for match in mapped[:-1]], [7], "Anchored patterns should be supported.")
+        self.assertEqual(len(self.query_logfile("handler_name=client&backup=client.log.1&pattern=needle")), 6)
+
+        url = reverse('log-lens:request-logfile-summary') + "?handler_name=client&backup=client.log.1"
+        summary = self.client.get(url).json()
+        self.assertEqual((summary['line_count'], summary['counts'], summary['error_records']),
+                         (6, {"20": 1, "40": 2}, [[5, 146], [6, 202]]), "Records should be found in the mapped file.")
+
+    def test_result_cache(self):
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        logger = logging.getLogger("django_log_lens.client")
+        logger.error("Cached needle")
+        query = "handler_name=client&pattern=needle"
+
+        first = self.query_logfile(query)
+        hits = get_cache_stats().hits
+        self.assertEqual(self.query_logfile(query), first, "Cached results should be returned.")
+        self.assertEqual(get_cache_stats().hits, hits + 1, "Repeated queries should be answered from the cache.")
+
+        logger.error("Appended needle")
+        self.assertEqual(self.query_logfile(query)[-1]['matches'], 2, "Results should be stale once the file grows.")
+        url = reverse('log-lens:request-logfile-lines') + "?handler_name=client&start=1"
+        self.client.get(url)
+        self.assertEqual(self.client.get(url).json()['total'], 2, "Windows of lines should be cached.")
+        self.assertEqual(get_cache_stats().hits, hits + 2)
+
+        filename = settings.LOGGING['handlers']['client']['filename']
+        self.assertIn(filename, result_cache.keys_by_file, "Results of the file should be cached.")
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        self.assertEqual(self.query_logfile(query)[-1]['matches'], 0, "Results should be dropped once cleared.")
+
+        identity = get_file_identity(filename)
+        with override_settings(LOG_LENS_CACHE_BYTES=800):
+            lru = ResultCache("test")
+            for key in "abcdefgh":
+                lru.put((identity,), key, key.encode(), 100)
+            lru.get((identity,), "a")
+            lru.put((identity,), "i", b"i", 100)
+            self.assertEqual(lru.get((identity,), "b"), None, "The least recently used entry should be evicted.")
+            self.assertEqual(lru.get((identity,), "a"), b"a")
+            self.assertEqual(lru.stats().evictions, 1)
+            lru.put((identity,), "j", b"j" * 101, 101)
+            self.assertEqual(lru.get((identity,), "j"), None, "Entries above an eighth of the cache are skipped.")
+            lru.put((identity[:2] + (1, 1),), "e", b"e", 1)
+            self.assertEqual(lru.stats().entries, 1, "Results for previous identities of a file should be dropped.")
+
+        with override_settings(LOG_LENS_CACHE='default'):
+            ResultCache("worker-1").put((identity,), "shared", b"shared", 6)
+            self.assertEqual(ResultCache("worker-2").get((identity,), "shared"), b"shared",
+                             "Results should be shared through the Django cache.")
+        self.assertIn('log_lens_cache_evictions_total{cache="test"} 1',
+                      self.client.get(reverse('log-lens:metrics')).content.decode())
+
+    def test_logfile_query_request(self):
+        url = reverse('log-lens:request-logfile-query')
+        self.client.force_login(self.regular_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject non-superusers.")
+
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        logger = logging.getLogger("django_log_lens.client")
+        logger.info("Everything is fine")
+        try:
+            raise ValueError("Something went wrong")
+        except ValueError:
+            logger.exception("Request failed")
+        logger.warning("Something is odd")
+
+        results = self.query_logfile("handler_name=client&level=ERROR")
+        matches, summary = results[:-1], results[-1]
+        self.assertTrue(matches[0]['text'].endswith("Request failed"), "Error record should match.")
+        self.assertEqual(matches[0]['line'], 2, "Original line number should be returned.")
+        self.assertTrue(any("Something went wrong" in match['text'] for match in matches),
+                        "Traceback lines should inherit the level of their record.")
+        self.assertFalse(any("Something is odd" in match['text'] for match in matches),
+                         "Warnings should not match.")
+        self.assertEqual(summary, {"matches": len(matches), "truncated": False})
+
+        results = self.query_logfile("handler_name=client&level=ERROR&pattern=went wrong&records=true")
+        self.assertEqual(len(results), 2, "The traceback should be returned as a single record.")
+        record = results[0]
+        self.assertEqual((record['line'], record['level']), (2, 40), "Record should start at its header line.")
+        self.assertEqual(record['line_count'], len(matches), "Record should contain the whole traceback.")
+        self.assertTrue(record['text'].splitlines()[0].endswith("Request failed"))
+        filename = settings.LOGGING['handlers']['client']['filename']
+        with open(filename, 'rb') as f:
+            f.seek(record['offset'])
+            self.assertEqual(f.read(record['length']).decode().rstrip("\n"), record['text'],
+                             "Offset and length should span the record.")
+
+        results = self.query_logfile("handler_name=client&pattern=fine|odd&limit=1")
+        self.assertEqual(results[0]['line'], 1, "Pattern should match the first line.")
+        self.assertEqual(results[-1], {"matches": 1, "truncated": True}, "Results should be truncated.")
+
+        self.assertEqual(self.query_logfile("handler_name=client&since=2999-01-01T00:00")[-1]['matches'], 0,
+                         "No records should be found in the future.")
+        self.assertEqual(len(self.query_logfile("handler_name=client&since=2000-01-01T00:00&level=WARNING")),
+                         len(matches) + 2, "Time range should include all records.")
+
+        logging.getLogger("django.security").error("Suspicious operation")
+        logging.getLogger("django.template").error("Template error mentioning django.security")
+        results = self.query_logfile("handler_name=django&logger=django.security")
+        self.assertTrue(any("Suspicious operation" in match.get('text', '') for match in results))
+        self.assertFalse(any("Template error" in match.get('text', '') for match in results),
+                         "Logger name should not be matched in the message.")
+        response = self.client.get(url + "?handler_name=client&logger=django_log_lens")
+        self.assertEqual(response.status_code, 400, "Log format without logger name should return 400.")
+
+        response = self.client.get(url + "?handler_name=client&pattern=(")
+        self.assertEqual(response.status_code, 400, "Invalid pattern should return 400.")
+        response = self.client.get(url + "?handler_name=client&level=LOUD")
+        self.assertEqual(response.status_code, 400, "Invalid level should return 400.")
+
+    def test_json_lines_logfile(self):
+        path = os.path.join(settings.LOG_FOLDER, "structured.log")
+        handler = logging.FileHandler(path)
+        handler.setFormatter(JsonLinesFormatter())
+        self.addCleanup(os.remove, path)
+        self.addCleanup(registry.invalidate)
+        self.addCleanup(handler.close)
+        logger = logging.getLogger("log_lens.structured")
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        self.addCleanup(logger.removeHandler, handler)
+        handler_name = "log_lens.structured:structured.log"
+        self.assertTrue(registry.get(handler_name).json_lines, "JSON-lines handlers should be recognized.")
+
+        logger.info("Everything is fine")
+        try:
+            raise ValueError("Something went wrong")
+        except ValueError:
+            logger.exception("Request failed")
+        logging.getLogger("log_lens.structured.db").warning("Slow query")
+        with open(path) as f:
+            self.assertEqual(len(f.readlines()), 3, "Every record should be written as a single line.")
+
+        self.client.force_login(self.superuser)
+        lines = self.client.get(reverse('log-lens:request-logfile') + f"?handler_name={handler_name}").json()['text']
+        lines = lines.splitlines()
+        self.assertTrue(lines[0].startswith("[LVL:20]") and lines[0].endswith("INFO: Everything is fine"),
+                        "JSON lines should be rendered like LOG_FORMAT records.")
+
+        results = self.query_logfile(f"handler_name={handler_name}&level=ERROR")
+        self.assertEqual([match['line'] for match in results[:-1]], [2], "Only the error should match.")
+        self.assertIn("ValueError: Something went wrong", results[0]['text'], "Traceback should be kept.")
+        results = self.query_logfile(f"handler_name={handler_name}&logger=log_lens.structured.db&since=2000-01-01")
+        self.assertEqual([match['line'] for match in results[:-1]], [3], "Logger and time range should match.")
+        results = self.query_logfile(f"handler_name={handler_name}&pattern=fine|query")
+        self.assertEqual([match['line'] for match in results[:-1]], [1, 3], "Pattern should match the messages.")
+
+        summary = self.client.get(reverse('log-lens:request-logfile-summary') + f"?handler_name={handler_name}").json()
+        self.assertEqual(summary['counts'], {"20": 1, "30": 1, "40": 1}, "Every JSON line should be a record.")
+        self.assertEqual(summary['error_records'][0][0], 2)
+
+        other_logger = logging.getLogger("x-log_lens.structured.db")
+        other_logger.addHandler(handler)
+        other_logger.propagate = False
+        self.addCleanup(other_logger.removeHandler, handler)
+        other_logger.warning("Slow query elsewhere")
+        results = self.query_logfile(f"handler_name={handler_name}&logger=log_lens.structured.db")
+        self.assertEqual([match['line'] for match in results[:-1]], [3], "Logger names should be matched exactly.")
+
+    def create_backup_file(self, handler_name, suffix, content):
+        """
+        Creates a rotated backup of the log file associated with the given handler name.
+        The backup is gzip compressed if the suffix ends with `.gz`.
+        """
+        path = settings.LOGGING['handlers'][handler_name]['filename'] + suffix
+        with (gzip.open(path, 'wb') if suffix.endswith('.gz') else open(path, 'wb')) as f:
+            f.write(content.encode('utf-8'))
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_logfile_seek_request(self):
+        url = reverse('log-lens:request-logfile-seek')
+        self.client.force_login(self.regular_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject non-superusers.")
+
+        self.client.force_login(self.superuser)
+        records = []
+        for minute in range(2000):
+            records.append(f"[LVL:20]2000-01-01 {minute // 60:02d}:{minute % 60:02d}:00,000 INFO: minute {minute}\n")
+            if minute % 7 == 0:
+                records.append("Traceback (most recent call last):\n  ValueError: in a traceback\n")
+        content = "".join(records)
+        self.create_backup_file('client', '.1', content)
+        self.create_backup_file('client', '.1.gz', content)
+
+        for backup in ("client.log.1", "client.log.1.gz"):
+            query = f"?handler_name=client&backup={backup}&before=2&after=4&lines=true"
+            with mock.patch('gzip.open', side_effect=AssertionError("Backups should be read via the checkpoints.")):
+                dict_response = self.client.get(url + query + "&timestamp=2000-01-01T14:32").json()
+            self.assertTrue(dict_response['found'], "Compressed backups should be binary searched.")
+            dict_response = self.client.get(url + query + "&timestamp=2000-01-01T14:32").json()
+            self.assertTrue(dict_response['found'], "Record should be found.")
+            self.assertEqual(dict_response['record_timestamp'], "2000-01-01 14:32:00.000000")
+            self.assertEqual(dict_response['offset'], content.index("[LVL:20]2000-01-01 14:32"),
+                             "Offset of the first record at the timestamp should be returned.")
+            self.assertEqual(content.splitlines()[dict_response['line'] - 1][8:24], "2000-01-01 14:32",
+                             "Line number of the record should be returned.")
+            lines = dict_response['text'].splitlines()
+            self.assertTrue(lines[0].endswith("minute 870"), "Window should start two records before.")
+            self.assertTrue(lines[-1].endswith("in a traceback"), "Window should end with the fourth record.")
+            self.assertEqual(dict_response['text'], content[dict_response['start']:dict_response['end']])
+
+            dict_response = self.client.get(url + query + "&timestamp=2000-01-01T14:31:30").json()
+            self.assertEqual(dict_response['record_timestamp'], "2000-01-01 14:32:00.000000",
+                             "First record after the timestamp should be found.")
+            dict_response = self.client.get(url + query + "&timestamp=1999-12-31T23:59").json()
+            self.assertEqual(dict_response['offset'], 0, "First record should be found for earlier timestamps.")
+            dict_response = self.client.get(url + query + "&timestamp=2000-01-02T00:00").json()
+            self.assertFalse(dict_response['found'], "No record should be found after the last one.")
+
+        response = self.client.get(url + "?handler_name=client&timestamp=14:32")
+        self.assertEqual(response.status_code, 400, "View should reject invalid timestamps.")
+        response = self.client.get(url + "?handler_name=client&timestamp=2000-01-01T14:32&before=-1")
+        self.assertEqual(response.status_code, 400, "View should reject invalid windows.")
+        response = self.client.get(url + "?handler_name=unknown&timestamp=2000-01-01T14:32")
+        self.assertFalse(response.json()['found'], "No record should be found for unknown handlers.")
+
+    def test_search_logfiles(self):
+        url = reverse('log-lens:search-logfiles')
+        self.client.force_login(self.regular_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302, "View should reject non-superusers.")
+
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        self.create_backup_file('client', '.2.gz', "[LVL:40]2000-01-01 10:00:00,000 ERROR: needle oldest\n")
+        self.create_backup_file('client', '.1', "[LVL:40]2000-01-02 10:00:00,000 ERROR: needle older\n"
+                                "[LVL:20]2000-01-02 11:00:00,000 INFO: needle ignored\n")
+        logging.getLogger("django_log_lens.client").error("needle newest")
+
+        response = self.client.get(url + "?pattern=needle&level=ERROR")
+        self.assertEqual(response.status_code, 200, "View should return 200 OK.")
+        dict_response = response.json()
+        texts = [match['text'] for match in dict_response['matches']]
+        self.assertEqual(len(texts), 3, "Matches of all files including backups should be found.")
+        for text, expected in zip(texts, ["needle oldest", "needle older", "needle newest"]):
+            self.assertTrue(text.endswith(expected), "Matches should be merged by timestamp.")
+        self.assertEqual(dict_response['matches'][0]['handler_name'], 'client')
+        self.assertFalse(dict_response['truncated'], "Results should not be truncated.")
+
+        dict_response = self.client.get(url + "?pattern=needle&level=ERROR&limit=2").json()
+        self.assertEqual(len(dict_response['matches']), 2, "Number of matches should be limited.")
+        self.assertTrue(dict_response['truncated'], "Results should be truncated.")
+
+        dict_response = self.client.get(url + "?pattern=needle&handler_name=client&rotated=false").json()
+        self.assertEqual(len(dict_response['matches']), 1, "Rotated files should be skipped on request.")
+
+        dict_response = self.client.get(url + "?pattern=needle&logger=django_log_lens").json()
+        self.assertNotIn(settings.LOGGING['handlers']['client']['filename'], dict_response['files'],
+                         "Log files without logger names should not be searched by logger.")
+
+    @override_settings(LOG_LENS_SEARCH_WORKERS=1)
+    def test_search_logfiles_stops_early(self):
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        self.create_backup_file('client', '.2', "".join(f"[LVL:40]2000-01-01 10:00:0{i},000 ERROR: needle {i}\n"
+                                                        for i in range(3)))
+        self.create_backup_file('client', '.1', "[LVL:40]2000-01-02 10:00:00,000 ERROR: needle later\n")
+        logging.getLogger("django_log_lens.client").error("needle newest")
+        result_cache.clear()
+        with mock.patch('django_log_lens.search.search_path', wraps=search_path) as searched:
+            dict_response = self.client.get(reverse('log-lens:search-logfiles') +
+                                            "?pattern=needle&handler_name=client&limit=2").json()
+        self.assertEqual([match['text'][-8:] for match in dict_response['matches']], ["needle 0", "needle 1"],
+                         "The oldest matches should be returned.")
+        self.assertTrue(dict_response['truncated'], "Results should be truncated.")
+        self.assertEqual(searched.call_count, 1, "Files with newer records only should not be searched.")
+
+    @override_settings(LOG_LENS_SEARCH_EXECUTOR='process', LOG_LENS_SEARCH_WORKERS=1)
+    def test_search_logfiles_in_processes(self):
+        self.client.force_login(self.superuser)
+        self.client.delete(reverse('log-lens:clear') + "?handler_name=client")
+        self.create_backup_file('client', '.1.gz', "[LVL:40]2000-01-01 10:00:00,000 ERROR: spawned needle\n")
+        logging.getLogger("django_log_lens.client").error("spawned needle")
+        # workers must not depend on the settings, which are not configured in a spawned process without the module
+        environ = {key: value for key, value in os.environ.items() if key != 'DJANGO_SETTINGS_MODULE'}
+        with mock.patch('django_log_lens.search._executor', None), mock.patch.dict(os.environ, environ, clear=True):
+            executor = get_executor()
+            self.addCleanup(executor.shutdown)
+            self.assertIsInstance(executor, ProcessPoolExecutor, "Files should be searched in worker processes.")
+            for mmap_enabled in (True, False):
+                with override_settings(LOG_LENS_MMAP=mmap_enabled):
+                    result_cache.clear()
+                    response = self.client.get(reverse('log-lens:search-logfiles') + "?pattern=spawned&level=ERROR")
+                    self.assertEqual(response.status_code, 200, "Spawned workers should not read the settings.")
+                    self.assertEqual(len(response.json()['matches']), 2, "Backups should be searched as well.")
+
+    @mock.patch('django_log_lens.compressed.CHUNK_SIZE', 1024)
+    @mock.patch('django_log_lens.compressed.CHECKPOINT_INTERVAL', 4096)
+    def test_compressed_backups(self):
+        self.client.force_login(self.superuser)
+        content = "".join(f"[LVL:{40 if i % 100 == 0 else 20}]2000-01-01 10:00:00,000 INFO: Line number {i}\n"
+                          for i in range(1, 2001))
+        path = self.create_backup_file('client', '.1.gz', content)
+        query = "?handler_name=client&backup=client.log.1.gz"
+
+        backups = self.client.get(reverse('log-lens:request-logfile-backups') + "?handler_name=client").json()
+        self.assertIn({"name": "client.log.1.gz", "size": os.path.getsize(path), "compressed": True},
+                      backups['backups'], "Compressed backups should be listed.")
+
+        index = get_compressed_index(path)
+        self.assertEqual(index.line_count, 2000, "All lines of the backup should be indexed.")
+        self.assertGreater(len(index.checkpoints), 1, "Checkpoints should be taken while decompressing.")
+
+        dict_response = self.client.get(reverse('log-lens:request-logfile-lines') + query + "&start=1500&end=1502")
+        lines = dict_response.json()['text'].splitlines()
+        self.assertEqual([line.rsplit(" ", 1)[1] for line in lines], ["1500", "1501", "1502"],
+                         "Windows of compressed backups should be readable.")
+
+        with index.open() as f:
+            for number in (1500, 10, 1999):
+                f.seek(content.index(f"Line number {number}\n") - 38)
+                self.assertTrue(f.readline().decode().endswith(f"Line number {number}\n"),
+                                "Backups should be readable at any offset, also backwards.")
+
+        first_line = content[:content.index("\n") + 1]
+        tail = read_compressed_appended(path, 0, max_bytes=10)
+        self.assertEqual(tail.data.decode(), first_line, "Lines longer than max_bytes should be returned whole.")
+        self.assertEqual(tail.cursor.offset, len(first_line), "The cursor should point to the start of a line.")
+
+        offset = content.index("Line number 1999\n") + len("Line number 1999\n")
+        dict_response = self.client.get(reverse('log-lens:request-logfile-tail') + query + f"&offset={offset}").json()
+        self.assertTrue(dict_response['text'].endswith("Line number 2000\n"), "Tail should start at the offset.")
+        self.assertFalse(dict_response['resync'])
+
+        response = self.client.get(reverse('log-lens:request-logfile') + query)
+        self.assertEqual(response.json()['text'], content, "Compressed backups should be decompressed.")
+        results = self.query_logfile("handler_name=client&backup=client.log.1.gz&level=ERROR")
+        self.assertEqual(results[-1]['matches'], 20, "Compressed backups should be searchable.")
+        summary = self.client.get(reverse('log-lens:request-logfile-summary') + query).json()
+        self.assertEqual(summary['errors'], 20, "Compressed backups should be summarized.")
+
+        response = self.client.get(reverse('log-lens:download-logfile') + query)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        with open(path, 'rb') as f:
+            self.assertEqual(b"".join(response.streaming_content), f.read(), "Backups should be passed through.")
+
+        response = self.client.get(reverse('log-lens:download-logfile') + query, headers={"Range": "bytes=10-19"})
+        self.assertEqual(response.status_code, 206, "Range of a backup should return 206 Partial Content.")
+        self.assertEqual(response['Content-Type'], 'application/gzip', "Ranges should keep the content type.")
+        with open(path, 'rb') as f:
+            f.seek(10)
+            self.assertEqual(b"".join(response.streaming_content), f.read(10), "Compressed bytes should be sent.")
+
+        response = self.client.get(reverse('log-lens:request-logfile-lines') + "?handler_name=client&backup=../x")
+        self.assertEqual(response.json()['total'], 0, "Unknown backups should not be read.")
+
     def read_log_file(self, handler_name):
         """
         Reads log data associated with the given handler name.
@@ -188,6 +1052,33 @@ class TestLogLens(TestCase):
         self.assertIn("No logs available", response.content.decode('utf-8'),
                       "Should return 'No logs available' message.")
 
+    def test_download_logfile_range(self):
+        url = reverse('log-lens:download-logfile') + "?handler_name=client"
+        logging.getLogger("django_log_lens.client").error("Message to be downloaded in parts")
+        self.client.force_login(self.superuser)
+        content = self.read_log_file('client').encode('utf-8')
+
+        response = self.client.get(url)
+        self.assertEqual(b"".join(response.streaming_content), content, "Download should contain the whole file.")
+        self.assertEqual(response['Accept-Ranges'], 'bytes', "Download should advertise range support.")
+
+        response = self.client.get(url, HTTP_RANGE="bytes=5-")
+        self.assertEqual(response.status_code, 206, "Range request should return 206 Partial Content.")
+        self.assertEqual(b"".join(response.streaming_content), content[5:], "Range should be respected.")
+        self.assertEqual(response['Content-Range'], f"bytes 5-{len(content) - 1}/{len(content)}")
+
+        response = self.client.get(url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(response.streaming_content), content[-4:], "Suffix range should be respected.")
+
+        response = self.client.get(url, HTTP_RANGE=f"bytes={len(content)}-")
+        self.assertEqual(response.status_code, 416, "Range beyond the end of the file should return 416.")
+
+        with self.settings(LOG_LENS_GZIP_DOWNLOADS=True):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+            self.assertEqual(response['Content-Encoding'], 'gzip', "Download should be gzip encoded.")
+            self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), content,
+                             "Decompressed download should contain the whole file.")
+
     def test_clear_logfile(self):
         url = reverse('log-lens:clear')
 
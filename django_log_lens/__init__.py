@@ -1,4 +1,11 @@
-from .views import file_handlers
+from .cache import get_cache_stats
+from .handlers import file_handlers, registry
+from .jsonlog import JsonLinesFormatter
+from .pipeline import (CLIENT_LOGGER_NAME, DEFAULT_BLOCK_TIMEOUT,
+                       DEFAULT_QUEUE_SIZE, get_queue_stats, use_queue)
+
+__all__ = ["LEVEL_PREFIX", "LOG_FORMAT", "JsonLinesFormatter", "add_handler", "get_cache_stats",
+           "get_queue_stats", "use_client_log_queue"]
 
 LEVEL_PREFIX = "[LVL:%(levelno)d]"
 LOG_FORMAT = LEVEL_PREFIX + "%(asctime)s %(levelname)s: %(message)s"
@@ -16,3 +23,19 @@ def add_handler(handler_fqcn: str) -> None:
     >>> add_handler("myapp.handlers.MyFileHandler")
     """
     file_handlers.add(handler_fqcn)
+    registry.invalidate()
+
+
+def use_client_log_queue(max_size: int = DEFAULT_QUEUE_SIZE, policy: str = "drop",
+                         timeout: float = DEFAULT_BLOCK_TIMEOUT) -> None:
+    """
+    Routes the client logs through a bounded in-memory queue drained by a background thread,
+    so that requests posting client logs don't wait for the log files to be written.
+    If the queue is full, records are dropped with the `drop` policy, while the `block` policy
+    waits up to timeout seconds for a free slot before dropping the record.
+    The number of queued and dropped records is available via `get_queue_stats()`.
+
+    Example:
+    >>> use_client_log_queue(max_size=1000, policy="block", timeout=0.5)
+    """
+    use_queue(CLIENT_LOGGER_NAME, max_size, policy, timeout)
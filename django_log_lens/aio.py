@@ -0,0 +1,92 @@
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial, wraps
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse
+
+from .files import CHUNK_SIZE
+from .metrics import sampled
+
+DEFAULT_IO_WORKERS = 8
+
+T = TypeVar('T')
+
+_DONE = object()
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> Executor:
+    """
+    Returns the pool running the blocking file operations of the async views, so that concurrent requests
+    cannot occupy more than LOG_LENS_IO_WORKERS threads, independent of the thread running sync views.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            max_workers = getattr(settings, 'LOG_LENS_IO_WORKERS', DEFAULT_IO_WORKERS)
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='log-lens-io')
+        return _executor
+
+
+async def run_blocking(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Runs the blocking function in the I/O pool and returns its result without blocking the event loop.
+    The function runs in a copy of the current context, so that it is accounted to the current request.
+    """
+    call = partial(contextvars.copy_context().run, sampled, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_io_executor(), call)
+
+
+async def iterate_blocking(iterator: Iterator[T]) -> AsyncIterator[T]:
+    """
+    Iterates the blocking iterator in the I/O pool, one item at a time, so that reading the next chunk
+    of a file does not block the event loop. The iterator is closed if the iteration stops early,
+    e.g. because the client disconnected.
+    """
+    loop = asyncio.get_running_loop()
+    executor = get_io_executor()
+    future: asyncio.Future | None = None
+    try:
+        while True:
+            future = loop.run_in_executor(executor, next, iterator, _DONE)
+            item = await future
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            # the iterator cannot be closed while the pool is still advancing it
+            if future is None or future.done():
+                executor.submit(close)
+            else:
+                future.add_done_callback(lambda _: executor.submit(close))
+
+
+def async_view(view: Callable) -> Callable:
+    """
+    Turns the sync view into a native async view running in the I/O pool instead of the thread shared
+    by all sync views, so that reading or scanning a large log file neither blocks the event loop nor other views.
+    The user is loaded beforehand on the thread of the request, the database is not accessed in the pool.
+    Under ASGI, streamed responses are iterated in the pool as well rather than being consumed at once.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        await sync_to_async(lambda: request.user.is_superuser)()
+        response = await run_blocking(view, request, *args, **kwargs)
+        if isinstance(request, ASGIRequest) and response.streaming and not response.is_async:
+            if isinstance(response, FileResponse) and response.file_to_stream is not None:
+                # read larger blocks than FileResponse does to limit the hand-offs to the pool
+                content = iter(partial(response.file_to_stream.read, CHUNK_SIZE), b"")
+            else:
+                content = iter(response.streaming_content)
+            response.streaming_content = iterate_blocking(content)
+        return response
+    return wrapper
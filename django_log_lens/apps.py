@@ -1,7 +1,14 @@
 from django.apps import AppConfig
 
+from .handlers import registry
+from .pipeline import install_pipelines
+
 
 class DjangoLogLensConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'django_log_lens'
     verbose_name = 'Django Log Lens'
+
+    def ready(self):
+        registry.build()
+        install_pipelines()
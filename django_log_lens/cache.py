@@ -0,0 +1,182 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterator, NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import metrics
+
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+DEFAULT_SHARED_CACHE_TIMEOUT = 300
+MAX_ENTRY_FRACTION = 8
+
+FileIdentity = tuple[str, int, int, int]
+
+
+class CacheStats(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size: int
+
+
+def get_file_identity(filename: str, stat: os.stat_result | None = None) -> FileIdentity:
+    """
+    Returns the path, inode, size and modification time (ns) of the log file, which change whenever the file
+    grows, is rotated or cleared, so that results cached for the file become stale without being invalidated.
+    Raises an OSError if the file does not exist.
+    """
+    stat = stat or os.stat(filename)
+    return filename, stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class ResultCache:
+    """
+    LRU cache of results computed from log files, e.g. query results and windows of lines,
+    bounded by the total size of its entries (LOG_LENS_CACHE_BYTES). Entries larger than
+    an eighth of the cache are not cached. Keys start with the identities of the files the result was
+    computed from, see `get_file_identity`. Storing a result for a file evicts the results for previous
+    identities of the file. With LOG_LENS_CACHE set to the alias of a Django cache, results are shared
+    with the other workers through that cache as well (for LOG_LENS_CACHE_TIMEOUT seconds).
+    """
+
+    def __init__(self, name: str = "results"):
+        self.name = name
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()
+            self.keys_by_file: dict[str, set[tuple]] = {}
+            self.size = 0
+            self.hits = self.misses = self.evictions = 0
+            self.report_size()
+
+    @property
+    def max_size(self) -> int:
+        return getattr(settings, 'LOG_LENS_CACHE_BYTES', DEFAULT_CACHE_BYTES)
+
+    @staticmethod
+    def get_shared_cache():
+        alias = getattr(settings, 'LOG_LENS_CACHE', None)
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def get_shared_key(key: tuple) -> str:
+        return "log-lens:" + hashlib.sha256(repr(key).encode()).hexdigest()
+
+    def get(self, identities: tuple[FileIdentity, ...], key: Hashable) -> Any | None:
+        """
+        Returns the result cached for the key and the given file identities or None.
+        """
+        full_key = (identities, key)
+        with self.lock:
+            entry = self.entries.get(full_key)
+            if entry is not None:
+                self.entries.move_to_end(full_key)
+                self.hits += 1
+        if entry is None and (shared := self.get_shared_cache()) is not None:
+            entry = shared.get(self.get_shared_key(full_key))
+            if entry is not None:
+                self.store(full_key, *entry)
+                with self.lock:
+                    self.hits += 1
+        if entry is None:
+            with self.lock:
+                self.misses += 1
+        metrics.count_cache(self.name, entry is not None)
+        return entry[0] if entry is not None else None
+
+    def put(self, identities: tuple[FileIdentity, ...], key: Hashable, value: Any, size: int) -> None:
+        """
+        Caches the result computed from the files with the given identities, unless it is too large.
+        """
+        if not self.max_size or size > self.max_size // MAX_ENTRY_FRACTION:
+            return
+        full_key = (identities, key)
+        self.store(full_key, value, size)
+        if (shared := self.get_shared_cache()) is not None:
+            timeout = getattr(settings, 'LOG_LENS_CACHE_TIMEOUT', DEFAULT_SHARED_CACHE_TIMEOUT)
+            shared.set(self.get_shared_key(full_key), (value, size), timeout)
+
+    def store(self, full_key: tuple, value: Any, size: int) -> None:
+        identities = full_key[0]
+        with self.lock:
+            for identity in identities:
+                stale = [key for key in self.keys_by_file.get(identity[0], ()) if identity not in key[0]]
+                for key in stale:
+                    self.remove(key)
+            if full_key in self.entries:
+                self.remove(full_key)
+            self.entries[full_key] = (value, size)
+            self.size += size
+            for identity in identities:
+                self.keys_by_file.setdefault(identity[0], set()).add(full_key)
+            while self.size > self.max_size:
+                self.remove(next(iter(self.entries)))
+                self.evictions += 1
+                metrics.count_eviction(self.name)
+            self.report_size()
+
+    def remove(self, full_key: tuple) -> None:
+        _, size = self.entries.pop(full_key)
+        self.size -= size
+        for identity in full_key[0]:
+            keys = self.keys_by_file.get(identity[0])
+            if keys is not None:
+                keys.discard(full_key)
+                if not keys:
+                    del self.keys_by_file[identity[0]]
+
+    def invalidate(self, filename: str) -> None:
+        """
+        Drops the results computed from the given file, e.g. after clearing it.
+        Results shared with other workers become stale as the identity of the file changes.
+        """
+        with self.lock:
+            for key in list(self.keys_by_file.get(filename, ())):
+                self.remove(key)
+            self.report_size()
+
+    def report_size(self) -> None:
+        metrics.set_cache_size(self.name, len(self.entries), self.size)
+
+    def stats(self) -> CacheStats:
+        with self.lock:
+            return CacheStats(self.hits, self.misses, self.evictions, len(self.entries), self.size)
+
+
+result_cache = ResultCache()
+
+
+def cache_chunks(identities: tuple[FileIdentity, ...], key: Hashable, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Yields the chunks of a streamed result and caches them once the stream has been consumed in full,
+    unless they exceed the size of a cache entry. A stream closed early, e.g. because the client
+    disconnected, is not cached.
+    """
+    parts: list[bytes] | None = []
+    size = 0
+    max_size = result_cache.max_size // MAX_ENTRY_FRACTION
+    for chunk in chunks:
+        if parts is not None:
+            parts.append(chunk)
+            size += len(chunk)
+            if size > max_size:
+                parts = None  # too large to be cached
+        yield chunk
+    if parts is not None:
+        result_cache.put(identities, key, b"".join(parts), size)
+
+
+def get_cache_stats() -> CacheStats:
+    """
+    Returns the number of hits, misses and evictions of the result cache along with its number of entries
+    and their total size in bytes. Hits of the shared cache (LOG_LENS_CACHE) are counted as hits.
+    """
+    return result_cache.stats()
@@ -0,0 +1,218 @@
+import heapq
+import mmap
+import os
+import re
+import threading
+
+from django.conf import settings
+
+from .compressed import is_compressed, open_logfile
+from .files import CHUNK_SIZE, was_truncated
+from .jsonlog import render_line
+from .metrics import metrics, timed
+from .query import TIMESTAMP_PATTERN, timestamp_key
+from .scan import count_lines, map_logfile
+
+RECORD_PATTERN = re.compile(rb"^[^\n]*?\[LVL:(\d+)\]"
+                            rb"(?:(\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[,.]\d{1,6})?) ?)?([^\n]*)", re.MULTILINE)
+WILDCARD = b"<*>"
+VARIABLE_PATTERN = re.compile(rb"(?<!\S)(?:[^\s\d]*\d\S*|[0-9a-fA-F]{8,}(?!\S))")
+PREFIX_TOKENS = 2
+SIMILARITY_THRESHOLD = 0.4
+DEFAULT_MAX_TEMPLATES = 5000
+MAX_SHAPES = 100000
+MAX_TEMPLATE_SAMPLES = 3
+MAX_TEMPLATES_LISTED = 100
+
+
+class MessageTemplate:
+    """
+    A message template, i.e. the tokens of a message with the variable parts replaced by `<*>`,
+    along with the number of records it matches, the first and last time it was seen
+    and the line numbers and byte offsets of its first records.
+    """
+    __slots__ = ("tokens", "level", "count", "first_seen", "last_seen", "samples")
+
+    def __init__(self, tokens: list[bytes], level: int, timestamp: bytes | None):
+        self.tokens = tokens
+        self.level = level
+        self.count = 0
+        self.first_seen = self.last_seen = timestamp
+        self.samples: list[tuple[int, int]] = []
+
+    def similarity(self, tokens: list[bytes]) -> float:
+        return sum(1 for own, token in zip(self.tokens, tokens) if own == token or own == WILDCARD) / len(tokens)
+
+    def merge(self, tokens: list[bytes]) -> None:
+        self.tokens = [own if own == token else WILDCARD for own, token in zip(self.tokens, tokens)]
+
+    def as_dict(self) -> dict:
+        return {
+            "template": b" ".join(self.tokens).decode(errors="replace"),
+            "level": self.level,
+            "count": self.count,
+            "first_seen": format_timestamp(self.first_seen),
+            "last_seen": format_timestamp(self.last_seen),
+            "samples": [[line, offset] for line, offset in self.samples],
+        }
+
+
+def format_timestamp(timestamp: bytes | None) -> str | None:
+    match = TIMESTAMP_PATTERN.match(timestamp) if timestamp is not None else None
+    return timestamp_key(*match.groups()).decode() if match else None
+
+
+class TemplateMiner:
+    """
+    Message templates of the records of a log file, mined like Drain does: variables, i.e. tokens containing
+    digits and hexadecimal ids, are masked and the messages are grouped by their number of tokens and their
+    first tokens, then merged with the most similar template of their group, differing tokens becoming `<*>`.
+    Records are recognized by their `[LVL:NN]` prefix, continuation lines such as tracebacks are not mined.
+    Messages seen before are looked up by their masked form, so that mostly repeated messages are cheap to mine.
+    Like the summary, the templates are mined once, extended incrementally as the file grows
+    and mined from scratch if the file has been rotated or truncated.
+    """
+
+    def __init__(self, filename: str, json_lines: bool = False):
+        self.filename = filename
+        self.json_lines = json_lines
+        self.lock = threading.Lock()
+        self.reset(None)
+
+    def reset(self, inode: int | None) -> None:
+        self.inode = inode
+        self.position = 0
+        self.line_count = 0
+        self.record_count = 0
+        self.unclustered = 0
+        self.templates: list[MessageTemplate] = []
+        self.groups: dict[tuple, list[MessageTemplate]] = {}
+        self.shapes: dict[bytes, MessageTemplate] = {}
+
+    @property
+    def max_templates(self) -> int:
+        return getattr(settings, 'LOG_LENS_MAX_TEMPLATES', DEFAULT_MAX_TEMPLATES)
+
+    def update(self) -> os.stat_result:
+        """
+        Brings the templates up to date with the log file and returns the file's stat result.
+        Only complete lines are mined.
+        """
+        with self.lock, open_logfile(self.filename) as f:
+            stat = os.fstat(f.fileno())
+            if is_compressed(self.filename):
+                if stat.st_ino == self.inode:
+                    return stat  # compressed backups are not written to
+                self.reset(stat.st_ino)
+            elif stat.st_ino != self.inode or was_truncated(f, stat, self.position):
+                self.reset(stat.st_ino)
+            with map_logfile(f) as buffer:
+                if buffer is not None and not self.json_lines:
+                    self.mine_buffer(buffer)
+                    return stat
+            f.seek(self.position)
+            remainder = b""
+            while chunk := f.read(CHUNK_SIZE):
+                lines = (remainder + chunk).split(b"\n")
+                remainder = lines.pop()
+                for line in lines:
+                    header = render_line(line).split(b"\\n", 1)[0] if self.json_lines else line
+                    if b"[LVL:" in header and (match := RECORD_PATTERN.match(header)) is not None:
+                        template = self.add_record(int(match.group(1)), match.group(2), match.group(3))
+                        if template is not None and len(template.samples) < MAX_TEMPLATE_SAMPLES:
+                            template.samples.append((self.line_count + 1, self.position))
+                    self.line_count += 1
+                    self.position += len(line) + 1
+        return stat
+
+    def mine_buffer(self, buffer: mmap.mmap) -> None:
+        """
+        Mines the complete lines of the memory-mapped file following position, finding the records
+        by their `[LVL:NN]` prefix rather than splitting the file into lines.
+        Lines are only counted up to the records kept as samples and at the end.
+        """
+        end = buffer.rfind(b"\n", self.position) + 1
+        counted = self.position
+        for match in RECORD_PATTERN.finditer(buffer, self.position, end):
+            template = self.add_record(int(match.group(1)), match.group(2), match.group(3))
+            if template is not None and len(template.samples) < MAX_TEMPLATE_SAMPLES:
+                line_start = match.start()
+                self.line_count += count_lines(buffer, counted, line_start)
+                counted = line_start
+                template.samples.append((self.line_count + 1, line_start))
+        self.line_count += count_lines(buffer, counted, end)
+        self.position = max(self.position, end)
+
+    def add_record(self, level: int, timestamp: bytes | None, text: bytes) -> MessageTemplate | None:
+        """
+        Adds the record with the given level, timestamp and first line following the timestamp to the template
+        it matches and returns the template, or None if the record does not match any template
+        and no more templates may be added.
+        """
+        self.record_count += 1
+        message = VARIABLE_PATTERN.sub(WILDCARD, text)
+        template = self.shapes.get(message)
+        if template is None:
+            template = self.find_template(message.split(), level, timestamp)
+            if template is None:
+                self.unclustered += 1
+                return None
+            if len(self.shapes) < MAX_SHAPES:
+                self.shapes[message] = template
+        template.count += 1
+        if timestamp is not None:
+            template.last_seen = timestamp
+            if template.first_seen is None:
+                template.first_seen = timestamp
+        return template
+
+    def find_template(self, tokens: list[bytes], level: int, timestamp: bytes | None) -> MessageTemplate | None:
+        key = (len(tokens), *tokens[:PREFIX_TOKENS])
+        group = self.groups.get(key, ())
+        best, best_similarity = None, SIMILARITY_THRESHOLD
+        for template in group:
+            similarity = template.similarity(tokens) if tokens else 1.0
+            if similarity >= best_similarity:
+                best, best_similarity = template, similarity
+        if best is not None:
+            best.merge(tokens)
+            return best
+        if len(self.templates) >= self.max_templates:
+            return None
+        template = MessageTemplate(tokens, level, timestamp)
+        self.groups.setdefault(key, []).append(template)
+        self.templates.append(template)
+        return template
+
+    def as_dict(self, limit: int = MAX_TEMPLATES_LISTED) -> dict:
+        """
+        Returns the limit most frequent templates as JSON-serializable dict.
+        """
+        with self.lock:
+            top = heapq.nlargest(limit, self.templates, key=lambda template: template.count)
+            return {
+                "line_count": self.line_count,
+                "record_count": self.record_count,
+                "template_count": len(self.templates),
+                "unclustered": self.unclustered,
+                "templates": [template.as_dict() for template in top],
+                "templates_truncated": len(top) < len(self.templates),
+            }
+
+
+_miners: dict[str, TemplateMiner] = {}
+_miners_lock = threading.Lock()
+
+
+def get_template_miner(filename: str, json_lines: bool = False) -> TemplateMiner:
+    """
+    Returns the up-to-date message templates of the given log file, mining them if necessary.
+    """
+    with _miners_lock:
+        miner = _miners.get(filename)
+        metrics.count_cache("templates", miner is not None and miner.json_lines == json_lines)
+        if miner is None or miner.json_lines != json_lines:
+            miner = _miners[filename] = TemplateMiner(filename, json_lines)
+    with timed("index"):
+        miner.update()
+    return miner
@@ -0,0 +1,265 @@
+import gzip
+import io
+import os
+import threading
+import zlib
+from array import array
+from bisect import bisect_right
+from itertools import accumulate, islice
+from typing import Any, BinaryIO, NamedTuple
+
+from .files import CHUNK_SIZE, MAX_TAIL_BYTES, Cursor, Tail
+from .metrics import count_read, metrics, timed
+
+try:
+    from compression import zstd  # Python 3.14+
+except ImportError:
+    try:
+        import zstandard as zstd  # type: ignore
+    except ImportError:
+        zstd = None
+
+CHECKPOINT_INTERVAL = 4 * 1024 * 1024
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def is_compressed(filename: str) -> bool:
+    return filename.endswith(COMPRESSED_SUFFIXES)
+
+
+def open_logfile(path: str) -> BinaryIO:
+    """
+    Opens the log file for reading in binary mode, transparently decompressing gzip and zstd backups.
+    """
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rb')  # type: ignore
+    if path.endswith(".zst"):
+        if zstd is None:
+            raise OSError(f"Reading {path} requires the zstandard package")
+        return zstd.open(path, 'rb')  # type: ignore
+    return open(path, 'rb')
+
+
+def new_decompressor(filename: str) -> Any:
+    if filename.endswith(".zst"):
+        if zstd is None:
+            raise OSError(f"Reading {filename} requires the zstandard package")
+        if hasattr(zstd, 'ZstdDecompressor') and hasattr(zstd.ZstdDecompressor, 'decompressobj'):
+            return zstd.ZstdDecompressor().decompressobj()  # zstandard
+        return zstd.ZstdDecompressor()
+    return zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+
+def decompress(decompressor: Any, chunk: bytes, filename: str) -> tuple[Any, bytes]:
+    """
+    Decompresses the chunk and returns the decompressor to continue with along with the decompressed data.
+    A new decompressor is started for each member (gzip) or frame (zstd) of the file.
+    """
+    parts = []
+    while chunk:
+        if decompressor.eof:
+            decompressor = new_decompressor(filename)
+        parts.append(decompressor.decompress(chunk))
+        chunk = decompressor.unused_data if decompressor.eof else b""
+    return decompressor, b"".join(parts)
+
+
+class Checkpoint(NamedTuple):
+    """
+    State of the decompression at the given uncompressed offset, i.e. after reading compressed_offset bytes.
+    The decompressor is None at the start of the file.
+    """
+    offset: int
+    compressed_offset: int
+    decompressor: Any
+
+
+class CompressedLineIndex:
+    """
+    Line index of a compressed backup along with checkpoints of the decompression taken every
+    CHECKPOINT_INTERVAL bytes of uncompressed data, so that a window of lines is read by decompressing
+    from the preceding checkpoint instead of from the start of the file.
+    Backups are not written to, so the index is built once and only rebuilt if the file is replaced.
+    Checkpoints require a decompressor that can be copied, i.e. zstd backups are decompressed from the start.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.signature: tuple[int, int, int] | None = None
+        self.inode: int | None = None
+        self.size = 0
+        self.offsets = array('Q', [0])
+        self.checkpoints = [Checkpoint(0, 0, None)]
+        self.checkpoint_offsets = array('Q', [0])
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def update(self) -> os.stat_result:
+        """
+        Builds the index unless the file is unchanged and returns the file's stat result.
+        """
+        with self.lock:
+            stat = os.stat(self.filename)
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+            if signature != self.signature:
+                self.build()
+                self.signature, self.inode = signature, stat.st_ino
+        return stat
+
+    def build(self) -> None:
+        offsets = array('Q', [0])
+        checkpoints = [Checkpoint(0, 0, None)]
+        decompressor = new_decompressor(self.filename)
+        position = compressed_offset = 0
+        next_checkpoint = CHECKPOINT_INTERVAL
+        with open(self.filename, 'rb') as f:
+            while chunk := f.read(CHUNK_SIZE):
+                decompressor, data = decompress(decompressor, chunk, self.filename)
+                compressed_offset += len(chunk)
+                complete_lines = data.split(b"\n")[:-1]
+                line_ends = accumulate((len(line) + 1 for line in complete_lines), initial=position)
+                offsets.extend(islice(line_ends, 1, None))
+                position += len(data)
+                if position >= next_checkpoint and hasattr(decompressor, 'copy'):
+                    checkpoints.append(Checkpoint(position, compressed_offset, decompressor.copy()))
+                    next_checkpoint = position + CHECKPOINT_INTERVAL
+        self.offsets, self.checkpoints, self.size = offsets, checkpoints, position
+        self.checkpoint_offsets = array('Q', (checkpoint.offset for checkpoint in checkpoints))
+
+    def checkpoint_before(self, offset: int) -> Checkpoint:
+        """
+        Returns the last checkpoint at or before the uncompressed offset.
+        """
+        with self.lock:
+            return self.checkpoints[bisect_right(self.checkpoint_offsets, offset) - 1]
+
+    def open(self) -> BinaryIO:
+        """
+        Opens the backup for reading its uncompressed data, seeking via the checkpoints.
+        """
+        return io.BufferedReader(CompressedReader(self), CHUNK_SIZE)  # type: ignore
+
+    def read_range(self, start: int, end: int) -> bytes:
+        """
+        Returns the uncompressed bytes start to end (exclusive).
+        """
+        with timed("read"), self.open() as f:
+            f.seek(start)
+            return f.read(max(0, end - start))
+
+    def read_lines(self, first: int, last: int) -> tuple[bytes, Cursor]:
+        """
+        Returns the bytes of the lines first to last (zero-based, both inclusive)
+        along with a cursor pointing to the end of the last line.
+        """
+        with self.lock:
+            start, end, inode, size = self.offsets[first], self.offsets[last + 1], self.inode, self.size
+        return self.read_range(start, end), Cursor(end, inode, size)  # type: ignore
+
+
+class CompressedReader(io.RawIOBase):
+    """
+    Seekable reader of the uncompressed data of a backup. Reading continues the decompression where the
+    previous read stopped; seeking backwards or past a checkpoint restarts it from the preceding checkpoint.
+    """
+
+    def __init__(self, index: CompressedLineIndex):
+        self.index = index
+        self.file = open(index.filename, 'rb')
+        self.position = 0
+        self.decompressor: Any = None
+        self.buffer = b""
+        self.buffer_start = -1  # no decompression in progress
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self.position
+        elif whence == io.SEEK_END:
+            offset += self.index.size
+        self.position = max(0, offset)
+        return self.position
+
+    def readinto(self, buffer) -> int:  # type: ignore[override]
+        checkpoint = self.index.checkpoint_before(self.position)
+        if self.position < self.buffer_start or checkpoint.offset > self.buffer_start + len(self.buffer):
+            self.file.seek(checkpoint.compressed_offset)
+            self.decompressor = new_decompressor(self.index.filename) if checkpoint.decompressor is None \
+                else checkpoint.decompressor.copy()
+            self.buffer, self.buffer_start = b"", checkpoint.offset
+        while self.position >= self.buffer_start + len(self.buffer):
+            chunk = self.file.read(CHUNK_SIZE)
+            if not chunk:
+                return 0
+            count_read(len(chunk))
+            self.buffer_start += len(self.buffer)
+            self.decompressor, self.buffer = decompress(self.decompressor, chunk, self.index.filename)
+        start = self.position - self.buffer_start
+        data = self.buffer[start:start + len(buffer)]
+        buffer[:len(data)] = data
+        self.position += len(data)
+        return len(data)
+
+    def close(self) -> None:
+        self.file.close()
+        super().close()
+
+
+_compressed_indexes: dict[str, CompressedLineIndex] = {}
+_compressed_indexes_lock = threading.Lock()
+
+
+def get_compressed_index(filename: str) -> CompressedLineIndex:
+    """
+    Returns the index of the given compressed backup, building it if necessary.
+    """
+    with _compressed_indexes_lock:
+        index = _compressed_indexes.get(filename)
+        metrics.count_cache("compressed", index is not None)
+        if index is None:
+            index = _compressed_indexes[filename] = CompressedLineIndex(filename)
+    with timed("index"):
+        index.update()
+    return index
+
+
+def read_compressed(filename: str) -> Tail:
+    """
+    Like `read_logfile`, but for compressed backups. The cursor refers to the uncompressed data.
+    """
+    index = get_compressed_index(filename)
+    stat = os.stat(filename)
+    data = index.read_range(0, index.size)
+    return Tail(data, Cursor(len(data), stat.st_ino, index.size), False, stat.st_mtime)
+
+
+def read_compressed_appended(filename: str, offset: int, inode: int | None = None,
+                             max_bytes: int = MAX_TAIL_BYTES) -> Tail:
+    """
+    Like `read_appended`, but for compressed backups, seeking to the offset via the checkpoints of the index
+    and ending the data at a line start taken from the line offsets of the index.
+    """
+    index = get_compressed_index(filename)
+    stat = os.stat(filename)
+    if (inode is not None and inode != stat.st_ino) or offset > index.size:
+        return Tail(b"", Cursor(0, stat.st_ino, index.size), True, stat.st_mtime)
+    with index.lock:
+        offsets = index.offsets
+    end = offsets[bisect_right(offsets, min(index.size, offset + max_bytes)) - 1]
+    if end <= offset:
+        # a single line exceeding max_bytes is returned as a whole, so that the cursor stays at a line start
+        following = bisect_right(offsets, offset)
+        end = offsets[following] if following < len(offsets) else offset
+    data = index.read_range(offset, end)
+    return Tail(data, Cursor(offset + len(data), stat.st_ino, index.size), False, stat.st_mtime)
@@ -0,0 +1,109 @@
+import zlib
+from functools import wraps
+from typing import Iterable, Iterator
+
+from django.utils.cache import patch_vary_headers
+
+from .metrics import timed
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, responses are gzip encoded without it
+    brotli = None
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+BROTLI_QUALITY = 5
+MIN_COMPRESSED_SIZE = 1024
+
+
+def accepts_encoding(request, encoding: str) -> bool:
+    """
+    Checks whether the Accept-Encoding header of the request allows the given content coding.
+    """
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.partition(';')
+        if coding.strip().lower() != encoding:
+            continue
+        quality = params.strip().lower()
+        return quality not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def negotiate_encoding(request) -> str | None:
+    """
+    Returns the content coding to compress the response with, preferring brotli over gzip,
+    or None if the client accepts neither.
+    """
+    if brotli is not None and accepts_encoding(request, 'br'):
+        return 'br'
+    if accepts_encoding(request, 'gzip'):
+        return 'gzip'
+    return None
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = 6, flush: bool = False) -> Iterator[bytes]:
+    """
+    Compresses the given chunks on the fly and yields the gzip encoded data.
+    If flush is set, every chunk is flushed so that the client can decode it right away.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if flush:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def brotli_stream(chunks: Iterable[bytes], quality: int = BROTLI_QUALITY, flush: bool = False) -> Iterator[bytes]:
+    """
+    Compresses the given chunks on the fly and yields the brotli encoded data.
+    If flush is set, every chunk is flushed so that the client can decode it right away.
+    """
+    compressor = brotli.Compressor(quality=quality)
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if flush:
+            data += compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(request, response):
+    """
+    Compresses the body of a successful response with the content coding negotiated with the client.
+    Streaming responses are compressed chunk by chunk, small responses are left as they are.
+    """
+    patch_vary_headers(response, ('Accept-Encoding',))
+    if response.status_code != 200 or response.has_header('Content-Encoding'):
+        return response
+    encoding = negotiate_encoding(request)
+    if encoding is None:
+        return response
+    compress_stream = brotli_stream if encoding == 'br' else gzip_stream
+    if response.streaming:
+        response.streaming_content = compress_stream(response.streaming_content, flush=True)
+        del response['Content-Length']
+    else:
+        if len(response.content) < MIN_COMPRESSED_SIZE:
+            return response
+        with timed("compress"):
+            response.content = b"".join(compress_stream([response.content]))
+        response['Content-Length'] = str(len(response.content))
+    etag = response.get('ETag')
+    if etag and not etag.startswith('W/'):
+        response['ETag'] = f"W/{etag}"  # the compressed bytes may differ between requests
+    response['Content-Encoding'] = encoding
+    return response
+
+
+def compress_content(view):
+    """
+    Decorator compressing the responses of the view, see `compress_response`.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return compress_response(request, view(request, *args, **kwargs))
+    return wrapper
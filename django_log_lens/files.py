@@ -0,0 +1,159 @@
+import os
+import re
+from typing import BinaryIO, Iterator, NamedTuple
+
+from .metrics import count_read, timed
+
+CHUNK_SIZE = 64 * 1024
+MAX_TAIL_BYTES = 4 * 1024 * 1024
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class Cursor(NamedTuple):
+    """
+    Position of a client within a log file.
+    The inode identifies the file so that a rotation can be detected,
+    the offset is the number of bytes the client has already received.
+    """
+    offset: int
+    inode: int
+    size: int
+
+    def as_dict(self) -> dict:
+        return self._asdict()
+
+
+class Tail(NamedTuple):
+    """
+    Bytes appended to a log file since a given cursor.
+    If resync is set, the file has been truncated or rotated
+    and the client has to fetch the whole file again.
+    """
+    data: bytes
+    cursor: Cursor
+    resync: bool
+    mtime: float
+
+
+def make_etag(stat: os.stat_result) -> str:
+    """
+    Returns an entity tag identifying the state of a log file by its inode, size and modification time,
+    so that unchanged files can be recognized without reading them.
+    """
+    return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+
+
+def was_truncated(f: BinaryIO, stat: os.stat_result, position: int) -> bool:
+    """
+    Checks whether the file has been truncated since it has been read up to position, the start of a line.
+    This is the case if the file is shorter now or if the byte preceding position no longer ends a line,
+    e.g. because the file has been cleared and written again in the meantime.
+    """
+    if stat.st_size < position:
+        return True
+    if position == 0:
+        return False
+    f.seek(position - 1)
+    return f.read(1) != b"\n"
+
+
+def read_logfile(filename: str) -> Tail:
+    """
+    Reads the whole log file and returns its contents
+    together with a cursor pointing to the end of the data read.
+    """
+    with timed("read"), open(filename, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        data = f.read()
+    count_read(len(data))
+    return Tail(data, Cursor(len(data), stat.st_ino, stat.st_size), False, stat.st_mtime)
+
+
+def read_appended(filename: str, offset: int, inode: int | None = None, max_bytes: int = MAX_TAIL_BYTES) -> Tail:
+    """
+    Reads the bytes appended to the log file after the given offset, the start of a line.
+    Only complete lines are returned, so the returned cursor always points to the start of a line.
+    If the file has been rotated or truncated since, e.g. cleared and written again past the offset,
+    resync is set and no data is returned.
+    At most max_bytes are read, unless a single line is longer - if more data is available,
+    the cursor's offset will be less than its size and the client should ask again.
+    """
+    with timed("read"), open(filename, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        rotated = inode is not None and inode != stat.st_ino
+        if rotated or was_truncated(f, stat, offset):
+            return Tail(b"", Cursor(0, stat.st_ino, stat.st_size), True, stat.st_mtime)
+        f.seek(offset)
+        data = f.read(min(stat.st_size - offset, max_bytes))
+        if len(data) == max_bytes and b"\n" not in data:
+            # a single line exceeding max_bytes is returned as a whole, so that the cursor stays at a line start
+            data += f.readline(stat.st_size - offset - len(data))
+    count_read(len(data))
+    end = data.rfind(b"\n") + 1
+    return Tail(data[:end], Cursor(offset + end, stat.st_ino, stat.st_size), False, stat.st_mtime)
+
+
+def end_cursor(filename: str, chunk_size: int = CHUNK_SIZE) -> Cursor:
+    """
+    Returns a cursor pointing behind the last complete line of the log file,
+    i.e. to the start of a line that may still be written.
+    """
+    with open(filename, 'rb') as f:
+        stat = os.fstat(f.fileno())
+        end = stat.st_size
+        while end > 0:
+            start = max(end - chunk_size, 0)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                return Cursor(start + newline + 1, stat.st_ino, stat.st_size)
+            end = start
+    return Cursor(0, stat.st_ino, stat.st_size)
+
+
+def iter_file(filename: str, start: int = 0, length: int | None = None,
+              chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yields the contents of the file in binary chunks of at most chunk_size bytes,
+    beginning at the byte offset start and stopping after length bytes (or at the end of the file).
+    The file is opened lazily, i.e. when the first chunk is requested.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                return
+            count_read(len(chunk))
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parses an HTTP Range header consisting of a single byte range
+    and returns the first and last byte position (both inclusive).
+    Returns None if there is no header or if it is not supported, i.e. the whole file should be sent.
+    Raises a ValueError if the range cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix_length = int(last)
+        if suffix_length == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - suffix_length, 0), size - 1
+    first_pos = int(first)
+    last_pos = int(last) if last else size - 1
+    if last and first_pos > last_pos:
+        return None
+    if first_pos >= size:
+        raise ValueError("Range not satisfiable")
+    return first_pos, min(last_pos, size - 1)
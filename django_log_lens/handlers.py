@@ -0,0 +1,213 @@
+import glob
+import logging
+import os
+import threading
+import time
+from logging.handlers import (BaseRotatingHandler, RotatingFileHandler,
+                              TimedRotatingFileHandler, WatchedFileHandler)
+from typing import NamedTuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .jsonlog import JsonLinesFormatter
+
+DEFAULT_LOG_FORMAT = "%(message)s"  # the format of handlers without formatter
+MIN_REBUILD_INTERVAL = 1.0  # seconds between rebuilds for unknown handler names if no logger has been added
+
+file_handlers = {
+    "logging.FileHandler",
+    "logging.handlers.RotatingFileHandler",
+    "logging.handlers.TimedRotatingFileHandler",
+    "logging.handlers.WatchedFileHandler",
+}
+
+
+class LogHandlerInfo(NamedTuple):
+    """
+    A file handler recognized by Django Log Lens.
+    The rotation is `size` or `time` for handlers rolling over by themselves, `external` for handlers
+    expecting the file to be rotated by another program (`WatchedFileHandler`) and None otherwise.
+    Handlers formatting with the `JsonLinesFormatter` write JSON lines.
+    The log format is the %-style format of the handler's formatter, empty for formatters of other styles.
+    """
+    name: str
+    path: str
+    handler_class: str
+    rotation: str | None
+    backup_count: int
+    backup_glob: str
+    json_lines: bool = False
+    log_format: str = DEFAULT_LOG_FORMAT
+
+    def find_backups(self) -> list[str]:
+        return sorted(path for path in glob.glob(self.backup_glob) if os.path.isfile(path))
+
+    def resolve(self, backup: str | None = None) -> str:
+        """
+        Returns the path of the log file or, if given, of the rotated backup with the given file name.
+        Raises a KeyError if there is no such backup.
+        """
+        if not backup:
+            return self.path
+        for path in self.find_backups():
+            if os.path.basename(path) == backup:
+                return path
+        raise KeyError(backup)
+
+
+def get_rotation(handler_class: type | None, handler: logging.Handler | None = None) -> tuple[str | None, int]:
+    """
+    Returns the rotation policy and the number of backups kept of the given handler class or instance.
+    """
+    if handler_class is None:
+        return None, 0
+    backup_count = getattr(handler, 'backupCount', 0)
+    if issubclass(handler_class, TimedRotatingFileHandler):
+        return "time", backup_count
+    if issubclass(handler_class, RotatingFileHandler):
+        return "size", backup_count
+    if issubclass(handler_class, BaseRotatingHandler):
+        return "custom", backup_count
+    if issubclass(handler_class, WatchedFileHandler):
+        return "external", 0
+    return None, 0
+
+
+def iter_live_file_handlers():
+    """
+    Walks the logger tree and yields (logger name, handler) for every attached file handler.
+    """
+    loggers = [logging.getLogger()]
+    loggers.extend(logger for logger in list(logging.Logger.manager.loggerDict.values())
+                   if isinstance(logger, logging.Logger))
+    for logger in loggers:
+        for handler in logger.handlers:
+            if isinstance(handler, logging.FileHandler):
+                yield logger.name, handler
+
+
+def uses_json_lines(formatter_config: dict | None, handler: logging.Handler | None) -> bool:
+    """
+    Checks whether the handler, or the formatter configured for it, formats records as JSON lines.
+    """
+    if handler is not None:
+        return isinstance(handler.formatter, JsonLinesFormatter)
+    formatter_class = (formatter_config or {}).get('()') or (formatter_config or {}).get('class')
+    if isinstance(formatter_class, str):
+        try:
+            formatter_class = import_string(formatter_class)
+        except ImportError:
+            return False
+    return isinstance(formatter_class, type) and issubclass(formatter_class, JsonLinesFormatter)
+
+
+def get_log_format(formatter_config: dict | None, handler: logging.Handler | None) -> str:
+    """
+    Returns the %-style format of the handler's formatter, or of the formatter configured for it,
+    or an empty string if the formatter uses another style.
+    """
+    if handler is not None:
+        formatter = handler.formatter
+        if formatter is None:
+            return DEFAULT_LOG_FORMAT
+        return (formatter._fmt or "") if type(formatter._style) is logging.PercentStyle else ""
+    config = formatter_config or {}
+    if config.get('style', '%') != '%':
+        return ""
+    return config.get('format') or config.get('fmt') or DEFAULT_LOG_FORMAT
+
+
+def create_handler_info(name: str, path: str, handler_class: str, handler: logging.Handler | None,
+                        formatter_config: dict | None = None) -> LogHandlerInfo:
+    path = os.path.abspath(path)
+    if handler is not None:
+        resolved_class: type | None = type(handler)
+    else:
+        try:
+            resolved_class = import_string(handler_class)
+        except ImportError:
+            resolved_class = None
+    rotation, backup_count = get_rotation(resolved_class, handler)
+    return LogHandlerInfo(name, path, handler_class, rotation, backup_count, glob.escape(path) + ".*",
+                          uses_json_lines(formatter_config, handler), get_log_format(formatter_config, handler))
+
+
+class HandlerRegistry:
+    """
+    Resolves the handler names to the log files they write to.
+    The registry is built once from the LOGGING configuration, for handlers of the classes in `file_handlers`,
+    and from the file handlers attached to the live logger tree, e.g. by third-party code at runtime.
+    Call `invalidate()` to rebuild it after attaching handlers later on.
+    Unknown handler names trigger a rebuild only if loggers have been added since the last one
+    or MIN_REBUILD_INTERVAL has passed, so that repeated requests for them don't walk the logger tree each time.
+    """
+
+    def __init__(self):
+        self._handlers: dict[str, LogHandlerInfo] | None = None
+        self._lock = threading.Lock()
+        self._logger_count = -1
+        self._built_at = 0.0
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._handlers = None
+
+    def build(self) -> dict[str, LogHandlerInfo]:
+        logger_count, built_at = len(logging.Logger.manager.loggerDict), time.monotonic()
+        live_handlers = {}
+        for logger_name, handler in iter_live_file_handlers():
+            key = handler.get_name() or f"{logger_name or 'root'}:{os.path.basename(handler.baseFilename)}"
+            live_handlers.setdefault(key, handler)
+        handlers: dict[str, LogHandlerInfo] = {}
+        logging_config = getattr(settings, 'LOGGING', {})
+        formatters = logging_config.get('formatters', {})
+        for name, config in logging_config.get('handlers', {}).items():
+            if 'filename' in config and config.get('class') in file_handlers:
+                handlers[name] = create_handler_info(name, config['filename'], config['class'], live_handlers.get(name),
+                                                     formatters.get(config.get('formatter')))
+        known_paths = {info.path for info in handlers.values()}
+        for name, handler in live_handlers.items():
+            path = os.path.abspath(handler.baseFilename)  # type: ignore
+            if name not in handlers and path not in known_paths:
+                handler_class = f"{type(handler).__module__}.{type(handler).__qualname__}"
+                handlers[name] = create_handler_info(name, path, handler_class, handler)
+                known_paths.add(path)
+        with self._lock:
+            self._handlers, self._logger_count, self._built_at = handlers, logger_count, built_at
+        return handlers
+
+    def is_stale(self) -> bool:
+        """
+        Checks whether loggers have been added or MIN_REBUILD_INTERVAL has passed since the last build.
+        """
+        return (len(logging.Logger.manager.loggerDict) != self._logger_count
+                or time.monotonic() - self._built_at >= MIN_REBUILD_INTERVAL)
+
+    @property
+    def handlers(self) -> dict[str, LogHandlerInfo]:
+        handlers = self._handlers
+        if handlers is None:
+            handlers = self.build()
+        return handlers
+
+    def get(self, handler_name: str) -> LogHandlerInfo:
+        """
+        Returns the handler with the given name, rebuilding the registry once if it is unknown and stale.
+        Raises a KeyError if there is no such file handler.
+        """
+        info = self.handlers.get(handler_name)
+        if info is None:
+            if not self.is_stale():
+                raise KeyError(handler_name)
+            info = self.build()[handler_name]
+        return info
+
+    def get_filename(self, handler_name: str) -> str:
+        return self.get(handler_name).path
+
+    def get_paths(self) -> dict[str, str]:
+        return {name: info.path for name, info in self.handlers.items()}
+
+
+registry = HandlerRegistry()
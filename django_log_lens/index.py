@@ -0,0 +1,83 @@
+import os
+import threading
+from array import array
+from itertools import accumulate, islice
+
+from .compressed import (CompressedLineIndex, get_compressed_index,
+                         is_compressed)
+from .files import CHUNK_SIZE, Cursor, was_truncated
+from .metrics import count_read, metrics, timed
+
+MAX_WINDOW_LINES = 10000
+
+
+class LineIndex:
+    """
+    Byte offsets of the line starts of a log file, stored in a compact array.
+    The index is built once, extended incrementally as the file grows
+    and rebuilt from scratch if the file has been rotated or truncated.
+    Only complete lines, i.e. lines terminated by a line break, are indexed.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.inode: int | None = None
+        self.offsets = array('Q', [0])
+        self.lock = threading.Lock()
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    def update(self) -> os.stat_result:
+        """
+        Brings the index up to date with the log file and returns the file's stat result.
+        """
+        with self.lock, open(self.filename, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_ino != self.inode or was_truncated(f, stat, self.offsets[-1]):
+                self.inode = stat.st_ino
+                self.offsets = array('Q', [0])
+            position = self.offsets[-1]
+            f.seek(position)
+            while chunk := f.read(CHUNK_SIZE):
+                complete_lines = chunk.split(b"\n")[:-1]
+                line_ends = accumulate((len(line) + 1 for line in complete_lines), initial=position)
+                self.offsets.extend(islice(line_ends, 1, None))
+                position += len(chunk)
+        return stat
+
+    def read_lines(self, first: int, last: int) -> tuple[bytes, Cursor]:
+        """
+        Returns the bytes of the lines first to last (zero-based, both inclusive)
+        along with a cursor pointing to the end of the last line.
+        """
+        with self.lock:
+            start, end, inode = self.offsets[first], self.offsets[last + 1], self.inode
+        with timed("read"), open(self.filename, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+            size = os.fstat(f.fileno()).st_size
+        count_read(len(data))
+        return data, Cursor(end, inode, size)
+
+
+_line_indexes: dict[str, LineIndex] = {}
+_line_indexes_lock = threading.Lock()
+
+
+def get_line_index(filename: str) -> LineIndex | CompressedLineIndex:
+    """
+    Returns the up-to-date line index of the given log file, building it if necessary.
+    Compressed backups are indexed with decompression checkpoints.
+    """
+    if is_compressed(filename):
+        return get_compressed_index(filename)
+    with _line_indexes_lock:
+        line_index = _line_indexes.get(filename)
+        metrics.count_cache("lines", line_index is not None)
+        if line_index is None:
+            line_index = _line_indexes[filename] = LineIndex(filename)
+    with timed("index"):
+        line_index.update()
+    return line_index
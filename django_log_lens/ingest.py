@@ -0,0 +1,82 @@
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+MAX_BATCH_ENTRIES = 100
+MAX_BATCH_BYTES = 256 * 1024
+DEFAULT_RATE_LIMIT = 600
+RATE_LIMIT_WINDOW = 60
+
+client_logger = logging.getLogger("django_log_lens.client")
+
+log_levels = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+    "ASSERTION FAILED (CRITICAL)": logging.CRITICAL,
+}
+
+
+class BatchTooLarge(ValueError):
+    pass
+
+
+def parse_batch(payload: str | bytes) -> list[tuple[int, str]]:
+    """
+    Parses the entries sent by the client logger, either a single object or an array of objects
+    with the keys `log_message` and `severity`, and returns them as (level, message) tuples.
+    Unknown severities are logged as errors.
+    Raises a BatchTooLarge error if the batch exceeds LOG_LENS_CLIENT_BATCH_BYTES bytes
+    or LOG_LENS_CLIENT_BATCH_ENTRIES entries and a ValueError if the payload is malformed.
+    """
+    max_bytes = getattr(settings, 'LOG_LENS_CLIENT_BATCH_BYTES', MAX_BATCH_BYTES)
+    size = len(payload)
+    if isinstance(payload, str) and size <= max_bytes:
+        size = len(payload.encode())  # a character takes up to four bytes
+    if size > max_bytes:
+        raise BatchTooLarge("batch exceeds the size limit")
+    entries = json.loads(payload)
+    if isinstance(entries, dict):
+        entries = [entries]
+    if not isinstance(entries, list):
+        raise ValueError("expected an array of log entries")
+    if len(entries) > getattr(settings, 'LOG_LENS_CLIENT_BATCH_ENTRIES', MAX_BATCH_ENTRIES):
+        raise BatchTooLarge("batch exceeds the entry limit")
+    try:
+        return [(log_levels.get(entry['severity'], logging.ERROR), str(entry['log_message'])) for entry in entries]
+    except (KeyError, TypeError) as e:
+        raise ValueError("invalid log entry") from e
+
+
+def consume_rate_limit(client_key: str, entries: int) -> bool:
+    """
+    Counts the entries against the budget of LOG_LENS_CLIENT_RATE_LIMIT entries per minute of the client
+    and returns whether the budget is exceeded. The counters are kept in the default cache,
+    so the limit is shared by all workers if the cache is.
+    """
+    rate_limit = getattr(settings, 'LOG_LENS_CLIENT_RATE_LIMIT', DEFAULT_RATE_LIMIT)
+    if rate_limit is None:
+        return False
+    key = f"log-lens:client-rate:{client_key}:{int(time.time() // RATE_LIMIT_WINDOW)}"
+    cache.add(key, 0, RATE_LIMIT_WINDOW)
+    try:
+        count = cache.incr(key, entries)
+    except ValueError:  # the counter expired in the meantime
+        cache.set(key, entries, RATE_LIMIT_WINDOW)
+        count = entries
+    return count > rate_limit
+
+
+def emit_batch(entries: list[tuple[int, str]]) -> None:
+    """
+    Hands the entries to the client logger in a single pass,
+    skipping all entries below the effective level of the logger.
+    """
+    for level, message in entries:
+        if client_logger.isEnabledFor(level):
+            client_logger.log(level, message)
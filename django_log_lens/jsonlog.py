@@ -0,0 +1,218 @@
+import json
+import logging
+import operator
+import os
+import threading
+from array import array
+from datetime import datetime
+from itertools import compress, repeat
+from typing import BinaryIO, Iterator
+
+from .compressed import is_compressed, open_logfile
+from .files import CHUNK_SIZE, was_truncated
+from .metrics import metrics, timed
+from .query import (MAX_QUERY_MATCHES, TIMESTAMP_PATTERN, LogQuery,
+                    stream_matches, timestamp_key)
+
+try:
+    from orjson import loads
+except ImportError:  # orjson is optional, but decodes considerably faster
+    from json import loads
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    Formats records as JSON objects, one per line, with the keys time, level, levelname, logger and message.
+    Exceptions and stack traces are appended to the message, so that every record stays on a single line.
+    Use it as a structured alternative to LOG_FORMAT, Log Lens renders the records just like LOG_FORMAT records.
+
+    Example:
+    >>> LOGGING = {"formatters": {"json": {"()": "django_log_lens.JsonLinesFormatter"}}, ...}
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            message += "\n" + record.exc_text
+        if record.stack_info:
+            message += "\n" + self.formatStack(record.stack_info)
+        return json.dumps({"time": datetime.fromtimestamp(record.created).isoformat(sep=" ", timespec="milliseconds"),
+                           "level": record.levelno,
+                           "levelname": record.levelname,
+                           "logger": record.name,
+                           "message": message}, ensure_ascii=False)
+
+
+def parse_json_header(line: bytes) -> tuple[int, bytes | None] | None:
+    """
+    Returns the level and the timestamp key of the given JSON line or None if the line is no JSON record.
+    """
+    try:
+        entry = loads(line)
+        level = int(entry['level'])
+    except (ValueError, TypeError, KeyError):
+        return None
+    timestamp_match = TIMESTAMP_PATTERN.search(str(entry.get('time', '')).encode())
+    return level, timestamp_key(*timestamp_match.groups()) if timestamp_match else None
+
+
+def render_line(line: bytes) -> bytes:
+    """
+    Renders a JSON line like a LOG_FORMAT record, i.e. `[LVL:NN]time levelname: message`.
+    Line breaks within the message are escaped so that each record keeps its line. Other lines are returned as is.
+    """
+    try:
+        entry = loads(line)
+        rendered = f"[LVL:{int(entry['level'])}]{entry.get('time', '')} {entry.get('levelname', '')}: " \
+                   f"{entry.get('message', '')}"
+    except (ValueError, TypeError, KeyError):
+        return line
+    return rendered.replace("\n", "\\n").encode()
+
+
+def render_lines(data: bytes) -> bytes:
+    return b"\n".join(render_line(line) if line else line for line in data.split(b"\n"))
+
+
+def parse_epoch(key: bytes) -> float:
+    return datetime.strptime(key.decode(), "%Y-%m-%d %H:%M:%S.%f").timestamp()
+
+
+class JsonLogColumns:
+    """
+    Columnar view of a JSON-lines log file: the byte offsets of the lines and the timestamp (seconds since epoch),
+    level and logger of each record, stored in compact arrays. Loggers are stored as codes into `logger_names`.
+    Queries by level, logger or time range scan the arrays instead of parsing the lines,
+    only the matching lines are read from the file.
+    Like the line index, the columns are built once, extended incrementally as the file grows
+    and rebuilt from scratch if the file has been rotated or truncated.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.reset(None)
+
+    def reset(self, inode: int | None) -> None:
+        self.inode = inode
+        self.offsets = array('Q', [0])
+        self.timestamps = array('d')
+        self.levels = array('h')
+        self.loggers = array('I')
+        self.logger_names: list[str] = []
+        self.logger_codes: dict[str, int] = {}
+
+    @property
+    def line_count(self) -> int:
+        return len(self.levels)
+
+    def update(self) -> os.stat_result:
+        """
+        Brings the columns up to date with the log file and returns the file's stat result.
+        Only complete lines are decoded.
+        """
+        with self.lock, open_logfile(self.filename) as f:
+            stat = os.fstat(f.fileno())
+            if is_compressed(self.filename):
+                if stat.st_ino == self.inode:
+                    return stat  # compressed backups are not written to
+                self.reset(stat.st_ino)
+            elif stat.st_ino != self.inode or was_truncated(f, stat, self.offsets[-1]):
+                self.reset(stat.st_ino)
+            position = self.offsets[-1]
+            f.seek(position)
+            remainder = b""
+            while chunk := f.read(CHUNK_SIZE):
+                lines = (remainder + chunk).split(b"\n")
+                remainder = lines.pop()
+                for line in lines:
+                    self.add_line(line)
+                    position += len(line) + 1
+                    self.offsets.append(position)
+        return stat
+
+    def add_line(self, line: bytes) -> None:
+        try:
+            entry = loads(line)
+            level = int(entry['level'])
+            timestamp = datetime.fromisoformat(entry['time']).timestamp()
+            logger = str(entry.get('logger', ''))
+        except (ValueError, TypeError, KeyError):
+            level, timestamp, logger = -1, float('nan'), ""
+        code = self.logger_codes.get(logger)
+        if code is None:
+            code = self.logger_codes[logger] = len(self.logger_names)
+            self.logger_names.append(logger)
+        self.levels.append(level)
+        self.timestamps.append(timestamp)
+        self.loggers.append(code)
+
+    def select(self, query: LogQuery) -> list[tuple[int, int, int]]:
+        """
+        Returns the line number, start and end offset of each line passing the level, time range and logger filters
+        of the query. The pattern is not applied.
+        """
+        with self.lock:
+            line_count = self.line_count
+            masks = []
+            if query.min_level:
+                masks.append(map(operator.ge, self.levels, repeat(query.min_level)))
+            if query.since:
+                masks.append(map(operator.ge, self.timestamps, repeat(parse_epoch(query.since))))
+            if query.until:
+                masks.append(map(operator.le, self.timestamps, repeat(parse_epoch(query.until))))
+            if query.logger:
+                codes = {code for code, name in enumerate(self.logger_names) if query.logger_matches(name)}
+                masks.append(map(codes.__contains__, self.loggers))
+            if not masks:
+                selected: Iterator[int] = iter(range(line_count))
+            elif len(masks) == 1:
+                selected = compress(range(line_count), masks[0])
+            else:
+                selected = compress(range(line_count), map(all, zip(*masks)))
+            offsets = self.offsets
+            return [(index + 1, offsets[index], offsets[index + 1]) for index in selected]
+
+
+def search_json_lines(f: BinaryIO, columns: JsonLogColumns, query: LogQuery) -> Iterator[tuple[int, bytes]]:
+    """
+    Yields the line numbers and the rendered text of the lines of the file matching the query.
+    """
+    for line_number, start, end in columns.select(query):
+        f.seek(start)
+        text = render_line(f.read(end - start).rstrip(b"\n"))
+        if query.pattern is None or query.pattern.search(text) is not None:
+            yield line_number, text
+
+
+def stream_json_query_results(filename: str, query: LogQuery, limit: int = MAX_QUERY_MATCHES,
+                              batch_size: int = 100) -> Iterator[bytes]:
+    """
+    Searches the JSON-lines log file and yields the matching lines, rendered like LOG_FORMAT records,
+    encoded as JSON lines.
+    """
+    def scan(f: BinaryIO) -> Iterator[dict]:
+        for line_number, text in search_json_lines(f, get_json_log_columns(filename), query):
+            yield {"line": line_number, "text": text.decode('utf-8', errors='replace')}
+
+    return stream_matches(filename, scan, limit, batch_size)
+
+
+_columns: dict[str, JsonLogColumns] = {}
+_columns_lock = threading.Lock()
+
+
+def get_json_log_columns(filename: str) -> JsonLogColumns:
+    """
+    Returns the up-to-date columns of the given JSON-lines log file, building them if necessary.
+    """
+    with _columns_lock:
+        columns = _columns.get(filename)
+        metrics.count_cache("json_columns", columns is not None)
+        if columns is None:
+            columns = _columns[filename] = JsonLogColumns(filename)
+    with timed("index"):
+        columns.update()
+    return columns
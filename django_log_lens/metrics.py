@@ -0,0 +1,356 @@
+import inspect
+import logging
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+from django.conf import settings
+from django.http import FileResponse
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_PROFILE_INTERVAL = 0.005
+PROFILE_STACK_DEPTH = 12
+PROFILE_TOP_STACKS = 10
+
+T = TypeVar('T')
+
+profile_logger = logging.getLogger("django_log_lens.profile")
+
+
+class Histogram:
+    """
+    Counts of observed values per bucket (not cumulative) along with their sum, see LATENCY_BUCKETS.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RequestTimer:
+    """
+    Time spent per phase (stat, index, read, encode, ...) and bytes read while handling a single request.
+    The threads working on the request are sampled by the profiler if it is enabled.
+    """
+
+    def __init__(self, view: str):
+        self.view = view
+        self.start = time.perf_counter()
+        self.phases: Counter[str] = Counter()
+        self.bytes_read = 0
+        self.threads: set[int] = set()
+        self.samples: Counter[str] = Counter()
+
+    def server_timing(self, duration: float) -> str:
+        """
+        Returns the value of the Server-Timing header, with durations in milliseconds.
+        """
+        metrics = []
+        for phase, seconds in self.phases.items():
+            description = f';desc="{self.bytes_read} bytes"' if phase == "read" else ""
+            metrics.append(f"{phase};dur={seconds * 1000:.1f}{description}")
+        metrics.append(f"total;dur={duration * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+_current_timer: ContextVar[RequestTimer | None] = ContextVar('log_lens_timer', default=None)
+
+
+class Metrics:
+    """
+    Counters and latency histograms of the Log Lens views, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests: Counter[tuple[str, int]] = Counter()
+            self.latencies: dict[str, Histogram] = {}
+            self.phases: Counter[tuple[str, str]] = Counter()
+            self.bytes_served: Counter[str] = Counter()
+            self.bytes_read = 0
+            self.caches: Counter[tuple[str, str]] = Counter()
+            self.evictions: Counter[str] = Counter()
+            self.cache_sizes: dict[str, tuple[int, int]] = {}
+            self.client_batches: Counter[str] = Counter()
+            self.client_entries = 0
+
+    def observe_request(self, timer: RequestTimer, status: int, duration: float) -> None:
+        with self.lock:
+            self.requests[(timer.view, status)] += 1
+            self.latencies.setdefault(timer.view, Histogram()).observe(duration)
+            for phase, seconds in timer.phases.items():
+                self.phases[(timer.view, phase)] += seconds
+
+    def count_served(self, view: str, size: int) -> None:
+        with self.lock:
+            self.bytes_served[view] += size
+
+    def count_read(self, size: int) -> None:
+        with self.lock:
+            self.bytes_read += size
+
+    def count_cache(self, cache: str, hit: bool) -> None:
+        with self.lock:
+            self.caches[(cache, "hit" if hit else "miss")] += 1
+
+    def count_eviction(self, cache: str) -> None:
+        with self.lock:
+            self.evictions[cache] += 1
+
+    def set_cache_size(self, cache: str, entries: int, size: int) -> None:
+        with self.lock:
+            self.cache_sizes[cache] = (entries, size)
+
+    def count_client_logs(self, result: str, entries: int = 0) -> None:
+        with self.lock:
+            self.client_batches[result] += 1
+            self.client_entries += entries
+
+    def render(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+        """
+        lines: list[str] = []
+
+        def add(name: str, kind: str, description: str, samples: list[tuple[str, float]]) -> None:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(f"{name}{labels} {value}" for labels, value in samples)
+
+        with self.lock:
+            add("log_lens_requests_total", "counter", "Requests per view and status code.",
+                [(f'{{view="{view}",status="{status}"}}', count)
+                 for (view, status), count in sorted(self.requests.items())])
+            lines.append("# HELP log_lens_request_duration_seconds Time until the response of a view is returned.")
+            lines.append("# TYPE log_lens_request_duration_seconds histogram")
+            for view, histogram in sorted(self.latencies.items()):
+                cumulative = 0
+                for bucket, count in zip((*histogram.buckets, "+Inf"), histogram.counts):
+                    cumulative += count
+                    lines.append(f'log_lens_request_duration_seconds_bucket{{view="{view}",le="{bucket}"}} '
+                                 f'{cumulative}')
+                lines.append(f'log_lens_request_duration_seconds_sum{{view="{view}"}} {histogram.sum}')
+                lines.append(f'log_lens_request_duration_seconds_count{{view="{view}"}} {cumulative}')
+            add("log_lens_phase_seconds_total", "counter", "Time spent per view and phase, e.g. reading or encoding.",
+                [(f'{{view="{view}",phase="{phase}"}}', seconds)
+                 for (view, phase), seconds in sorted(self.phases.items())])
+            add("log_lens_served_bytes_total", "counter", "Bytes of response bodies sent per view.",
+                [(f'{{view="{view}"}}', size) for view, size in sorted(self.bytes_served.items())])
+            add("log_lens_read_bytes_total", "counter", "Bytes of log files read to answer requests.",
+                [("", self.bytes_read)])
+            add("log_lens_cache_requests_total", "counter", "Lookups of the in-memory indexes and the result cache.",
+                [(f'{{cache="{cache}",result="{result}"}}', count)
+                 for (cache, result), count in sorted(self.caches.items())])
+            add("log_lens_cache_evictions_total", "counter", "Results evicted to keep the cache within its size.",
+                [(f'{{cache="{cache}"}}', count) for cache, count in sorted(self.evictions.items())])
+            add("log_lens_cache_entries", "gauge", "Results held by the result cache.",
+                [(f'{{cache="{cache}"}}', entries) for cache, (entries, _) in sorted(self.cache_sizes.items())])
+            add("log_lens_cache_bytes", "gauge", "Total size of the results held by the result cache.",
+                [(f'{{cache="{cache}"}}', size) for cache, (_, size) in sorted(self.cache_sizes.items())])
+            add("log_lens_client_log_batches_total", "counter", "Batches of client logs posted per result.",
+                [(f'{{result="{result}"}}', count) for result, count in sorted(self.client_batches.items())])
+            add("log_lens_client_log_entries_total", "counter", "Client log entries written to the log files.",
+                [("", self.client_entries)])
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """
+    Adds the time spent in the block to the given phase of the current request, if any.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.phases[phase] += time.perf_counter() - start
+
+
+def count_read(size: int) -> None:
+    """
+    Counts bytes read from a log file, for the current request and in total.
+    """
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.bytes_read += size
+    metrics.count_read(size)
+
+
+def sampled(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Calls the function, sampling the calling thread along with the current request if the profiler is enabled.
+    Used for work handed off to other threads.
+    """
+    timer = _current_timer.get()
+    if timer is None or not profiler.enabled:
+        return func(*args, **kwargs)
+    thread = threading.get_ident()
+    timer.threads.add(thread)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        timer.threads.discard(thread)
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of the threads working on the active requests every LOG_LENS_PROFILE_INTERVAL seconds.
+    Requests taking longer than LOG_LENS_PROFILE_SLOW_REQUESTS seconds are logged to `django_log_lens.profile`
+    along with their most frequent stacks. Profiling is disabled unless LOG_LENS_PROFILE_SLOW_REQUESTS is set.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.timers: set[RequestTimer] = set()
+        self.thread: threading.Thread | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(settings, 'LOG_LENS_PROFILE_SLOW_REQUESTS', None) is not None
+
+    def start(self, timer: RequestTimer) -> None:
+        with self.condition:
+            self.timers.add(timer)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='log-lens-profiler', daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def stop(self, timer: RequestTimer, duration: float) -> None:
+        with self.condition:
+            self.timers.discard(timer)
+        if duration >= settings.LOG_LENS_PROFILE_SLOW_REQUESTS:
+            stacks = "\n".join(f"{count:>6} {stack}" for stack, count in timer.samples.most_common(PROFILE_TOP_STACKS))
+            profile_logger.warning("Slow request to %s took %.3f s, %d samples:\n%s",
+                                   timer.view, duration, sum(timer.samples.values()), stacks)
+
+    def _run(self) -> None:
+        interval = getattr(settings, 'LOG_LENS_PROFILE_INTERVAL', DEFAULT_PROFILE_INTERVAL)
+        while True:
+            with self.condition:
+                while not self.timers:
+                    self.condition.wait()  # idle until a request is profiled
+                timers = list(self.timers)
+            time.sleep(interval)
+            frames = sys._current_frames()
+            for timer in timers:
+                for thread in list(timer.threads):
+                    frame = frames.get(thread)
+                    if frame is not None:
+                        timer.samples[format_stack(frame)] += 1
+
+
+def format_stack(frame) -> str:
+    """
+    Returns the innermost PROFILE_STACK_DEPTH frames of the stack as `file:function:line` from outer to inner.
+    """
+    entries = []
+    while frame is not None and len(entries) < PROFILE_STACK_DEPTH:
+        code = frame.f_code
+        entries.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return " > ".join(reversed(entries))
+
+
+profiler = SamplingProfiler()
+
+
+def count_served_chunks(view: str, chunks: Iterator[bytes]) -> Iterator[bytes]:
+    for chunk in chunks:
+        metrics.count_served(view, len(chunk))
+        yield chunk
+
+
+async def count_served_chunks_async(view: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    async for chunk in chunks:
+        metrics.count_served(view, len(chunk))
+        yield chunk
+
+
+def start_request(view: str) -> RequestTimer:
+    timer = RequestTimer(view)
+    if profiler.enabled:
+        timer.threads.add(threading.get_ident())
+        profiler.start(timer)
+    return timer
+
+
+def finish_request(timer: RequestTimer, response):
+    """
+    Records the metrics of the request and adds the Server-Timing header to its response.
+    Streamed bodies are counted as they are sent.
+    """
+    duration = time.perf_counter() - timer.start
+    if profiler.enabled:
+        profiler.stop(timer, duration)
+    if response is None:
+        metrics.observe_request(timer, 500, duration)
+        return response
+    metrics.observe_request(timer, response.status_code, duration)
+    response['Server-Timing'] = timer.server_timing(duration)
+    if not response.streaming:
+        metrics.count_served(timer.view, len(response.content))
+    elif isinstance(response, FileResponse) and response.file_to_stream is not None:
+        # keep the file wrapper (e.g. sendfile) of the server
+        metrics.count_served(timer.view, int(response.get('Content-Length', 0)))
+    elif response.is_async:
+        response.streaming_content = count_served_chunks_async(timer.view, response.streaming_content)
+    else:
+        response.streaming_content = count_served_chunks(timer.view, response.streaming_content)
+    return response
+
+
+def instrument(view: Callable) -> Callable:
+    """
+    Decorator recording the number of requests, the latency and the bytes served of the view, see `Metrics`,
+    and adding a Server-Timing header with the time spent per phase to its responses.
+    """
+    if inspect.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            timer = start_request(view.__name__)
+            token = _current_timer.set(timer)
+            response = None
+            try:
+                response = await view(request, *args, **kwargs)
+            finally:
+                _current_timer.reset(token)
+                finish_request(timer, response)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        timer = start_request(view.__name__)
+        token = _current_timer.set(timer)
+        response = None
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _current_timer.reset(token)
+            finish_request(timer, response)
+        return response
+    return wrapper
@@ -0,0 +1,154 @@
+import atexit
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import NamedTuple
+
+CLIENT_LOGGER_NAME = "django_log_lens.client"
+DEFAULT_QUEUE_SIZE = 10000
+DEFAULT_BLOCK_TIMEOUT = 1.0
+POLICIES = ("drop", "block")
+
+
+class QueueStats(NamedTuple):
+    queued: int
+    dropped: int
+    pending: int
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Puts records into a bounded queue instead of handling them.
+    If the queue is full, records are dropped right away with the `drop` policy,
+    while the `block` policy waits up to timeout seconds for the listener to catch up before dropping them.
+    """
+
+    def __init__(self, record_queue: queue.Queue, policy: str = "drop", timeout: float = DEFAULT_BLOCK_TIMEOUT):
+        super().__init__(record_queue)
+        self.policy = policy
+        self.timeout = timeout
+        self.queued = 0
+        self.dropped = 0
+        self._counter_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if self.policy == "block":
+                self.queue.put(record, timeout=self.timeout)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._counter_lock:
+                self.dropped += 1
+            return
+        with self._counter_lock:
+            self.queued += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """
+    Queue listener that waits for a free slot when stopped with a full queue instead of failing.
+    """
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def get_propagated_handlers(logger: logging.Logger) -> list[logging.Handler]:
+    """
+    Returns the handlers a record logged by the logger is passed to,
+    i.e. the handlers of the logger and of its ancestors up to the first one not propagating.
+    """
+    handlers: list[logging.Handler] = []
+    current: logging.Logger | None = logger
+    while current is not None:
+        handlers.extend(current.handlers)
+        current = current.parent if current.propagate else None  # type: ignore
+    return handlers
+
+
+class QueuePipeline:
+    """
+    Routes the records of a logger through a bounded queue drained by a background listener thread,
+    so that logging only costs a queue put on the calling thread.
+    While installed, the logger does not propagate, the listener passes the records
+    to the handlers the logger had propagated to instead.
+    """
+
+    def __init__(self, logger_name: str = CLIENT_LOGGER_NAME, max_size: int = DEFAULT_QUEUE_SIZE,
+                 policy: str = "drop", timeout: float = DEFAULT_BLOCK_TIMEOUT):
+        self.logger_name = logger_name
+        self.queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self.handler = BoundedQueueHandler(self.queue, policy, timeout)
+        self.listener: DrainingQueueListener | None = None
+        self._original_handlers: list[logging.Handler] = []
+        self._original_propagate = True
+
+    def install(self) -> None:
+        if self.listener is not None:
+            return
+        logger = logging.getLogger(self.logger_name)
+        self.listener = DrainingQueueListener(self.queue, *get_propagated_handlers(logger), respect_handler_level=True)
+        self._original_handlers = logger.handlers[:]
+        self._original_propagate = logger.propagate
+        logger.handlers = [self.handler]
+        logger.propagate = False
+        self.listener.start()
+
+    def uninstall(self) -> None:
+        """
+        Restores the handlers of the logger after handling all records left in the queue.
+        """
+        if self.listener is None:
+            return
+        logger = logging.getLogger(self.logger_name)
+        logger.handlers = self._original_handlers
+        logger.propagate = self._original_propagate
+        self.listener.stop()
+        self.listener = None
+
+    def stats(self) -> QueueStats:
+        return QueueStats(self.handler.queued, self.handler.dropped, self.queue.qsize())
+
+
+_pipelines: dict[str, QueuePipeline] = {}
+_installed = False
+
+
+def use_queue(logger_name: str = CLIENT_LOGGER_NAME, max_size: int = DEFAULT_QUEUE_SIZE,
+              policy: str = "drop", timeout: float = DEFAULT_BLOCK_TIMEOUT) -> QueuePipeline:
+    """
+    Registers a queue pipeline for the logger. Pipelines registered before the logging
+    configuration has been applied are installed once the app is ready.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown queue policy {policy}, expected one of {', '.join(POLICIES)}")
+    previous = _pipelines.pop(logger_name, None)
+    if previous is not None:
+        previous.uninstall()
+    pipeline = _pipelines[logger_name] = QueuePipeline(logger_name, max_size, policy, timeout)
+    if _installed:
+        pipeline.install()
+    return pipeline
+
+
+def install_pipelines() -> None:
+    global _installed
+    if not _installed:
+        _installed = True
+        atexit.register(uninstall_pipelines)
+    for pipeline in _pipelines.values():
+        pipeline.install()
+
+
+def uninstall_pipelines() -> None:
+    for pipeline in _pipelines.values():
+        pipeline.uninstall()
+
+
+def get_queue_stats() -> dict[str, QueueStats]:
+    """
+    Returns the number of queued, dropped and pending records per logger routed through a queue.
+    """
+    return {logger_name: pipeline.stats() for logger_name, pipeline in _pipelines.items()}
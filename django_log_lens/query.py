@@ -0,0 +1,301 @@
+import copy
+import json
+import logging
+import mmap
+import re
+import threading
+import time
+from datetime import datetime
+from typing import BinaryIO, Callable, Iterator
+
+from .compressed import open_logfile
+from .files import CHUNK_SIZE
+from .metrics import count_read
+from .scan import (LEVEL_PATTERN, count_lines, find_last_header_line,
+                   get_line_pattern, iter_matching_lines, map_logfile)
+
+TIMESTAMP_PATTERN = re.compile(rb"(\d{4}-\d{2}-\d{2})[ T](\d{2}:\d{2}:\d{2})(?:[,.](\d{1,6}))?")
+FORMAT_FIELD_PATTERN = re.compile(r"%\((\w+)\)([-#0 +]*\d*)(?:\.\d+)?[diouxXeEfFgGcrsa]")
+FORMAT_FIELD_PATTERNS = {"asctime": r"(?:\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[,.]\d+)?|\S+)", "levelno": r"\d+"}
+MAX_QUERY_MATCHES = 10000
+
+
+def timestamp_key(date: bytes, time: bytes, fraction: bytes | None) -> bytes:
+    """
+    Returns a key for the given timestamp parts that sorts like the timestamp itself,
+    so that timestamps can be compared without parsing them into datetime objects.
+    """
+    return date + b" " + time + b"." + (fraction or b"").ljust(6, b"0")
+
+
+def parse_timestamp(value: str) -> bytes:
+    """
+    Parses an ISO 8601 timestamp as provided by the client, e.g. `2024-05-01T14:32`,
+    and returns its timestamp key. Raises a ValueError if the timestamp is invalid.
+    """
+    moment = datetime.fromisoformat(value)
+    return timestamp_key(moment.strftime("%Y-%m-%d").encode(), moment.strftime("%H:%M:%S").encode(),
+                         f"{moment.microsecond:06d}".encode())
+
+
+def compile_logger_pattern(log_format: str, logger: str) -> re.Pattern:
+    """
+    Returns the pattern matching the header lines written with the given %-style log format
+    by the logger or its children, i.e. the format up to its `%(name)s` field.
+    The message is never matched. Raises a ValueError if the format has no `%(name)s` field.
+    """
+    parts = [r"\A"]
+    position = 0
+    for field in FORMAT_FIELD_PATTERN.finditer(log_format):
+        if field.group(1) == 'message':
+            break
+        parts.append(re.escape(log_format[position:field.start()].replace("%%", "%")))
+        padding = r" *" if field.group(2) else ""
+        if field.group(1) == 'name':
+            parts.append(re.escape(logger) + r"(?:\.[\w.]+)?" + padding)
+            following = FORMAT_FIELD_PATTERN.search(log_format, field.end())
+            literal = log_format[field.end():following.start() if following else None].replace("%%", "%")
+            parts.append(re.escape(literal) if literal else r"(?![\w.])")
+            return re.compile("".join(parts).encode())
+        parts.append(FORMAT_FIELD_PATTERNS.get(field.group(1), r"\S*") + padding)
+        position = field.end()
+    raise ValueError("the log format of the handler has no logger name (%(name)s)")
+
+
+def parse_level(value: str) -> int:
+    """
+    Parses a log level given either by its name (e.g. `ERROR`) or its number (e.g. `40`).
+    Raises a ValueError if the level is unknown.
+    """
+    if value.isdigit():
+        return int(value)
+    level = logging.getLevelName(value.upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown log level {value}")
+    return level
+
+
+class CancellationToken:
+    """
+    Allows stopping long-running scans, either explicitly or once the deadline has passed.
+    Only the deadline survives pickling, i.e. scans running in another process can only time out.
+    """
+
+    def __init__(self, timeout: float | None = None):
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            self._event.set()
+            return True
+        return False
+
+    def __getstate__(self) -> dict:
+        return {'deadline': self.deadline}
+
+    def __setstate__(self, state: dict) -> None:
+        self.deadline = state['deadline']
+        self._event = threading.Event()
+
+
+class LogQuery:
+    """
+    Filter for the lines of a log file.
+    A line belongs to the record started by the last preceding line with a `[LVL:NN]` prefix,
+    i.e. continuation lines such as tracebacks inherit the level, timestamp and logger of their record.
+    The pattern is a regular expression matched against each line itself.
+    The logger name is matched against the logger field of the header lines, which depends on the log format,
+    see `for_format`. Header lines are never matched by logger name if the format is unknown.
+    """
+
+    def __init__(self, min_level: int = 0, since: bytes | None = None, until: bytes | None = None,
+                 logger: str | None = None, pattern: str | None = None, ignore_case: bool = False):
+        self.min_level = min_level
+        self.since = since
+        self.until = until
+        self.logger_name = logger
+        self.logger = re.compile(rb"(?<![\w.])" + re.escape(logger.encode()) + rb"(?:\.[\w.]+)?(?![\w.])") \
+            if logger else None
+        self.header_logger: re.Pattern | None = None
+        self.pattern = re.compile(pattern.encode(), re.IGNORECASE if ignore_case else 0) if pattern else None
+
+    @classmethod
+    def from_query_dict(cls, params) -> "LogQuery":
+        """
+        Creates a query from the GET parameters level, since, until, logger, pattern and ignore_case.
+        Raises a ValueError if any of the parameters is invalid.
+        """
+        try:
+            return cls(min_level=parse_level(params['level']) if params.get('level') else 0,
+                       since=parse_timestamp(params['since']) if params.get('since') else None,
+                       until=parse_timestamp(params['until']) if params.get('until') else None,
+                       logger=params.get('logger') or None,
+                       pattern=params.get('pattern') or None,
+                       ignore_case=params.get('ignore_case', '').lower() in ('1', 'true'))
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {e}") from e
+
+    def for_format(self, log_format: str) -> "LogQuery":
+        """
+        Returns the query for a log file written with the given %-style log format,
+        matching the logger name against the `%(name)s` field of its header lines.
+        Raises a ValueError if the query filters by logger name and the format has no `%(name)s` field.
+        """
+        query = copy.copy(self)
+        if self.logger_name:
+            query.header_logger = compile_logger_pattern(log_format, self.logger_name)
+        return query
+
+    @property
+    def cache_key(self) -> tuple:
+        """
+        Returns a key identifying the query, see `ResultCache`.
+        """
+        return (self.min_level, self.since, self.until, self.logger.pattern if self.logger else None,
+                self.header_logger.pattern if self.header_logger else None,
+                (self.pattern.pattern, self.pattern.flags) if self.pattern else None)
+
+    def logger_matches(self, name: str) -> bool:
+        """
+        Checks whether the logger name is the one filtered by or the name of one of its children.
+        """
+        return name == self.logger_name or name.startswith(f"{self.logger_name}.")
+
+    @property
+    def filters_records(self) -> bool:
+        return bool(self.min_level or self.since or self.until or self.logger)
+
+    def record_matches(self, header: bytes, level: int) -> bool:
+        """
+        Checks whether the record starting with the given header line passes the record-level filters.
+        """
+        if level < self.min_level:
+            return False
+        if self.since or self.until:
+            match = TIMESTAMP_PATTERN.search(header)
+            if match is None:
+                return False
+            key = timestamp_key(*match.groups())
+            if (self.since and key < self.since) or (self.until and key > self.until):
+                return False
+        return self.logger is None or (self.header_logger is not None and self.header_logger.match(header) is not None)
+
+
+def iter_lines(f: BinaryIO, chunk_size: int = CHUNK_SIZE,
+               token: CancellationToken | None = None) -> Iterator[tuple[int, bytes]]:
+    """
+    Reads the file in chunks and yields its lines (without line breaks) along with their one-based line numbers.
+    Stops early if the token is cancelled.
+    """
+    line_number = 0
+    remainder = b""
+    while chunk := f.read(chunk_size):
+        if token is not None and token.cancelled:
+            return
+        lines = (remainder + chunk).split(b"\n")
+        remainder = lines.pop()
+        for line in lines:
+            line_number += 1
+            yield line_number, line
+    if remainder:
+        yield line_number + 1, remainder
+
+
+def search_file(f: BinaryIO, query: LogQuery, token: CancellationToken | None = None,
+                use_mmap: bool | None = None) -> Iterator[tuple[int, bytes, bytes]]:
+    """
+    Scans the file in a single streaming pass and yields the matching lines along with their line numbers
+    and the header line of the record they belong to.
+    Files that can be memory-mapped are searched for the pattern without splitting them into lines,
+    see `search_buffer`. use_mmap overrides LOG_LENS_MMAP, see `map_logfile`.
+    """
+    with map_logfile(f, use_mmap) as buffer:
+        if buffer is not None and query.pattern is not None and get_line_pattern(query.pattern) is not None:
+            yield from search_buffer(buffer, query, token)
+            return
+    record_matches = not query.filters_records
+    header = b""
+    pattern = query.pattern
+    for line_number, line in iter_lines(f, token=token):
+        if b"[LVL:" in line:
+            level_match = LEVEL_PATTERN.search(line)
+            if level_match is not None:
+                header = line
+                record_matches = query.record_matches(line, int(level_match.group(1)))
+        if record_matches and (pattern is None or pattern.search(line) is not None):
+            yield line_number, line, header
+
+
+def search_buffer(buffer: mmap.mmap, query: LogQuery,
+                  token: CancellationToken | None = None) -> Iterator[tuple[int, bytes, bytes]]:
+    """
+    Like `search_file`, but searches the memory-mapped file for the pattern rather than line by line,
+    so that only the matching lines and the headers of their records are copied and the line numbers
+    are counted in between. The query must have a pattern, see `get_line_pattern`.
+    """
+    count_read(len(buffer))
+    pattern = query.pattern
+    line_number, counted = 1, 0  # the number of the line starting at the offset counted
+    header, header_start, searched = b"", -1, 0
+    record_matches = not query.filters_records
+    for line_start, line_end in iter_matching_lines(buffer, pattern, get_line_pattern(pattern)):  # type: ignore
+        if token is not None and token.cancelled:
+            return
+        found = find_last_header_line(buffer, searched, line_end)
+        searched = line_end
+        if found is not None and found[0] != header_start:
+            header_start = found[0]
+            header = buffer[found[0]:found[1]]
+            level_match = LEVEL_PATTERN.search(header)
+            record_matches = query.record_matches(header, int(level_match.group(1)))  # type: ignore
+        if record_matches:
+            line_number += count_lines(buffer, counted, line_start)
+            counted = line_start
+            yield line_number, buffer[line_start:line_end], header
+
+
+def stream_matches(filename: str, scan: Callable[[BinaryIO], Iterator[dict]], limit: int = MAX_QUERY_MATCHES,
+                   batch_size: int = 100) -> Iterator[bytes]:
+    """
+    Scans the log file, which may be a compressed backup, and yields the matches found by scan
+    encoded as JSON lines, in batches of batch_size matches.
+    The final object states the number of matches and whether the results have been truncated.
+    """
+    matches = 0
+    truncated = False
+    batch = []
+    try:
+        with open_logfile(filename) as f:
+            for match in scan(f):
+                if matches >= limit:
+                    truncated = True
+                    break
+                matches += 1
+                batch.append(json.dumps(match))
+                if len(batch) >= batch_size:
+                    yield ("\n".join(batch) + "\n").encode()
+                    batch = []
+    except FileNotFoundError:
+        pass
+    batch.append(json.dumps({"matches": matches, "truncated": truncated}))
+    yield ("\n".join(batch) + "\n").encode()
+
+
+def stream_query_results(filename: str, query: LogQuery, limit: int = MAX_QUERY_MATCHES,
+                         batch_size: int = 100) -> Iterator[bytes]:
+    """
+    Searches the log file and yields the matching lines encoded as JSON lines,
+    each an object with the line number and the text of the line.
+    """
+    def scan(f: BinaryIO) -> Iterator[dict]:
+        for line_number, line, _ in search_file(f, query):
+            yield {"line": line_number, "text": line.decode('utf-8', errors='replace')}
+
+    return stream_matches(filename, scan, limit, batch_size)
@@ -0,0 +1,329 @@
+import mmap
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from typing import BinaryIO, Callable, Iterator, NamedTuple
+
+from .compressed import is_compressed, open_logfile
+from .files import CHUNK_SIZE, MAX_TAIL_BYTES, was_truncated
+from .metrics import metrics, timed
+from .query import (LEVEL_PATTERN, MAX_QUERY_MATCHES, TIMESTAMP_PATTERN,
+                    CancellationToken, LogQuery, iter_lines, stream_matches,
+                    timestamp_key)
+from .scan import count_lines, iter_header_lines, map_logfile
+
+SEEK_RECORDS_BEFORE = 10
+SEEK_RECORDS_AFTER = 100
+
+
+class LogRecord(NamedTuple):
+    """
+    A log event, i.e. a header line starting with the `[LVL:NN]` prefix of `LOG_FORMAT`
+    followed by its continuation lines such as a traceback.
+    Lines preceding the first header line form a record without level.
+    The offset and length are given in bytes, the line is the one-based number of the header line.
+    The timestamp is given as timestamp key, see `timestamp_key`.
+    """
+    offset: int
+    length: int
+    line: int
+    line_count: int
+    level: int | None
+    timestamp: bytes | None
+
+    def as_dict(self) -> dict:
+        return {"offset": self.offset, "length": self.length, "line": self.line, "line_count": self.line_count,
+                "level": self.level, "timestamp": self.timestamp.decode() if self.timestamp else None}
+
+
+def parse_header(line: bytes) -> tuple[int, bytes | None] | None:
+    """
+    Returns the level and the timestamp key of the given header line or None if the line is no header line.
+    """
+    level_match = LEVEL_PATTERN.search(line)
+    if level_match is None:
+        return None
+    timestamp_match = TIMESTAMP_PATTERN.search(line)
+    return int(level_match.group(1)), timestamp_key(*timestamp_match.groups()) if timestamp_match else None
+
+
+def iter_records(f: BinaryIO, offset: int = 0, line: int = 1,
+                 token: CancellationToken | None = None) -> Iterator[tuple[LogRecord, bytes]]:
+    """
+    Splits the file into records in a single streaming pass, starting at the given byte offset and line number,
+    and yields each record along with its lines (without the final line break).
+    Stops early if the token is cancelled.
+    """
+    f.seek(offset)
+    header: tuple[int | None, bytes | None] = (None, None)
+    record_offset, record_line = offset, line
+    position = offset
+    lines: list[bytes] = []
+    for line_number, text in iter_lines(f, token=token):
+        parsed = parse_header(text) if b"[LVL:" in text else None
+        if parsed is not None:
+            if lines:
+                yield LogRecord(record_offset, position - record_offset, record_line, len(lines), *header), \
+                    b"\n".join(lines)
+            header = parsed
+            record_offset, record_line = position, line + line_number - 1
+            lines = []
+        lines.append(text)
+        position += len(text) + 1
+    if lines:
+        position = min(position, f.tell())  # the last line may lack a line break
+        yield LogRecord(record_offset, position - record_offset, record_line, len(lines), *header), \
+            b"\n".join(lines)
+
+
+def search_records(f: BinaryIO, query: LogQuery,
+                   token: CancellationToken | None = None) -> Iterator[tuple[LogRecord, bytes]]:
+    """
+    Yields the records of the file matching the query. Unlike `search_file`, the pattern is matched
+    against the whole record, so that a record is found by any of its lines.
+    """
+    for record, data in iter_records(f, token=token):
+        if query.filters_records:
+            if record.level is None or not query.record_matches(data.split(b"\n", 1)[0], record.level):
+                continue
+        if query.pattern is None or query.pattern.search(data) is not None:
+            yield record, data
+
+
+def stream_record_results(filename: str, query: LogQuery, limit: int = MAX_QUERY_MATCHES,
+                          batch_size: int = 100) -> Iterator[bytes]:
+    """
+    Searches the log file and yields the matching records encoded as JSON lines,
+    each an object with the fields of the record and its text.
+    """
+    def scan(f: BinaryIO) -> Iterator[dict]:
+        for record, data in search_records(f, query):
+            yield {**record.as_dict(), "text": data.decode('utf-8', errors='replace')}
+
+    return stream_matches(filename, scan, limit, batch_size)
+
+
+def next_record_header(f: BinaryIO, offset: int, limit: int,
+                       parse: Callable[[bytes], tuple[int, bytes | None] | None] = parse_header
+                       ) -> tuple[int, bytes] | None:
+    """
+    Returns the offset and timestamp key of the first record header with a timestamp starting at or after the
+    given byte offset, which need not be the start of a line, or None if there is none before limit.
+    """
+    f.seek(max(0, offset - 1))
+    if offset > 0:
+        f.readline()  # resync to the start of the next line
+    position = f.tell()
+    while position < limit:
+        line = f.readline()
+        if not line:
+            return None
+        header = parse(line.rstrip(b"\n"))
+        if header is not None and header[1] is not None:
+            return position, header[1]
+        position += len(line)
+    return None
+
+
+def seek_timestamp(f: BinaryIO, size: int, key: bytes,
+                   parse: Callable[[bytes], tuple[int, bytes | None] | None] = parse_header,
+                   bisect: bool = True) -> tuple[int, bytes | None]:
+    """
+    Returns the offset and timestamp key of the first record at or after the given timestamp key,
+    or the size of the file and None if all records are older.
+    As the records of a log file are ordered by time, the file is binary searched, i.e. only O(log n) probes
+    of the file are read, each resynced to the next record header, before the last CHUNK_SIZE bytes are scanned.
+    Without bisect, the file is scanned from the start, e.g. for streams that cannot seek backwards cheaply.
+    """
+    low, high = 0, size
+    while bisect and high - low > CHUNK_SIZE:
+        middle = (low + high) // 2
+        found = next_record_header(f, middle, high, parse)
+        if found is None or found[1] >= key:
+            high = middle  # the first record at or after high is not older than key
+        else:
+            low = found[0] + 1
+    f.seek(max(0, low - 1))
+    if low > 0:
+        f.readline()  # resync to the start of the next line
+    position = f.tell()
+    while line := f.readline():
+        header = parse(line.rstrip(b"\n"))
+        if header is not None and header[1] is not None and header[1] >= key:
+            return position, header[1]
+        position += len(line)
+    return size, None
+
+
+def get_record_window(f: BinaryIO, offset: int, size: int, before: int, after: int,
+                      parse: Callable[[bytes], tuple[int, bytes | None] | None] = parse_header
+                      ) -> tuple[int, int]:
+    """
+    Returns the start and end offset of the window of the given number of records before and after
+    the record starting at offset. The window extends at most MAX_TAIL_BYTES in each direction.
+    """
+    start, span = offset, CHUNK_SIZE
+    while before > 0 and offset > 0:
+        block_start = max(0, offset - span)
+        f.seek(block_start)
+        lines = f.read(offset - block_start).split(b"\n")[:-1]
+        position = block_start
+        if block_start > 0:
+            position += len(lines.pop(0)) + 1  # skip the partial line
+        headers = []
+        for line in lines:
+            if parse(line) is not None:
+                headers.append(position)
+            position += len(line) + 1
+        if len(headers) >= before:
+            start = headers[-before]
+        elif block_start == 0:
+            start = 0
+        elif span >= MAX_TAIL_BYTES:
+            start = headers[0] if headers else offset
+        else:
+            span *= 2
+            continue
+        break
+    f.seek(offset)
+    end, count = offset, 0
+    while end < size and end - offset < MAX_TAIL_BYTES:
+        line = f.readline()
+        if not line:
+            break
+        if parse(line.rstrip(b"\n")) is not None:
+            count += 1
+            if count > after:
+                break
+        end += len(line)
+    return start, end
+
+
+class RecordIndex:
+    """
+    Line numbers, byte offsets and levels of the records of a log file, stored in compact arrays.
+    Like the line index, the record index is built once, extended incrementally as the file grows
+    and rebuilt from scratch if the file has been rotated or truncated. Only complete lines are indexed.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.reset(None)
+
+    def reset(self, inode: int | None) -> None:
+        self.inode = inode
+        self.position = 0
+        self.line_count = 0
+        self.lines = array('Q')
+        self.offsets = array('Q')
+        self.levels = array('h')
+
+    @property
+    def record_count(self) -> int:
+        return len(self.lines)
+
+    def update(self) -> os.stat_result:
+        """
+        Brings the index up to date with the log file and returns the file's stat result.
+        """
+        with self.lock, open_logfile(self.filename) as f:
+            stat = os.fstat(f.fileno())
+            if is_compressed(self.filename):
+                if stat.st_ino == self.inode:
+                    return stat  # compressed backups are not written to
+                self.reset(stat.st_ino)
+            elif stat.st_ino != self.inode or was_truncated(f, stat, self.position):
+                self.reset(stat.st_ino)
+            with map_logfile(f) as buffer:
+                if buffer is not None:
+                    self.index_buffer(buffer)
+                    return stat
+            f.seek(self.position)
+            remainder = b""
+            while chunk := f.read(CHUNK_SIZE):
+                lines = (remainder + chunk).split(b"\n")
+                remainder = lines.pop()
+                for line in lines:
+                    self.line_count += 1
+                    header = parse_header(line) if b"[LVL:" in line else None
+                    if header is not None or not self.lines:
+                        self.add_record(self.line_count, self.position, header[0] if header else -1)
+                    self.position += len(line) + 1
+        return stat
+
+    def index_buffer(self, buffer: mmap.mmap) -> None:
+        """
+        Indexes the complete lines of the memory-mapped file following position, finding the records
+        by their `[LVL:NN]` prefix and counting the lines in between rather than splitting them.
+        """
+        end = buffer.rfind(b"\n", self.position) + 1
+        for line_start, _, level in iter_header_lines(buffer, self.position, end):
+            if not self.lines and line_start > 0:
+                self.add_record(1, 0, -1)  # the lines preceding the first header
+            self.line_count += count_lines(buffer, self.position, line_start)
+            self.position = line_start
+            self.add_record(self.line_count + 1, line_start, level)
+        if not self.lines and end > 0:
+            self.add_record(1, 0, -1)
+        self.line_count += count_lines(buffer, self.position, end)
+        self.position = max(self.position, end)
+
+    def add_record(self, line: int, offset: int, level: int) -> None:
+        self.lines.append(line)
+        self.offsets.append(offset)
+        self.levels.append(level)
+
+    def find_record(self, line_number: int) -> int:
+        """
+        Returns the index of the record containing the line with the given one-based number.
+        """
+        return max(0, bisect_right(self.lines, line_number) - 1)
+
+    def get_record_lines(self, index: int) -> tuple[int, int]:
+        """
+        Returns the numbers of the first and the last line of the record with the given index.
+        """
+        last = self.lines[index + 1] - 1 if index + 1 < len(self.lines) else self.line_count
+        return self.lines[index], last
+
+    def align_window(self, start: int, end: int, max_lines: int) -> tuple[int, int]:
+        """
+        Widens the window of lines start to end so that it neither starts nor ends within a record,
+        as far as the window does not exceed max_lines lines. If the record containing the start line
+        does not fit, the window starts at the following record instead.
+        """
+        with self.lock:
+            if not self.lines or start > self.line_count:
+                return start, end
+            index = self.find_record(start)
+            first, last = self.get_record_lines(index)
+            if first < start:
+                if end - first < max_lines:
+                    start = first
+                elif last < end:
+                    start = last + 1
+            if end <= self.line_count:
+                last = self.get_record_lines(self.find_record(end))[1]
+                if last - start < max_lines:
+                    end = last
+        return start, end
+
+
+_record_indexes: dict[str, RecordIndex] = {}
+_record_indexes_lock = threading.Lock()
+
+
+def get_record_index(filename: str) -> RecordIndex:
+    """
+    Returns the up-to-date record index of the given log file, building it if necessary.
+    """
+    with _record_indexes_lock:
+        record_index = _record_indexes.get(filename)
+        metrics.count_cache("records", record_index is not None)
+        if record_index is None:
+            record_index = _record_indexes[filename] = RecordIndex(filename)
+    with timed("index"):
+        record_index.update()
+    return record_index
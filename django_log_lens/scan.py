@@ -0,0 +1,109 @@
+import io
+import mmap
+import re
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+from django.conf import settings
+
+from .files import CHUNK_SIZE
+
+LEVEL_PATTERN = re.compile(rb"\[LVL:(\d+)\]")
+HEADER_LINE_PATTERN = re.compile(rb"^[^\n]*?\[LVL:(\d+)\][^\n]*", re.MULTILINE)
+COUNT_BLOCK_SIZE = 16 * CHUNK_SIZE
+
+
+@contextmanager
+def map_logfile(f: BinaryIO, enabled: bool | None = None) -> Iterator[mmap.mmap | None]:
+    """
+    Memory-maps the open log file for reading, so that it can be scanned with regular expressions
+    and `find` at page cache speed without reading it into memory.
+    Yields None if the file cannot be mapped, i.e. for compressed backups and empty files,
+    or if mapping is disabled with LOG_LENS_MMAP = False (unless enabled is given). The mapping covers
+    the file as it was when mapped, lines appended afterwards are not scanned.
+    """
+    if enabled is None:
+        enabled = getattr(settings, 'LOG_LENS_MMAP', True)
+    if not enabled or not isinstance(f, io.BufferedReader):
+        yield None
+        return
+    try:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):  # empty files cannot be mapped
+        yield None
+        return
+    try:
+        yield buffer
+    finally:
+        buffer.close()
+
+
+def count_lines(buffer: mmap.mmap, start: int, end: int) -> int:
+    """
+    Returns the number of line breaks between the byte offsets start and end (exclusive),
+    copying at most COUNT_BLOCK_SIZE bytes at a time.
+    """
+    count = 0
+    for position in range(start, end, COUNT_BLOCK_SIZE):
+        count += buffer[position:min(end, position + COUNT_BLOCK_SIZE)].count(b"\n")
+    return count
+
+
+def get_line_end(buffer: mmap.mmap, position: int) -> int:
+    """
+    Returns the offset of the line break ending the line at position or the size of the buffer.
+    """
+    end = buffer.find(b"\n", position)
+    return len(buffer) if end < 0 else end
+
+
+def iter_header_lines(buffer: mmap.mmap, start: int = 0, end: int | None = None) -> Iterator[tuple[int, int, int]]:
+    """
+    Yields the start and end offsets and the level of the lines with a `[LVL:NN]` prefix between
+    the offsets start (the start of a line) and end, finding them without splitting the lines in between.
+    """
+    for match in HEADER_LINE_PATTERN.finditer(buffer, start, len(buffer) if end is None else end):
+        yield match.start(), match.end(), int(match.group(1))
+
+
+def find_last_header_line(buffer: mmap.mmap, start: int, end: int) -> tuple[int, int] | None:
+    """
+    Returns the start and end offsets of the last line with a `[LVL:NN]` prefix among the lines starting
+    between the offsets start (the start of a line) and end, or None if there is none.
+    """
+    position = end
+    while (found := buffer.rfind(b"[LVL:", start, position)) >= 0:
+        line_start = buffer.rfind(b"\n", start, found) + 1 or start
+        line_end = get_line_end(buffer, found)
+        if LEVEL_PATTERN.search(buffer, line_start, line_end) is not None:
+            return line_start, line_end
+        position = line_start
+    return None
+
+
+def get_line_pattern(pattern: re.Pattern) -> re.Pattern | None:
+    """
+    Returns the pattern to find candidates for lines matching the given pattern in a whole buffer,
+    i.e. with `^` and `$` matching at the start and end of each line, or None if the pattern
+    is anchored to the start or end of the text (`\\A`, `\\Z`) and has to be matched line by line.
+    """
+    if rb"\A" in pattern.pattern or rb"\Z" in pattern.pattern:
+        return None
+    return re.compile(pattern.pattern, pattern.flags | re.MULTILINE)
+
+
+def iter_matching_lines(buffer: mmap.mmap, pattern: re.Pattern, line_pattern: re.Pattern,
+                        start: int = 0) -> Iterator[tuple[int, int]]:
+    """
+    Yields the start and end offsets of the lines matching the pattern, see `get_line_pattern`.
+    The buffer is searched for the next candidate rather than split into lines,
+    each candidate is confirmed by matching the pattern against its line.
+    """
+    size = len(buffer)
+    position = start
+    while position < size and (match := line_pattern.search(buffer, position)) is not None:
+        line_start = buffer.rfind(b"\n", position, match.start()) + 1 or position
+        line_end = get_line_end(buffer, match.start())
+        if pattern.search(buffer[line_start:line_end]) is not None:
+            yield line_start, line_end
+        position = line_end + 1
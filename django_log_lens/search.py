@@ -0,0 +1,168 @@
+import heapq
+import multiprocessing
+import os
+import threading
+from concurrent.futures import (FIRST_COMPLETED, Executor, Future,
+                                ProcessPoolExecutor, ThreadPoolExecutor, wait)
+from itertools import chain
+from typing import NamedTuple
+
+from django.conf import settings
+
+from .cache import get_file_identity, result_cache
+from .compressed import open_logfile
+from .files import CHUNK_SIZE
+from .handlers import LogHandlerInfo
+from .query import (MAX_QUERY_MATCHES, TIMESTAMP_PATTERN, CancellationToken,
+                    LogQuery, search_file, timestamp_key)
+
+DEFAULT_SEARCH_TIMEOUT = 30.0
+MATCH_OVERHEAD = 200  # approximate size of a cached match besides its text and path
+
+
+class SearchMatch(NamedTuple):
+    """
+    A line matching a search. Matches are ordered by the timestamp of their record.
+    """
+    timestamp: str
+    handler_name: str
+    path: str
+    line: int
+    text: str
+
+
+class SearchResult(NamedTuple):
+    matches: list[SearchMatch]
+    truncated: bool
+    cancelled: bool
+    paths: list[str]
+
+
+def search_path(handler_name: str, path: str, query: LogQuery, limit: int,
+                token: CancellationToken, use_mmap: bool = True) -> list[SearchMatch]:
+    """
+    Searches a single log file and returns the matches in the order of the file.
+    At most limit + 1 matches are returned so that the caller can tell whether there are more.
+    The settings are read by the caller, as worker processes may not have configured them.
+    """
+    matches = []
+    try:
+        with open_logfile(path) as f:
+            for line_number, line, header in search_file(f, query, token, use_mmap):
+                if len(matches) > limit:
+                    break
+                timestamp_match = TIMESTAMP_PATTERN.search(header)
+                timestamp = timestamp_key(*timestamp_match.groups()).decode() if timestamp_match else ""
+                matches.append(SearchMatch(timestamp, handler_name, path, line_number,
+                                           line.decode('utf-8', errors='replace')))
+    except (OSError, EOFError):
+        pass  # the file has been removed by a rollover or is corrupted
+    return matches
+
+
+def first_timestamp(path: str) -> str:
+    """
+    Returns the timestamp of the record starting the log file, or an empty string if it does not start with one.
+    As the records are ordered by time, no match in the file has an earlier timestamp.
+    """
+    try:
+        with open_logfile(path) as f:
+            match = TIMESTAMP_PATTERN.search(f.readline(CHUNK_SIZE))
+    except (OSError, EOFError):
+        return ""
+    return timestamp_key(*match.groups()).decode() if match else ""
+
+
+_executor: Executor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_worker_count() -> int:
+    return getattr(settings, 'LOG_LENS_SEARCH_WORKERS', min(4, os.cpu_count() or 1))
+
+
+def get_executor() -> Executor:
+    """
+    Returns the pool shared by all searches so that concurrent searches cannot occupy more than
+    LOG_LENS_SEARCH_WORKERS workers. Set LOG_LENS_SEARCH_EXECUTOR to "process" to scan files
+    in worker processes instead of threads. Worker processes are spawned rather than forked on all platforms,
+    forking a process running threads is unsafe.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            max_workers = get_worker_count()
+            if getattr(settings, 'LOG_LENS_SEARCH_EXECUTOR', 'thread') == 'process':
+                _executor = ProcessPoolExecutor(max_workers=max_workers,
+                                                mp_context=multiprocessing.get_context('spawn'))
+            else:
+                _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='log-lens-search')
+        return _executor
+
+
+def search_logfiles(handlers: list[LogHandlerInfo], query: LogQuery, limit: int = MAX_QUERY_MATCHES,
+                    include_rotated: bool = True, token: CancellationToken | None = None) -> SearchResult:
+    """
+    Searches the log files of the given handlers and, optionally, their rotated backups in parallel.
+    Returns at most limit matches, merged by the timestamp of their records.
+    The matches per file are cached, so that rotated backups are only searched once per query.
+    Files are searched in the order of their first record. No more files are started once more than limit matches
+    have been found, the last one returned being older than the first record of the next file.
+    The search stops once the token is cancelled or the timeout (LOG_LENS_SEARCH_TIMEOUT) has expired.
+    """
+    if token is None:
+        token = CancellationToken(getattr(settings, 'LOG_LENS_SEARCH_TIMEOUT', DEFAULT_SEARCH_TIMEOUT))
+    targets = []
+    for info in handlers:
+        try:
+            handler_query = query.for_format(info.log_format)
+        except ValueError:
+            continue  # the records of the handler cannot be filtered by logger name
+        targets.append((info.name, info.path, handler_query))
+        if include_rotated:
+            targets.extend((info.name, path, handler_query) for path in info.find_backups())
+    use_mmap = getattr(settings, 'LOG_LENS_MMAP', True)
+    results = []
+    pending = []
+    for handler_name, path, handler_query in targets:
+        key = ("search", handler_name, handler_query.cache_key, limit)
+        try:
+            identities = (get_file_identity(path),)
+        except OSError:
+            continue  # the file has been removed by a rollover
+        matches = result_cache.get(identities, key)
+        if matches is None:
+            pending.append((first_timestamp(path), identities, key, handler_name, path, handler_query))
+        else:
+            results.append(matches)
+    # files are searched from the oldest on, so that the newer ones can be skipped once enough matches are found
+    pending.sort(key=lambda search: search[0])
+    pending.reverse()
+    timestamps = heapq.nsmallest(limit + 1, (match.timestamp for matches in results for match in matches))
+    executor, worker_count = get_executor(), get_worker_count()
+    running: dict[Future, tuple] = {}
+    try:
+        while pending or running:
+            while pending and len(running) < worker_count and not token.cancelled:
+                if len(timestamps) > limit and pending[-1][0] > timestamps[max(limit - 1, 0)]:
+                    pending.clear()  # all matches of the remaining files would be cut off
+                    break
+                _, identities, key, handler_name, path, handler_query = pending.pop()
+                future = executor.submit(search_path, handler_name, path, handler_query, limit, token, use_mmap)
+                running[future] = (identities, key)
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                identities, key = running.pop(future)
+                matches = future.result()
+                if not token.cancelled:  # the matches of a cancelled search may be incomplete
+                    size = sum(len(match.text) + len(match.path) + MATCH_OVERHEAD for match in matches)
+                    result_cache.put(identities, key, matches, size)
+                results.append(matches)
+                timestamps = heapq.nsmallest(limit + 1, chain(timestamps, (match.timestamp for match in matches)))
+    finally:
+        for future in running:
+            future.cancel()
+    merged = list(heapq.merge(*results, key=lambda match: match.timestamp))
+    return SearchResult(merged[:limit], len(merged) > limit, token.cancelled, [path for _, path, _ in targets])
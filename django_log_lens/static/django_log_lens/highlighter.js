@@ -0,0 +1,138 @@
+"use strict";
+/**
+ * Tokenizes log lines for highlighting. Runs as a Web Worker so that large log files are highlighted
+ * in chunks without blocking the page, but can also be loaded as a regular script to tokenize lines
+ * on the main thread if workers are not available.
+ */
+
+const HIGHLIGHT_CHUNK_SIZE = 2000;
+const LEVEL_PREFIX_PATTERN = /\[LVL:(\d+)\]/;
+const DOUBLE_QUOTED_PATTERN = /"([^"]+)"/g;
+const SINGLE_QUOTED_PATTERN = /'([^']+)'/g;
+const TRACEBACK_LINE_NUMBER_PATTERN = /, line \b(\d+)\b,/g;
+const CONTAINS_URL_PATTERN = /\bhttps?:\/\/[^/]+(\/[^/]+)\b/;
+const URL_PATTERN = /\bhttps?:\/\/[^/]+(\/[^/]+)*\b(?=\))/g;
+
+const TOKEN_LEVEL_PREFIX = 0;
+const TOKEN_DOUBLE_QUOTED = 1;
+const TOKEN_SINGLE_QUOTED = 2;
+const TOKEN_URL = 3;
+
+/**
+ * Finds the tokens to be highlighted in the given line.
+ * Each token is a [start, end, type] triple, quoted tokens span the text between the quotes.
+ * The link points to the source code referenced by the line, i.e. the file and line number
+ * of a traceback line or a URL.
+ * @param {string} line
+ * @returns {{level: number, tokens: number[][], link: (string | null)[] | null}}
+ */
+function findTokens(line) {
+  const tokens = [];
+  let level = -1;
+  let link = null;
+  const prefixMatch = LEVEL_PREFIX_PATTERN.exec(line);
+  if (prefixMatch) {
+    level = parseInt(prefixMatch[1]);
+    tokens.push([prefixMatch.index, prefixMatch.index + prefixMatch[0].length, TOKEN_LEVEL_PREFIX]);
+  }
+  const doubleQuotedMatches = Array.from(line.matchAll(DOUBLE_QUOTED_PATTERN));
+  if (doubleQuotedMatches.length > 0) {
+    for (let match of doubleQuotedMatches) {
+      tokens.push([match.index + 1, match.index + match[0].length - 1, TOKEN_DOUBLE_QUOTED]);
+    }
+    const lineNumberMatches = Array.from(line.matchAll(TRACEBACK_LINE_NUMBER_PATTERN));
+    if (lineNumberMatches.length > 0) {
+      link = [doubleQuotedMatches[doubleQuotedMatches.length - 1][1], lineNumberMatches[lineNumberMatches.length - 1][1]];
+    }
+  } else if (CONTAINS_URL_PATTERN.test(line)) {
+    for (let match of line.matchAll(URL_PATTERN)) {
+      tokens.push([match.index, match.index + match[0].length, TOKEN_URL]);
+      link = link || [match[0], null];
+    }
+  }
+  for (let match of line.matchAll(SINGLE_QUOTED_PATTERN)) {
+    tokens.push([match.index + 1, match.index + match[0].length - 1, TOKEN_SINGLE_QUOTED]);
+  }
+  tokens.sort((a, b) => a[0] - b[0]);
+  const disjointTokens = [];
+  let end = 0;
+  for (let token of tokens) {
+    if (token[0] >= end) {
+      disjointTokens.push(token);
+      end = token[1];
+    }
+  }
+  return { level, tokens: disjointTokens, link };
+}
+
+/**
+ * Tokenizes the given lines into a flat token stream backed by transferable buffers:
+ * - levels: the level of each line as given by its [LVL:XX] prefix, -1 if the line has no prefix
+ * - offsets: the tokens of line i are tokens[offsets[i]] to tokens[offsets[i + 1]] (exclusive)
+ * - tokens: [start, end, type] triples
+ * - links: the source code referenced by each line, if any
+ * @param {string[]} lines
+ * @returns {{levels: Int16Array, offsets: Uint32Array, tokens: Uint32Array, links: Array}}
+ */
+function tokenizeLines(lines) {
+  const levels = new Int16Array(lines.length);
+  const offsets = new Uint32Array(lines.length + 1);
+  const tokenList = [];
+  const links = [];
+  for (let i = 0; i < lines.length; i++) {
+    const { level, tokens, link } = findTokens(lines[i]);
+    levels[i] = level;
+    for (let token of tokens) {
+      tokenList.push(token[0], token[1], token[2]);
+    }
+    offsets[i + 1] = tokenList.length;
+    links.push(link);
+  }
+  return { levels, offsets, tokens: Uint32Array.from(tokenList), links };
+}
+
+if (typeof WorkerGlobalScope !== "undefined" && self instanceof WorkerGlobalScope) {
+  const jobs = [];
+  let cancelledGeneration = -1;
+  let isRunning = false;
+
+  /**
+   * Tokenizes the next chunk of the oldest job and posts the result.
+   * Yields to the event loop after each chunk so that cancellations are received in time.
+   * @returns {void}
+   */
+  const processNextChunk = () => {
+    while (jobs.length > 0 && jobs[0].generation <= cancelledGeneration) {
+      jobs.shift();
+    }
+    if (jobs.length === 0) {
+      isRunning = false;
+      return;
+    }
+    const job = jobs[0];
+    const lines = job.lines.slice(job.position, job.position + HIGHLIGHT_CHUNK_SIZE);
+    const result = tokenizeLines(lines);
+    self.postMessage(
+      { generation: job.generation, startIndex: job.startIndex + job.position, count: lines.length, ...result },
+      [result.levels.buffer, result.offsets.buffer, result.tokens.buffer]
+    );
+    job.position += lines.length;
+    if (job.position >= job.lines.length) {
+      jobs.shift();
+    }
+    setTimeout(processNextChunk, 0);
+  };
+
+  self.onmessage = (event) => {
+    const message = event.data;
+    if (message.type === "cancel") {
+      cancelledGeneration = Math.max(cancelledGeneration, message.generation);
+      return;
+    }
+    jobs.push({ generation: message.generation, startIndex: message.startIndex, lines: message.lines, position: 0 });
+    if (!isRunning) {
+      isRunning = true;
+      setTimeout(processNextChunk, 0);
+    }
+  };
+}
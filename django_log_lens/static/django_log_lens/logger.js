@@ -31,11 +31,16 @@ function getStackTrace() {
  * and the logs can be sent to the server.
  */
 const logLensLogger = {
+  buffer: [],
   csrfToken: getCSRFToken(),
+  flushDelay: 1000, // milliseconds
+  flushTimeoutId: null,
   isEnabled: true,
+  maxBatchSize: 50,
 
   /**
-   * Sends the log message to the server with the given severity level.
+   * Buffers the log message with the given severity level. The buffer is sent to the server in a single batch
+   * once it is full or after the flush delay, whichever comes first.
    * @param {string} message Log message
    * @param {string} level Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
    * @returns {void}
@@ -44,24 +49,71 @@ const logLensLogger = {
     if (!logLensLogger.isEnabled) {
       return;
     }
+    logLensLogger.buffer.push({ log_message: message, severity: level });
+    if (logLensLogger.buffer.length >= logLensLogger.maxBatchSize) {
+      logLensLogger.flush();
+    } else if (!logLensLogger.flushTimeoutId) {
+      logLensLogger.flushTimeoutId = setTimeout(logLensLogger.flush, logLensLogger.flushDelay);
+    }
+  },
+
+  /**
+   * Takes all buffered log entries out of the buffer.
+   * @returns {Array<{log_message: string, severity: string}>} Buffered log entries
+   */
+  takeBuffer: function () {
+    clearTimeout(logLensLogger.flushTimeoutId);
+    logLensLogger.flushTimeoutId = null;
+    return logLensLogger.buffer.splice(0, logLensLogger.buffer.length);
+  },
+
+  /**
+   * Sends the buffered log entries to the server.
+   * Entries rejected due to the rate limit are dropped, any other error disables the logger.
+   * @returns {void}
+   */
+  flush: function () {
+    const batch = logLensLogger.takeBuffer();
+    if (!logLensLogger.isEnabled || batch.length === 0) {
+      return;
+    }
     // @ts-ignore
     fetch(LOG_LENS_POST_API, {
       method: "POST",
       headers: { "X-CSRFToken": logLensLogger.csrfToken, "Content-Type": "application/json" },
-      body: JSON.stringify({ log_message: message, severity: level }),
+      body: JSON.stringify(batch),
     })
       .then((response) => {
-        if (response.status >= 400) {
-          console.error(`Error sending log to server (${getStackTrace()})`, response);
+        if (response.status === 429) {
+          logLensLogger.logWarning(`Client log rate limit exceeded, ${batch.length} log entries dropped`);
+        } else if (response.status >= 400) {
           logLensLogger.isEnabled = false;
+          console.error(`Error sending log to server (${getStackTrace()})`, response);
         }
       })
       .catch((error) => {
-        console.error(`Error sending log to server (${getStackTrace()})`, error);
         logLensLogger.isEnabled = false;
+        console.error(`Error sending log to server (${getStackTrace()})`, error);
       });
   },
 
+  /**
+   * Sends the buffered log entries with a beacon, which is delivered even if the page is being unloaded.
+   * As beacons cannot carry headers, the CSRF token is sent as form field.
+   * @returns {void}
+   */
+  flushOnUnload: function () {
+    const batch = logLensLogger.takeBuffer();
+    if (!logLensLogger.isEnabled || batch.length === 0) {
+      return;
+    }
+    const formData = new FormData();
+    formData.append("csrfmiddlewaretoken", logLensLogger.csrfToken);
+    formData.append("logs", JSON.stringify(batch));
+    // @ts-ignore
+    navigator.sendBeacon(LOG_LENS_POST_API, formData);
+  },
+
   /**
    * Handles uncaught errors - sends the error to the server.
    * @param {ErrorEvent} errorEvent
@@ -152,3 +204,9 @@ console.assert = function () {
 };
 
 window.addEventListener("error", logLensLogger.errorHandler);
+window.addEventListener("pagehide", logLensLogger.flushOnUnload);
+document.addEventListener("visibilitychange", () => {
+  if (document.visibilityState === "hidden") {
+    logLensLogger.flushOnUnload();
+  }
+});
@@ -1,14 +1,30 @@
 "use strict";
-const MAX_LINE_COUNT = 99999;
+const HIGHLIGHT_PROGRESS_THRESHOLD = 50000; // show the progress of highlighting files with more lines
+const MAX_LISTED_TEMPLATES = 20;
+const MAX_LOADED_LINES = 1000000; // larger log files are paged through windows of PAGE_SIZE lines
+const OVERSCAN_LINES = 50;
+const PAGE_SIZE = 10000;
+const LOG_CACHE_DB_NAME = "django-log-lens";
+const LOG_CACHE_STORE_NAME = "logfiles";
+const MAX_CACHED_LOGFILES = 10;
+const MAX_CACHED_LOGFILE_LENGTH = 32 * 1024 * 1024; // characters of log text kept per log file in IndexedDB
+const POLLING_CHANNEL_NAME = "django-log-lens-polling";
+const POLLING_LOCK_NAME = "django-log-lens-poller";
+const POLLING_SUBSCRIPTION_TIMEOUT = 3; // polling intervals after which a tab that stopped subscribing is dropped
 
 const btnAutoRefresh = document.getElementById("btn-auto-refresh");
 const divLogContent = document.getElementById("div-log-content");
 const divMessageToast = document.getElementById("div-message-toast");
 const divOverlay = document.getElementById("div-overlay");
+const divPageNavigation = document.getElementById("div-page-navigation");
 const divPrompt = document.getElementById("div-prompt");
 const divToolbar = document.getElementById("div-toolbar");
 const divToolbarExtension = document.getElementById("div-toolbar-extension");
 const h3LogfileName = document.getElementById("h3-logfile-name");
+const inputFilterLogger = /** @type {HTMLInputElement} */ (document.getElementById("input-filter-logger"));
+const inputFilterPattern = /** @type {HTMLInputElement} */ (document.getElementById("input-filter-pattern"));
+const inputFilterSince = /** @type {HTMLInputElement} */ (document.getElementById("input-filter-since"));
+const inputFilterUntil = /** @type {HTMLInputElement} */ (document.getElementById("input-filter-until"));
 const inputPathPrefix = /** @type {HTMLInputElement} */ (document.getElementById("input-path-prefix"));
 const inputPathSplitter = /** @type {HTMLInputElement} */ (document.getElementById("input-path-splitter"));
 const inputPrompt = /** @type {HTMLInputElement} */ (document.getElementById("input-prompt"));
@@ -16,7 +32,9 @@ const pMessageToastText = document.getElementById("p-message-toast-text");
 const pPromptText = document.getElementById("p-prompt-text");
 const preLineCounter = document.getElementById("pre-line-counter");
 const preLogContent = document.getElementById("pre-log-content");
+const selectFilterLevel = /** @type {HTMLSelectElement} */ (document.getElementById("select-filter-level"));
 const tableFilePaths = document.getElementById("table-file-paths");
+const tableTemplates = document.getElementById("table-templates");
 const tdErrorCountElem = document.getElementById("td-number-of-errors");
 const tdHandlerName = document.getElementById("td-handler-name");
 const tdLineCounter = document.getElementById("td-number-of-lines");
@@ -27,10 +45,15 @@ const HTML_ELEMENTS = [
   divLogContent,
   divMessageToast,
   divOverlay,
+  divPageNavigation,
   divPrompt,
   divToolbar,
   divToolbarExtension,
   h3LogfileName,
+  inputFilterLogger,
+  inputFilterPattern,
+  inputFilterSince,
+  inputFilterUntil,
   inputPathPrefix,
   inputPathSplitter,
   inputPrompt,
@@ -38,7 +61,9 @@ const HTML_ELEMENTS = [
   pPromptText,
   preLineCounter,
   preLogContent,
+  selectFilterLevel,
   tableFilePaths,
+  tableTemplates,
   tdErrorCountElem,
   tdHandlerName,
   tdLineCounter,
@@ -51,12 +76,44 @@ for (let elem of HTML_ELEMENTS) {
 
 const state = {
   currentError: -1,
+  cursor: null,
   errorCounter: 0,
+  errorLines: [], // indexes of the lines starting an error record
+  etag: null,
+  eventSource: null,
   filePaths: {},
+  filter: null,
+  firstLineNumber: 1,
+  highlightedCount: 0,
+  highlightedLine: -1,
+  highlighter: null,
+  highlightGeneration: 0,
   lastLogDataTimeStamp: -1,
   lastSelectedHandlerName: "",
+  lineCount: 0,
+  lineHeight: 0,
+  lineLevels: [], // level of the record each line belongs to, -1 if unknown
+  lineNumbers: null, // original line numbers if the lines are not consecutive, e.g. search results
+  lines: [],
+  liveTailUnsupported: false,
+  logCache: null, // promise of the IndexedDB database keeping the fetched log files, null if unavailable
+  logCacheTimeOutId: null,
+  page: null,
+  pollingChannel: null, // BroadcastChannel shared by the open tabs of the viewer
+  pollingIntervalId: null,
+  pollingLeader: false, // whether this tab polls the log files on behalf of all tabs
+  pollingLeaderIntervalId: null,
+  pollingSubscriptions: {}, // tab id -> handler name and time of the last subscription, kept by the leader
+  renderedViewport: "",
+  renderRequested: false,
+  renderVersion: 0,
+  summary: null, // level counts and error records of the whole log file as returned by the server
+  tabId: Math.random().toString(36).slice(2),
+  templatesVisible: false,
   timeout: 5000,
   timeOutId: null,
+  timestampEtags: {}, // handler name -> entity tag of the last timestamp response
+  tokenChunks: [], // token streams of the highlighted lines in the order of the lines
   warningCounter: 0,
 };
 
@@ -187,6 +244,7 @@ function bindingObserverFn(obj, objProp) {
  * Sets up the keydown event listeners for the overlay and the window
  * so that the user can confirm or cancel the prompt with the Enter or Escape key.
  * Also sets up the keydown event listener for the window so that the user can refresh the page with F5.
+ * Renders the visible log lines whenever the log content is scrolled or resized.
  * @returns {void}
  */
 function setUpEventListeners() {
@@ -204,6 +262,13 @@ function setUpEventListeners() {
       fetchLogfile();
     }
   });
+
+  divLogContent.addEventListener("scroll", requestRender, { passive: true });
+  window.addEventListener("resize", requestRender);
+  document.fonts.ready.then(() => {
+    state.lineHeight = 0; // the web font may change the line height
+    requestRender();
+  });
 }
 
 /**
@@ -216,7 +281,11 @@ function onRefreshBtnClick(btn) {
     btn.setAttribute("state", "off");
   } else {
     btn.setAttribute("state", "on");
+    if (state.cursor) {
+      fetchLogfileTail();
+    }
   }
+  updateLiveTail();
 }
 
 /**
@@ -300,8 +369,21 @@ function toggleToolbarExtensionVisibility(btn) {
   }
 }
 
+/**
+ * Returns the options for a conditional GET request which is answered with 304 Not Modified
+ * if the entity tag of the requested resource still matches the given one.
+ * The browser cache is bypassed so that a 304 response is passed through.
+ * @param {string | null} etag Entity tag of the last response, if any
+ * @returns {RequestInit}
+ */
+function conditionalRequestOptions(etag) {
+  return { cache: "no-store", headers: etag ? { "If-None-Match": etag } : {} };
+}
+
 /**
  * Fetches the timestamp of the log file to check if it has changed.
+ * The server answers with 304 Not Modified as long as the log file has not changed.
+ * A changed timestamp is passed on to the other tabs if this tab polls on behalf of all tabs.
  * @param {string=} handlerName
  * @returns {void}
  */
@@ -311,22 +393,219 @@ function requestLogfileTimestamp(handlerName) {
     return;
   }
   // @ts-ignore
-  fetch(requestLogfileTimestampURL + handlerName)
-    .then((response) => response.json())
+  fetch(requestLogfileTimestampURL + handlerName, conditionalRequestOptions(state.timestampEtags[handlerName]))
+    .then((response) => {
+      if (response.status === 304) {
+        return null;
+      }
+      state.timestampEtags[handlerName] = response.headers.get("ETag");
+      return response.json();
+    })
     .then((data) => {
-      if (data.timestamp !== state.lastLogDataTimeStamp && state.lastLogDataTimeStamp !== -1) {
-        if (btnAutoRefresh.getAttribute("state") === "on") {
-          fetchLogfile();
-        } else {
-          showMessageToast("Logfile has been changed\nClick refresh for an update", "yellow-color");
-        }
+      if (!data) {
+        return;
+      }
+      if (state.pollingLeader) {
+        state.pollingChannel.postMessage({ type: "timestamp", handlerName, timestamp: data.timestamp });
       }
+      onLogfileTimestamp(handlerName, data.timestamp);
     })
     .catch((error) => {
       console.error("Error requesting logfile timestamp:", error);
     });
 }
 
+/**
+ * Notifies the user or fetches the new log lines if the polled timestamp of the current log file has changed.
+ * @param {string} handlerName
+ * @param {string} timestamp
+ * @returns {void}
+ */
+function onLogfileTimestamp(handlerName, timestamp) {
+  if (handlerName !== state.lastSelectedHandlerName || !state.pollingIntervalId) {
+    return; // another log file is shown or its changes are pushed by the server
+  }
+  if (timestamp !== state.lastLogDataTimeStamp && state.lastLogDataTimeStamp !== -1) {
+    if (btnAutoRefresh.getAttribute("state") === "on") {
+      fetchLogfileTail();
+    } else {
+      showMessageToast("Logfile has been changed\nClick refresh for an update", "yellow-color");
+    }
+  }
+}
+
+/**
+ * Sets up polling shared by all open tabs of the viewer, so that the server is polled once per interval
+ * and log file rather than once per tab: the tabs subscribe to the log file they show via a BroadcastChannel,
+ * and the tab holding the polling lock (the leader) polls the subscribed log files and broadcasts their changes.
+ * The lock is passed on to another tab once the leader is closed.
+ * Each tab polls on its own if the browser lacks BroadcastChannel or the Web Locks API.
+ * @returns {void}
+ */
+function setUpSharedPolling() {
+  if (!window.BroadcastChannel || !navigator.locks) {
+    return;
+  }
+  state.pollingChannel = new BroadcastChannel(POLLING_CHANNEL_NAME);
+  state.pollingChannel.onmessage = (event) => {
+    const message = event.data;
+    if (message.type === "timestamp") {
+      onLogfileTimestamp(message.handlerName, message.timestamp);
+    } else if (state.pollingLeader) {
+      updatePollingSubscription(message.tabId, message.type === "subscribe" ? message.handlerName : "");
+    }
+  };
+  window.addEventListener("pagehide", () => {
+    state.pollingChannel.postMessage({ type: "unsubscribe", tabId: state.tabId });
+  });
+  navigator.locks.request(POLLING_LOCK_NAME, () => {
+    state.pollingLeader = true;
+    state.pollingLeaderIntervalId = setInterval(pollSubscribedLogfiles, 2 * state.timeout);
+    if (state.pollingIntervalId) {
+      subscribeToPolling();
+    }
+    return new Promise(() => {}); // hold the lock as long as the tab is open
+  });
+}
+
+/**
+ * Records the log file the given tab wants to be polled, an empty handler name drops the subscription.
+ * Only used by the leader.
+ * @param {string} tabId
+ * @param {string} handlerName
+ * @returns {void}
+ */
+function updatePollingSubscription(tabId, handlerName) {
+  if (handlerName) {
+    state.pollingSubscriptions[tabId] = { handlerName, time: Date.now() };
+  } else {
+    delete state.pollingSubscriptions[tabId];
+  }
+}
+
+/**
+ * Subscribes this tab to the polling of the current log file, or polls it right away without shared polling.
+ * @returns {void}
+ */
+function subscribeToPolling() {
+  if (!state.pollingChannel) {
+    requestLogfileTimestamp();
+  } else if (state.pollingLeader) {
+    updatePollingSubscription(state.tabId, state.lastSelectedHandlerName);
+  } else {
+    state.pollingChannel.postMessage({
+      type: "subscribe",
+      tabId: state.tabId,
+      handlerName: state.lastSelectedHandlerName,
+    });
+  }
+}
+
+/**
+ * Polls the timestamp of each log file subscribed to by any tab once. Only used by the leader.
+ * Subscriptions that have not been renewed for POLLING_SUBSCRIPTION_TIMEOUT intervals are dropped.
+ * @returns {void}
+ */
+function pollSubscribedLogfiles() {
+  const expired = Date.now() - POLLING_SUBSCRIPTION_TIMEOUT * 2 * state.timeout;
+  const handlerNames = new Set();
+  for (let [tabId, subscription] of Object.entries(state.pollingSubscriptions)) {
+    if (subscription.time < expired) {
+      delete state.pollingSubscriptions[tabId];
+    } else {
+      handlerNames.add(subscription.handlerName);
+    }
+  }
+  for (let handlerName of handlerNames) {
+    requestLogfileTimestamp(handlerName);
+  }
+}
+
+/**
+ * Starts polling the timestamp of the log file, unless already polling.
+ * With shared polling, this tab subscribes to the current log file instead.
+ * @returns {void}
+ */
+function startPolling() {
+  if (!state.pollingIntervalId) {
+    state.pollingIntervalId = setInterval(subscribeToPolling, 2 * state.timeout);
+  }
+  if (state.pollingChannel) {
+    subscribeToPolling(); // the current log file may have changed
+  }
+}
+
+/**
+ * Stops polling the timestamp of the log file.
+ * @returns {void}
+ */
+function stopPolling() {
+  clearInterval(state.pollingIntervalId);
+  state.pollingIntervalId = null;
+  if (state.pollingLeader) {
+    updatePollingSubscription(state.tabId, "");
+  } else if (state.pollingChannel) {
+    state.pollingChannel.postMessage({ type: "unsubscribe", tabId: state.tabId });
+  }
+}
+
+/**
+ * Closes the server-sent event stream of the current log file, if any.
+ * @returns {void}
+ */
+function stopLiveTail() {
+  if (state.eventSource) {
+    state.eventSource.close();
+    state.eventSource = null;
+  }
+}
+
+/**
+ * Subscribes to the lines appended to the current log file via server-sent events
+ * if the server and the current view support it. Falls back to polling otherwise,
+ * e.g. when searching or viewing an older page of the log file or when the server does not run under ASGI.
+ * @returns {void}
+ */
+function updateLiveTail() {
+  stopLiveTail();
+  const isLatestContent = state.cursor && !state.filter && (!state.page || state.page.end === state.page.total);
+  if (!window.EventSource || state.liveTailUnsupported || !isLatestContent) {
+    startPolling();
+    return;
+  }
+  stopPolling();
+  const handlerName = state.lastSelectedHandlerName;
+  // @ts-ignore
+  const source = new EventSource(
+    `${streamLogfileURL}${handlerName}&offset=${state.cursor.offset}&inode=${state.cursor.inode}`
+  );
+  source.addEventListener("append", (event) => {
+    if (btnAutoRefresh.getAttribute("state") !== "on") {
+      stopLiveTail(); // the log content is outdated now, stop listening until the next refresh
+      showMessageToast("Logfile has been changed\nClick refresh for an update", "yellow-color");
+      return;
+    }
+    const data = JSON.parse(event.data);
+    state.cursor = data.cursor;
+    state.lastLogDataTimeStamp = data.timestamp;
+    appendLogText(data.text);
+  });
+  source.addEventListener("resync", () => {
+    stopLiveTail();
+    state.cursor = null;
+    state.lastLogDataTimeStamp = -1;
+    fetchLogfile(handlerName, false);
+  });
+  source.onerror = () => {
+    if (source.readyState === EventSource.CLOSED) {
+      state.liveTailUnsupported = true; // e.g. the server responded with 204 No Content
+      state.eventSource = null;
+      startPolling();
+    }
+  };
+  state.eventSource = source;
+}
+
 /**
  * Renders the file path table that displays the handler name and the file path and
  * allows the user to load the log file or clear it.
@@ -344,6 +623,9 @@ function renderFilePathTable(data) {
     tdLoad.innerHTML = "&nbsp;&nbsp;&rarr;&nbsp;&nbsp;";
     tdLoad.onclick = () => {
       const tempProp = prop;
+      if (tempProp !== state.lastSelectedHandlerName) {
+        cancelHighlighting();
+      }
       fetchLogfile(tempProp);
     };
     tdLoad.classList.add("clickable");
@@ -490,19 +772,149 @@ function adjustLogContentMargin() {
 function handleFetchLogFileError(response) {
   response.text().then((text) => {
     adjustLogContentMargin();
-    preLogContent.innerText = text;
+    setLogLines(splitLogText(text));
+    renderViewport();
   });
   throw Error("Error fetching log file");
 }
 
+/**
+ * Opens the IndexedDB database keeping the fetched log files, once.
+ * @returns {Promise<IDBDatabase | null>} null if IndexedDB is unavailable, e.g. in private browsing
+ */
+function openLogCache() {
+  if (!state.logCache) {
+    state.logCache = new Promise((resolve) => {
+      if (!window.indexedDB) {
+        resolve(null);
+        return;
+      }
+      const request = indexedDB.open(LOG_CACHE_DB_NAME, 1);
+      request.onupgradeneeded = () => {
+        const store = request.result.createObjectStore(LOG_CACHE_STORE_NAME, { keyPath: "key" });
+        store.createIndex("stored", "stored");
+      };
+      request.onsuccess = () => resolve(request.result);
+      request.onerror = () => {
+        console.debug("Log cache unavailable:", request.error);
+        resolve(null);
+      };
+    });
+  }
+  return state.logCache;
+}
+
+/**
+ * Returns the key of the given log file in the log cache, i.e. its handler name along with its path,
+ * so that a handler writing to another file does not restore the old one.
+ * @param {string} handlerName
+ * @returns {string}
+ */
+function getLogCacheKey(handlerName) {
+  return `${handlerName}\n${state.filePaths[handlerName] || ""}`;
+}
+
+/**
+ * Loads the log text and cursor of the given log file as stored by storeCachedLogfile.
+ * @param {string} handlerName
+ * @returns {Promise<{text: string, cursor: object, timestamp: string} | null>}
+ */
+async function loadCachedLogfile(handlerName) {
+  const db = await openLogCache();
+  if (!db) {
+    return null;
+  }
+  return new Promise((resolve) => {
+    const store = db.transaction(LOG_CACHE_STORE_NAME).objectStore(LOG_CACHE_STORE_NAME);
+    const request = store.get(getLogCacheKey(handlerName));
+    request.onsuccess = () => resolve(request.result || null);
+    request.onerror = () => resolve(null);
+  });
+}
+
+/**
+ * Stores the log text and cursor of the current log file in IndexedDB, so that only the lines appended
+ * in the meantime are fetched when the log file is shown again, even after reopening the viewer.
+ * Only whole log files up to MAX_CACHED_LOGFILE_LENGTH characters are stored, the least recently stored
+ * log files are dropped beyond MAX_CACHED_LOGFILES.
+ * @returns {Promise<void>}
+ */
+async function storeCachedLogfile() {
+  const handlerName = state.lastSelectedHandlerName;
+  if (!handlerName || !state.cursor || state.page || state.filter) {
+    return;
+  }
+  const text = state.lines.join("\n") + "\n";
+  const db = await openLogCache();
+  if (!db || text.length > MAX_CACHED_LOGFILE_LENGTH) {
+    return;
+  }
+  const transaction = db.transaction(LOG_CACHE_STORE_NAME, "readwrite");
+  const store = transaction.objectStore(LOG_CACHE_STORE_NAME);
+  store.put({
+    key: getLogCacheKey(handlerName),
+    text,
+    cursor: state.cursor,
+    timestamp: state.lastLogDataTimeStamp,
+    stored: Date.now(),
+  });
+  const countRequest = store.count();
+  countRequest.onsuccess = () => {
+    let excess = countRequest.result - MAX_CACHED_LOGFILES;
+    store.index("stored").openKeyCursor().onsuccess = (event) => {
+      const cursor = /** @type {IDBRequest<IDBCursor>} */ (event.target).result;
+      if (cursor && excess-- > 0) {
+        store.delete(cursor.primaryKey);
+        cursor.continue();
+      }
+    };
+  };
+  transaction.onerror = () => console.debug("Could not store log file:", transaction.error);
+}
+
+/**
+ * Stores the current log file in IndexedDB once it has not changed for a second.
+ * @returns {void}
+ */
+function scheduleLogCacheUpdate() {
+  clearTimeout(state.logCacheTimeOutId);
+  state.logCacheTimeOutId = setTimeout(storeCachedLogfile, 1000);
+}
+
+/**
+ * Renders the log file of the given handler name as stored in IndexedDB
+ * and fetches the lines appended since it has been stored.
+ * The whole log file is fetched if it has been rotated or truncated in the meantime.
+ * @param {string} handlerName
+ * @param {{text: string, cursor: object, timestamp: string}} cached
+ * @returns {void}
+ */
+function restoreCachedLogfile(handlerName, cached) {
+  state.lastLogDataTimeStamp = cached.timestamp;
+  state.lastSelectedHandlerName = handlerName;
+  state.cursor = cached.cursor;
+  state.etag = null;
+  state.filter = null;
+  state.page = null;
+  divPageNavigation.style.display = "none";
+  tdHandlerName.innerText = handlerName;
+  adjustLogContentMargin();
+  showMessageToast("Restored log file, fetching new lines...", "green-color");
+  finalize(cached.text, handlerName);
+  fetchLogfileTail();
+  updateLiveTail();
+}
+
 /**
  * Fetches the log file of the given handler name.
  * If no handler name is provided, the last selected handler name is used.
  * If no handler name is available, a message is displayed to the user.
+ * A log file stored in IndexedDB is restored instead, fetching only the lines appended since.
  * @param {string=} handlerName
+ * @param {boolean=} useCache whether a log file stored in IndexedDB may be restored
  * @returns {void}
  */
-function fetchLogfile(handlerName) {
+function fetchLogfile(handlerName, useCache = true) {
   showMessageToast("Fetching log file...");
   if (!handlerName) {
     handlerName = state.lastSelectedHandlerName;
@@ -511,31 +923,60 @@ function fetchLogfile(handlerName) {
       return;
     }
   }
+  const isReload = handlerName === state.lastSelectedHandlerName && !state.filter && !state.page;
+  if (useCache && (!isReload || !state.cursor)) {
+    loadCachedLogfile(handlerName).then((cached) => {
+      if (cached) {
+        restoreCachedLogfile(handlerName, cached);
+      } else {
+        fetchLogfile(handlerName, false);
+      }
+    });
+    return;
+  }
   // @ts-ignore
-  fetch(requestLogfileURL + handlerName)
+  fetch(`${requestLogfileURL}${handlerName}&max_lines=${MAX_LOADED_LINES}&format=text`,
+    conditionalRequestOptions(isReload ? state.etag : null))
     .then((response) => {
+      if (response.status === 304) {
+        return null;
+      }
       if (response.status >= 400) {
         handleFetchLogFileError(response);
       }
-      return response.json();
+      state.etag = response.headers.get("ETag");
+      return readLogfileResponse(response);
     })
     .then((jsonResponse) => {
+      if (!jsonResponse) {
+        showMessageToast("No changes detected", "cyan-color");
+        return null;
+      }
       let logText = jsonResponse.text;
       if (jsonResponse.timestamp === state.lastLogDataTimeStamp && handlerName === state.lastSelectedHandlerName) {
         showMessageToast("No changes detected", "cyan-color");
         return null;
       }
+      if (jsonResponse.too_large) {
+        fetchLogWindow(handlerName);
+        return null;
+      }
 
       state.lastLogDataTimeStamp = jsonResponse.timestamp;
       state.lastSelectedHandlerName = handlerName;
+      state.cursor = jsonResponse.cursor;
+      state.filter = null;
+      state.page = null;
+      divPageNavigation.style.display = "none";
       tdHandlerName.innerText = handlerName;
 
       adjustLogContentMargin();
-      checkLogFileLength(logText);
       showMessageToast("Fetched log file", "green-color");
 
       setTimeout(() => {
         finalize(logText, handlerName);
+        updateLiveTail();
+        scheduleLogCacheUpdate();
       }, 250); // set timeout to allow the toast to be displayed
     })
     .catch((error) => {
@@ -544,26 +985,735 @@ function fetchLogfile(handlerName) {
     });
 }
 
+/**
+ * Reads a log file requested as plain text: the text is decoded as it is streamed,
+ * the metadata is taken from the X-Log-Lens-* headers.
+ * @param {Response} response
+ * @returns {Promise<{text: string, timestamp: string, cursor: object | null, too_large: boolean}>}
+ */
+async function readLogfileResponse(response) {
+  const header = (name, fallback) => {
+    const value = response.headers.get(`X-Log-Lens-${name}`);
+    return value === null ? fallback : JSON.parse(value);
+  };
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  const parts = [];
+  let received = 0;
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) {
+      break;
+    }
+    parts.push(decoder.decode(value, { stream: true }));
+    received += value.length;
+    if (parts.length % 64 === 0) {
+      showMessageToast(`Fetching log file... ${(received / 1048576).toFixed(1)} MB`);
+    }
+  }
+  parts.push(decoder.decode());
+  return {
+    text: parts.join(""),
+    timestamp: response.headers.get("X-Log-Lens-Timestamp") || "0",
+    cursor: header("Cursor", null),
+    too_large: header("Too-Large", false),
+  };
+}
+
+/**
+ * Fetches the lines appended to the current log file since the last fetch
+ * and appends them to the rendered log content.
+ * Fetches the whole log file instead if the server requests a resync,
+ * e.g. because the log file has been truncated or rotated.
+ * @returns {void}
+ */
+function fetchLogfileTail() {
+  const handlerName = state.lastSelectedHandlerName;
+  if (!state.cursor) {
+    fetchLogfile();
+    return;
+  }
+  if (state.page && state.page.end < state.page.total) {
+    showMessageToast("Logfile has been changed\nGo to the last page for an update", "yellow-color");
+    return;
+  }
+  if (state.filter) {
+    showMessageToast("Logfile has been changed\nApply the filter again for an update", "yellow-color");
+    return;
+  }
+  // @ts-ignore
+  fetch(`${requestLogfileTailURL}${handlerName}&offset=${state.cursor.offset}&inode=${state.cursor.inode}`)
+    .then((response) => {
+      if (response.status >= 400) {
+        handleFetchLogFileError(response);
+      }
+      return response.json();
+    })
+    .then((jsonResponse) => {
+      if (handlerName !== state.lastSelectedHandlerName) {
+        return; // another handler has been selected in the meantime
+      }
+      if (jsonResponse.resync) {
+        state.cursor = null;
+        state.lastLogDataTimeStamp = -1;
+        fetchLogfile(handlerName, false);
+        return;
+      }
+      state.cursor = jsonResponse.cursor;
+      state.lastLogDataTimeStamp = jsonResponse.timestamp;
+      if (jsonResponse.text) {
+        appendLogText(jsonResponse.text);
+        showMessageToast("Fetched new log lines", "green-color");
+      }
+      if (state.cursor.offset < state.cursor.size) {
+        fetchLogfileTail(); // the server limits the size of a single response
+      }
+    })
+    .catch((error) => {
+      showMessageToast(error.message || "Error fetching log file", "light-red-color");
+      console.error("Error fetching log file:", error);
+    });
+}
+
+/**
+ * Fetches a window of lines of the log file of the given handler name and renders it.
+ * Used for log files that are too large to be rendered at once.
+ * If no start line is given, the last lines of the log file are fetched.
+ * @param {string} handlerName
+ * @param {number=} start the line number of the first line of the window
+ * @param {number=} scrollToLine the line number to scroll to after rendering
+ * @returns {void}
+ */
+function fetchLogWindow(handlerName, start, scrollToLine) {
+  showMessageToast("Fetching log lines...");
+  const query = start ? `&start=${start}&end=${start + PAGE_SIZE - 1}` : "";
+  // @ts-ignore
+  fetch(`${requestLogfileLinesURL}${handlerName}${query}&records=true`)
+    .then((response) => {
+      if (response.status >= 400) {
+        handleFetchLogFileError(response);
+      }
+      return response.json();
+    })
+    .then((jsonResponse) => {
+      state.lastLogDataTimeStamp = jsonResponse.timestamp;
+      state.lastSelectedHandlerName = handlerName;
+      state.cursor = jsonResponse.cursor;
+      state.filter = null;
+      state.page = { start: jsonResponse.start, end: jsonResponse.end, total: jsonResponse.total };
+      divPageNavigation.style.display = "";
+      tdHandlerName.innerText = handlerName;
+
+      adjustLogContentMargin();
+      showMessageToast(
+        `Showing lines ${state.page.start} to ${state.page.end} of ${state.page.total}`,
+        "green-color"
+      );
+
+      setTimeout(() => {
+        finalize(jsonResponse.text, handlerName, jsonResponse.start);
+        updateLiveTail();
+        if (scrollToLine) {
+          goToLineWidId(String(scrollToLine));
+        }
+      }, 250); // set timeout to allow the toast to be displayed
+    })
+    .catch((error) => {
+      showMessageToast(error.message || "Error fetching log lines", "light-red-color");
+      console.error("Error fetching log lines:", error);
+    });
+}
+
+/**
+ * Fetches the summary of the log file of the given handler name, i.e. the number of records per level
+ * and the line numbers of the error records, which the server keeps up to date incrementally.
+ * The summary backs the counters and the error navigation, so they cover the whole log file
+ * even if only a window of lines is loaded or the lines are not highlighted yet.
+ * @param {string} handlerName
+ * @returns {void}
+ */
+function fetchSummary(handlerName) {
+  // @ts-ignore
+  fetch(requestLogfileSummaryURL + handlerName)
+    .then((response) => (response.ok ? response.json() : null))
+    .then((jsonResponse) => {
+      if (jsonResponse && handlerName === state.lastSelectedHandlerName) {
+        state.summary = { handlerName, ...jsonResponse };
+        updateStatistics();
+      }
+    })
+    .catch((error) => {
+      console.error("Error fetching log file summary:", error);
+    });
+  if (state.templatesVisible) {
+    fetchTemplates(handlerName);
+  }
+}
+
+/**
+ * Shows or hides the table of the most frequent message templates of the selected log file.
+ * Changes the text of the button accordingly.
+ * @param {HTMLElement} btn the invoking button
+ */
+function toggleTemplates(btn) {
+  state.templatesVisible = !state.templatesVisible;
+  btn.innerText = state.templatesVisible ? "Hide Templates" : "Show Templates";
+  tableTemplates.style.display = state.templatesVisible ? "" : "none";
+  adjustLogContentMargin();
+  if (state.templatesVisible && state.lastSelectedHandlerName) {
+    fetchTemplates(state.lastSelectedHandlerName);
+  }
+}
+
+/**
+ * Fetches the most frequent message templates of the log file, which the server mines incrementally,
+ * and renders them into the templates table.
+ * @param {string} handlerName
+ */
+function fetchTemplates(handlerName) {
+  // @ts-ignore
+  fetch(`${requestLogfileTemplatesURL}${handlerName}&limit=${MAX_LISTED_TEMPLATES}`)
+    .then((response) => (response.ok ? response.json() : null))
+    .then((jsonResponse) => {
+      if (jsonResponse && handlerName === state.lastSelectedHandlerName) {
+        renderTemplatesTable(jsonResponse.templates);
+      }
+    })
+    .catch((error) => {
+      console.error("Error fetching message templates:", error);
+    });
+}
+
+/**
+ * Renders the templates into the templates table, replacing the previous ones.
+ * Clicking a template scrolls to the first record it matches.
+ * @param {{template: string, level: number, count: number, last_seen: string | null, samples: number[][]}[]} templates
+ */
+function renderTemplatesTable(templates) {
+  const rows = tableTemplates.getElementsByTagName("tr");
+  while (rows.length > 1) {
+    tableTemplates.removeChild(rows[rows.length - 1]);
+  }
+  for (let template of templates) {
+    const tr = document.createElement("tr");
+    const tdCount = document.createElement("td");
+    const tdTemplate = document.createElement("td");
+    const tdLastSeen = document.createElement("td");
+    tdCount.innerText = String(template.count);
+    tdTemplate.innerText = template.template;
+    tdTemplate.classList.add(getLevelClass(template.level));
+    tdLastSeen.innerText = template.last_seen || "";
+    if (template.samples.length > 0) {
+      tr.classList.add("clickable");
+      tr.onclick = () => goToLineWidId(String(template.samples[0][0]));
+    }
+    tr.appendChild(tdCount);
+    tr.appendChild(tdTemplate);
+    tr.appendChild(tdLastSeen);
+    tableTemplates.appendChild(tr);
+  }
+  adjustLogContentMargin();
+}
+
+/**
+ * Returns the summary of the log file if it applies to the displayed lines, i.e. they are not filtered.
+ * @returns {{errors: number, warnings: number, error_records: number[][]} | null}
+ */
+function getSummary() {
+  const summary = state.summary;
+  if (!summary || summary.handlerName !== state.lastSelectedHandlerName || state.lineNumbers) {
+    return null;
+  }
+  return summary;
+}
+
+/**
+ * Returns the number of errors that can be navigated to.
+ * @returns {number}
+ */
+function getErrorCount() {
+  const summary = getSummary();
+  return summary ? summary.error_records.length : state.errorCounter;
+}
+
+/**
+ * Fetches the page preceding the currently displayed page.
+ * @returns {void}
+ */
+function goToPreviousPage() {
+  if (state.page && state.page.start > 1) {
+    fetchLogWindow(state.lastSelectedHandlerName, Math.max(1, state.page.start - PAGE_SIZE));
+  }
+}
+
+/**
+ * Fetches the page following the currently displayed page.
+ * @returns {void}
+ */
+function goToNextPage() {
+  if (state.page && state.page.end < state.page.total) {
+    fetchLogWindow(state.lastSelectedHandlerName, state.page.end + 1, state.page.end + 1);
+  }
+}
+
+/**
+ * Reads a response consisting of JSON lines as a stream.
+ * Calls the callback with the objects parsed from each received chunk.
+ * @param {Response} response
+ * @param {Function} onObjects the callback to be called with an array of parsed objects
+ * @returns {Promise<void>}
+ */
+async function readJsonLines(response, onObjects) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let remainder = "";
+  while (true) {
+    const { done, value } = await reader.read();
+    remainder += decoder.decode(value, { stream: !done });
+    const lines = remainder.split("\n");
+    remainder = lines.pop();
+    const objects = lines.filter((line) => line).map((line) => JSON.parse(line));
+    if (objects.length > 0) {
+      onObjects(objects);
+    }
+    if (done) {
+      return;
+    }
+  }
+}
+
+/**
+ * Returns the filter defined in the toolbar as query parameters.
+ * @returns {URLSearchParams}
+ */
+function getFilterParams() {
+  const params = new URLSearchParams();
+  const filters = {
+    level: selectFilterLevel.value,
+    pattern: inputFilterPattern.value,
+    logger: inputFilterLogger.value,
+    since: inputFilterSince.value,
+    until: inputFilterUntil.value,
+  };
+  for (let [key, value] of Object.entries(filters)) {
+    if (value) {
+      params.set(key, value);
+    }
+  }
+  return params;
+}
+
+/**
+ * Clears the rendered log content so that search results can be appended.
+ * @param {string} filter the filter the search results belong to
+ * @returns {void}
+ */
+function clearLogContentForFilter(filter) {
+  state.filter = filter;
+  state.page = null;
+  divPageNavigation.style.display = "none";
+  setLogLines([], 1, []);
+  updateStatistics();
+  renderViewport();
+  adjustLogContentMargin();
+  updateLiveTail();
+}
+
+/**
+ * Searches the current log file on the server with the filter defined in the toolbar
+ * and renders the matching records along with their original line numbers as they arrive,
+ * i.e. a traceback is shown in full if its record matches.
+ * Resets the filter if no filter is defined.
+ * @returns {void}
+ */
+function applyFilter() {
+  const handlerName = state.lastSelectedHandlerName;
+  if (!handlerName) {
+    showMessageToast("No handler selected", "light-red-color");
+    return;
+  }
+  const params = getFilterParams();
+  if (params.toString() === "") {
+    resetFilter();
+    return;
+  }
+  showMessageToast("Searching log file...");
+  clearLogContentForFilter(params.toString());
+  // @ts-ignore
+  fetch(`${requestLogfileQueryURL}${handlerName}&${params}&records=true`)
+    .then((response) => {
+      if (response.status >= 400) {
+        handleFetchLogFileError(response);
+      }
+      return readJsonLines(response, (objects) => {
+        const matches = objects.filter((obj) => obj.line !== undefined);
+        const summary = objects.find((obj) => obj.matches !== undefined);
+        appendMatches(matches);
+        if (summary) {
+          const message = summary.truncated ? `Showing the first ${summary.matches} matches` : `${summary.matches} matches`;
+          showMessageToast(message, summary.truncated ? "yellow-color" : "green-color");
+        }
+      });
+    })
+    .catch((error) => {
+      showMessageToast(error.message || "Error searching log file", "light-red-color");
+      console.error("Error searching log file:", error);
+    });
+}
+
+/**
+ * Finds the first record at or after the time defined in the "Since" filter in the current log file
+ * and scrolls to it. The server binary searches the file, so this is fast even for very large log files.
+ * @returns {void}
+ */
+function jumpToTimestamp() {
+  const handlerName = state.lastSelectedHandlerName;
+  if (!handlerName) {
+    showMessageToast("No handler selected", "light-red-color");
+    return;
+  }
+  if (!inputFilterSince.value) {
+    showMessageToast("No time defined in the Since filter", "light-red-color");
+    return;
+  }
+  const timestamp = encodeURIComponent(inputFilterSince.value);
+  // @ts-ignore
+  fetch(`${requestLogfileSeekURL}${handlerName}&timestamp=${timestamp}&before=0&after=0&lines=true`)
+    .then((response) => {
+      if (!response.ok) {
+        throw Error(`Error seeking log file (${response.status})`);
+      }
+      return response.json();
+    })
+    .then((json) => {
+      if (!json.found) {
+        showMessageToast("No records at or after this time", "yellow-color");
+        return;
+      }
+      showMessageToast(`Line ${json.line}<br/><span class="info">${json.record_timestamp}</span>`);
+      goToLineWidId(String(json.line));
+    })
+    .catch((error) => {
+      showMessageToast(error.message || "Error seeking log file", "light-red-color");
+      console.error("Error seeking log file:", error);
+    });
+}
+
+/**
+ * Searches the log files of all handlers including their rotated backups
+ * with the filter defined in the toolbar and renders the matches merged by timestamp.
+ * Each match is prefixed with the name of the file it was found in.
+ * @returns {void}
+ */
+function searchAllLogfiles() {
+  const params = getFilterParams();
+  if (params.toString() === "") {
+    showMessageToast("Define a filter to search all log files", "light-red-color");
+    return;
+  }
+  showMessageToast("Searching all log files...");
+  // @ts-ignore
+  fetch(`${searchLogfilesURL}?${params}`)
+    .then((response) => {
+      if (response.status >= 400) {
+        handleFetchLogFileError(response);
+      }
+      return response.json();
+    })
+    .then((jsonResponse) => {
+      clearLogContentForFilter(params.toString());
+      h3LogfileName.innerText = `${jsonResponse.files.length} log files`;
+      appendMatches(
+        jsonResponse.matches.map((match) => ({
+          line: match.line,
+          text: `${match.path.split(/[\\/]/).pop()}: ${match.text}`,
+        }))
+      );
+      if (jsonResponse.cancelled) {
+        showMessageToast("Search has timed out, results are incomplete", "yellow-color");
+      } else if (jsonResponse.truncated) {
+        showMessageToast(`Showing the first ${jsonResponse.matches.length} matches`, "yellow-color");
+      } else {
+        showMessageToast(`${jsonResponse.matches.length} matches`, "green-color");
+      }
+    })
+    .catch((error) => {
+      showMessageToast(error.message || "Error searching log files", "light-red-color");
+      console.error("Error searching log files:", error);
+    });
+}
+
+/**
+ * Appends the given matches of a search to the rendered log content.
+ * A match is either a single line or a whole record spanning several lines.
+ * @param {{line: number, text: string}[]} matches
+ * @returns {void}
+ */
+function appendMatches(matches) {
+  if (matches.length === 0) {
+    return;
+  }
+  const logLines = [];
+  const lineNumbers = [];
+  for (let match of matches) {
+    const matchLines = match.text.split("\n");
+    for (let i = 0; i < matchLines.length; i++) {
+      logLines.push(matchLines[i]);
+      lineNumbers.push(match.line + i);
+    }
+  }
+  addLogLines(logLines, lineNumbers);
+  updateStatistics();
+  renderViewport();
+}
+
+/**
+ * Clears the filter inputs and fetches the whole log file again.
+ * @returns {void}
+ */
+function resetFilter() {
+  for (let elem of [selectFilterLevel, inputFilterPattern, inputFilterLogger, inputFilterSince, inputFilterUntil]) {
+    elem.value = "";
+  }
+  state.filter = null;
+  state.lastLogDataTimeStamp = -1;
+  fetchLogfile();
+}
+
+/**
+ * Splits the log text into lines.
+ * A trailing line break does not start a new line.
+ * @param {string} logText
+ * @returns {string[]}
+ */
+function splitLogText(logText) {
+  const logLines = logText.split("\n");
+  if (logLines.length > 1 && logLines[logLines.length - 1] === "") {
+    logLines.pop();
+  }
+  return logLines;
+}
+
+/**
+ * Appends the given log text to the rendered log content.
+ * Keeps the view scrolled to the bottom if it was scrolled to the bottom before.
+ * @param {string} logText
+ * @returns {void}
+ */
+function appendLogText(logText) {
+  const isAtBottom = divLogContent.scrollTop + divLogContent.clientHeight >= divLogContent.scrollHeight - 1;
+  addLogLines(splitLogText(logText));
+  if (state.page) {
+    state.page.end = state.lineCount;
+    state.page.total = state.lineCount;
+  }
+  updateStatistics();
+  renderViewport();
+  if (!state.lineNumbers) {
+    fetchSummary(state.lastSelectedHandlerName);
+    scheduleLogCacheUpdate();
+  }
+  if (isAtBottom) {
+    scrollToBottom();
+  }
+}
+
+/**
+ * Replaces the log lines held in memory. The error and warning counters are reset.
+ * @param {string[]} logLines
+ * @param {number=} firstLineNumber the line number of the first line, if only a window of lines is shown
+ * @param {number[]=} lineNumbers the original line numbers if the lines are not consecutive, e.g. search results
+ * @returns {void}
+ */
+function setLogLines(logLines, firstLineNumber = 1, lineNumbers = null) {
+  cancelHighlighting();
+  state.lines = [];
+  state.lineLevels = [];
+  state.lineNumbers = lineNumbers ? [] : null;
+  state.firstLineNumber = firstLineNumber;
+  state.errorLines = [];
+  state.warningCounter = 0;
+  state.currentError = -1;
+  state.highlightedLine = -1;
+  addLogLines(logLines, lineNumbers);
+}
+
+/**
+ * Adds log lines to the lines held in memory and has them highlighted.
+ * @param {string[]} logLines
+ * @param {number[]=} lineNumbers the original line numbers of the lines, if they are not consecutive
+ * @returns {void}
+ */
+function addLogLines(logLines, lineNumbers = null) {
+  const startIndex = state.lines.length;
+  for (let i = 0; i < logLines.length; i++) {
+    state.lines.push(logLines[i]);
+    if (state.lineNumbers) {
+      state.lineNumbers.push(lineNumbers[i]);
+    }
+  }
+  state.lineCount = state.firstLineNumber - 1 + state.lines.length;
+  state.renderVersion++;
+  highlightLines(startIndex, logLines);
+}
+
+/**
+ * Starts the Web Worker tokenizing the log lines for highlighting.
+ * Lines are tokenized on the main thread instead if the worker cannot be started.
+ * @returns {void}
+ */
+function startHighlighter() {
+  try {
+    // @ts-ignore
+    state.highlighter = new Worker(highlighterURL);
+    state.highlighter.onmessage = (event) => onLinesHighlighted(event.data);
+  } catch (error) {
+    console.debug("Highlighting log lines on the main thread:", error);
+  }
+}
+
+/**
+ * Has the given lines tokenized for highlighting, starting at the given index.
+ * @param {number} startIndex
+ * @param {string[]} logLines
+ * @returns {void}
+ */
+function highlightLines(startIndex, logLines) {
+  if (logLines.length === 0) {
+    return;
+  }
+  const generation = state.highlightGeneration;
+  if (state.highlighter) {
+    state.highlighter.postMessage({ type: "highlight", generation, startIndex, lines: logLines });
+  } else {
+    onLinesHighlighted({ generation, startIndex, count: logLines.length, ...tokenizeLines(logLines) });
+  }
+}
+
+/**
+ * Cancels highlighting the lines held in memory and discards their token streams,
+ * e.g. because another log file is loaded.
+ * @returns {void}
+ */
+function cancelHighlighting() {
+  if (state.highlighter) {
+    state.highlighter.postMessage({ type: "cancel", generation: state.highlightGeneration });
+  }
+  state.highlightGeneration++;
+  state.highlightedCount = 0;
+  state.tokenChunks = [];
+}
+
+/**
+ * Stores the token stream of a chunk of highlighted lines and indexes the errors and warnings among them.
+ * Lines without a level prefix, e.g. tracebacks, belong to the record of the preceding line.
+ * Chunks are highlighted in the order of the lines.
+ * @param {{generation: number, startIndex: number, count: number, levels: Int16Array,
+ *   offsets: Uint32Array, tokens: Uint32Array, links: Array}} chunk
+ * @returns {void}
+ */
+function onLinesHighlighted(chunk) {
+  if (chunk.generation !== state.highlightGeneration) {
+    return; // the lines have been replaced in the meantime
+  }
+  state.tokenChunks.push(chunk);
+  let level = chunk.startIndex > 0 ? state.lineLevels[chunk.startIndex - 1] : -1;
+  for (let i = 0; i < chunk.count; i++) {
+    if (chunk.levels[i] >= 0) {
+      level = chunk.levels[i];
+      if (level >= 40) {
+        state.errorLines.push(chunk.startIndex + i);
+      } else if (level >= 30) {
+        state.warningCounter++;
+      }
+    }
+    state.lineLevels[chunk.startIndex + i] = level;
+  }
+  state.errorCounter = state.errorLines.length;
+  state.highlightedCount += chunk.count;
+  state.renderVersion++;
+  updateStatistics();
+  requestRender();
+  if (state.lines.length >= HIGHLIGHT_PROGRESS_THRESHOLD) {
+    const progress = Math.floor((100 * state.highlightedCount) / state.lines.length);
+    showMessageToast(`Highlighting log lines... ${progress}%`, progress === 100 ? "green-color" : "");
+  }
+}
+
+/**
+ * Returns the highlighted chunk containing the line with the given index or null if it is not highlighted yet.
+ * @param {number} index
+ * @returns {{startIndex: number, count: number, offsets: Uint32Array, tokens: Uint32Array, links: Array} | null}
+ */
+function findTokenChunk(index) {
+  let low = 0;
+  let high = state.tokenChunks.length - 1;
+  while (low <= high) {
+    const middle = (low + high) >> 1;
+    const chunk = state.tokenChunks[middle];
+    if (index < chunk.startIndex) {
+      high = middle - 1;
+    } else if (index >= chunk.startIndex + chunk.count) {
+      low = middle + 1;
+    } else {
+      return chunk;
+    }
+  }
+  return null;
+}
+
+/**
+ * Returns the line number of the line with the given index.
+ * @param {number} index
+ * @returns {number}
+ */
+function getLineNumber(index) {
+  return state.lineNumbers ? state.lineNumbers[index] : state.firstLineNumber + index;
+}
+
+/**
+ * Returns the index of the line with the given line number or -1 if the line is not held in memory.
+ * @param {number} lineNumber
+ * @returns {number}
+ */
+function findLineIndex(lineNumber) {
+  if (state.lineNumbers) {
+    return state.lineNumbers.indexOf(lineNumber);
+  }
+  const index = lineNumber - state.firstLineNumber;
+  return index >= 0 && index < state.lines.length ? index : -1;
+}
+
+/**
+ * Updates the line, error and warning counters in the statistics table.
+ * @returns {void}
+ */
+function updateStatistics() {
+  tdLineCounter.innerText = String(state.page ? state.page.total : state.lines.length);
+  const summary = getSummary();
+  tdErrorCountElem.innerText = String(summary ? summary.errors : state.errorCounter);
+  tdWarningCount.innerText = String(summary ? summary.warnings : state.warningCounter);
+}
+
 /**
  * Finalizes the log text after fetching the log file.
- * - Renders the log text
+ * - Holds the log lines in memory and renders the visible ones
  * - Updates the line counter
  * - Updates the error and warning counter
  * - Updates the log file name
  * - Scrolls to the bottom of the page
  * @param {string} logText
  * @param {string} handlerName
+ * @param {number=} firstLineNumber the line number of the first line, if only a window of lines is rendered
  * @returns {void}
  */
-function finalize(logText, handlerName) {
-  const logLines = logText.split("\n");
-  preLogContent.innerHTML = renderLogText(logLines);
-  tdLineCounter.innerText = String(logLines.length);
-  tdErrorCountElem.innerText = String(state.errorCounter);
-  tdWarningCount.innerText = String(state.warningCounter);
+function finalize(logText, handlerName, firstLineNumber = 1) {
+  setLogLines(logText ? splitLogText(logText) : [], firstLineNumber);
+  updateStatistics();
+  fetchSummary(handlerName);
   h3LogfileName.innerText = state.filePaths[handlerName];
-  addLineNumbers(logLines.length);
-  divLogContent.scrollTo(0, divLogContent.scrollHeight);
+  renderViewport();
+  scrollToBottom();
 }
 
 /**
@@ -583,133 +1733,151 @@ function scrollToBottom() {
 }
 
 /**
- * Scrolls the given the divLogContent to the given element.
- * @param {HTMLElement} elem
+ * Returns the distance between the top of the scrollable log content and its first line.
+ * @returns {number}
  */
-function scrollIntoView(elem) {
-  divLogContent.scrollTo(0, elem.offsetTop - divLogContent.offsetTop);
+function getLogContentTop() {
+  return preLogContent.offsetTop - divLogContent.offsetTop;
 }
 
 /**
- * Adds line numbers to the line counter.
- * @param {number} noOfLines
+ * Scrolls the log content to the line with the given index.
+ * @param {number} index
+ * @returns {void}
  */
-function addLineNumbers(noOfLines) {
-  preLineCounter.innerHTML = "";
-  const lineCounterLines = [];
-  for (let i = 0; i < noOfLines; i++) {
-    lineCounterLines[i] = `<span id='line-${i + 1}' class='line-counter'>`.concat(
-      (i + 1).toString().padStart(5, " "),
-      "</span><br />"
-    );
-  }
-  preLineCounter.innerHTML = lineCounterLines.join("");
+function scrollToLineIndex(index) {
+  divLogContent.scrollTo(0, getLogContentTop() + index * state.lineHeight);
+  renderViewport();
+}
+
+/**
+ * Measures the height of a rendered line.
+ * All lines have the same height as the log content does not wrap lines.
+ * @returns {number}
+ */
+function measureLineHeight() {
+  preLogContent.style.padding = "0";
+  preLogContent.innerHTML = "0<br />".repeat(100);
+  const height = preLogContent.offsetHeight;
+  preLogContent.innerHTML = "0<br />".repeat(200);
+  return (preLogContent.offsetHeight - height) / 100 || 16;
 }
 
 /**
- * Checks if the log file is too large to render.
- * If it is, the log content is cleared and an error is thrown.
- * @param {string} logText the log text to be checked
+ * Renders the visible log lines on the next animation frame.
  * @returns {void}
  */
-function checkLogFileLength(logText) {
-  const lineCounter = logText.split("\n").length;
-  if (lineCounter > MAX_LINE_COUNT) {
-    preLineCounter.innerHTML = "";
-    preLogContent.innerHTML = "";
-    tdErrorCountElem.innerText = "?";
-    tdWarningCount.innerText = "?";
-    tdLineCounter.innerText = String(lineCounter);
-    throw Error("Logfile is too large to render");
+function requestRender() {
+  if (!state.renderRequested) {
+    state.renderRequested = true;
+    requestAnimationFrame(renderViewport);
   }
 }
 
-function renderLine(line, lineCounter) {
-  const matchesStringRegex = line.match(/"([^"]+)"/g);
-  const matchesLineNumberRegex = line.match(/, line \b\d+\b,/g);
-  const containsUrlRegex = /\bhttps?:\/\/[^/]+(\/[^/]+)\b/;
+/**
+ * Renders the log lines and line numbers in the visible part of the log content plus OVERSCAN_LINES lines
+ * above and below. The lines outside are replaced by padding so that the scroll height matches all lines.
+ * @returns {void}
+ */
+function renderViewport() {
+  state.renderRequested = false;
+  if (!state.lineHeight) {
+    state.lineHeight = measureLineHeight();
+    state.renderedViewport = "";
+  }
+  const lineHeight = state.lineHeight;
+  const total = state.lines.length;
+  const visibleLines = Math.ceil(divLogContent.clientHeight / lineHeight);
+  const firstVisible = Math.floor((divLogContent.scrollTop - getLogContentTop()) / lineHeight);
+  const first = Math.min(Math.max(0, firstVisible - OVERSCAN_LINES), total);
+  const last = Math.min(total, Math.max(0, firstVisible) + visibleLines + OVERSCAN_LINES);
+  const viewport = `${first}:${last}:${state.renderVersion}:${state.highlightedLine}`;
+  if (viewport === state.renderedViewport) {
+    return;
+  }
+  state.renderedViewport = viewport;
+  const logLines = [];
+  const lineNumbers = [];
+  for (let i = first; i < last; i++) {
+    logLines.push(renderLogLine(i));
+    lineNumbers.push(`<span class='line-counter'>${String(getLineNumber(i)).padStart(5, " ")}</span><br />`);
+  }
+  for (let pre of [preLineCounter, preLogContent]) {
+    pre.style.paddingTop = `${first * lineHeight}px`;
+    pre.style.paddingBottom = `${(total - last) * lineHeight}px`;
+  }
+  preLogContent.innerHTML = logLines.join("");
+  preLineCounter.innerHTML = lineNumbers.join("");
+}
 
-  if (matchesStringRegex && matchesLineNumberRegex) {
-    const lineNumber = matchesLineNumberRegex[matchesLineNumberRegex.length - 1]
-      .replace(/, line /g, "")
-      .replace(/,/g, "");
-    let filename = matchesStringRegex[matchesStringRegex.length - 1].replace(/"/g, "");
-    line = line.replace(
-      /"([^"]+)"/g,
-      `"<span class="quoted-text" line_number=${lineNumber} onclick="copyElementToClipboard(this)">$1</span>"`
-    );
-    line += ` <a  id="a-${lineCounter}" href="javascript:openInVsCode(document.getElementById(\`a-${lineCounter}\`))"
-                        title="open in VS Code"
-                        file_name="${filename}"
-                        line_number="${lineNumber}"> &uarr; </a>`;
-  } else if (matchesStringRegex) {
-    line = line.replace(/"([^"]+)"/g, '"<span class="quoted-text" onclick="copyElementToClipboard(this)">$1</span>"');
-  } else if (containsUrlRegex.test(line)) {
-    const urlRegex = /\bhttps?:\/\/[^/]+(\/[^/]+)*\b(?=\))/g;
-    const url = line.match(urlRegex) ? line.match(urlRegex)[0] : null;
-    line = line.replace(urlRegex, `<span class="url" onclick="copyElementToClipboard(this)">$&</span>`);
-    if (url) {
-      line += ` <a  id="a-${lineCounter}" href="javascript:openInVsCode(document.getElementById(\`a-${lineCounter}\`))"
+/**
+ * Renders the log line with the given index from its token stream:
+ * quoted text and URLs can be copied to the clipboard and referenced source code can be opened in VS Code.
+ * @param {number} index
+ * @param {{startIndex: number, offsets: Uint32Array, tokens: Uint32Array, links: Array}} chunk
+ * @returns {string} - the formatted log line as HTML
+ */
+function renderTokens(index, chunk) {
+  const line = state.lines[index];
+  const i = index - chunk.startIndex;
+  const link = chunk.links[i];
+  let html = "";
+  let position = 0;
+  for (let t = chunk.offsets[i]; t < chunk.offsets[i + 1]; t += 3) {
+    const [start, end, type] = [chunk.tokens[t], chunk.tokens[t + 1], chunk.tokens[t + 2]];
+    html += line.slice(position, start);
+    const text = line.slice(start, end);
+    if (type === TOKEN_DOUBLE_QUOTED && link && link[1]) {
+      html += `<span class="quoted-text" line_number=${link[1]} onclick="copyElementToClipboard(this)">${text}</span>`;
+    } else if (type === TOKEN_DOUBLE_QUOTED || type === TOKEN_SINGLE_QUOTED) {
+      html += `<span class="quoted-text" onclick="copyElementToClipboard(this)">${text}</span>`;
+    } else if (type === TOKEN_URL) {
+      html += `<span class="url" onclick="copyElementToClipboard(this)">${text}</span>`;
+    } // the level prefix is not rendered
+    position = end;
+  }
+  html += line.slice(position);
+  if (link) {
+    const lineNumber = link[1] ? ` line_number="${link[1]}"` : "";
+    html += ` <a  id="a-${index}" href="javascript:openInVsCode(document.getElementById(\`a-${index}\`))"
                         title="open in VS Code"
-                        file_name="${url}"> &uarr; </a>`;
-    }
+                        file_name="${link[0]}"${lineNumber}> &uarr; </a>`;
   }
+  return html;
+}
 
-  line = line.replace(/'([^']+)'/g, `'<span class="quoted-text" onclick="copyElementToClipboard(this)">$1</span>'`);
-  return line;
-}
-
-/**
- * Colors the log lines based on the log level that
- * are extracted from the [LVL:XX] prefix.
- * @param {string} line
- * @returns
- */
-function colorLogLevels(line) {
-  const prefixPattern = /\[LVL:(\d+)\]/;
-  const prefixMatch = line.match(prefixPattern);
-  if (prefixMatch) {
-    const fullMatch = prefixMatch[0];
-    const logLevel = parseInt(prefixMatch[1]);
-    if (logLevel >= 50) {
-      line = line.replace(fullMatch, `</span><span id="error-${state.errorCounter}" class="critical">`);
-      state.errorCounter++;
-    } else if (logLevel >= 40) {
-      line = line.replace(fullMatch, `</span><span id="error-${state.errorCounter}" class="error">`);
-      state.errorCounter++;
-    } else if (logLevel >= 30) {
-      line = line.replace(fullMatch, `</span><span class="warning">`);
-      state.warningCounter++;
-    } else if (logLevel >= 20) {
-      line = line.replace(fullMatch, `</span><span class="info">`);
-    } else {
-      line = line.replace(fullMatch, `</span><span class="debug">`);
-    }
+/**
+ * Returns the CSS class of the given log level as extracted from the [LVL:XX] prefix.
+ * @param {number} logLevel
+ * @returns {string}
+ */
+function getLevelClass(logLevel) {
+  if (logLevel >= 50) {
+    return "critical";
+  } else if (logLevel >= 40) {
+    return "error";
+  } else if (logLevel >= 30) {
+    return "warning";
+  } else if (logLevel >= 20) {
+    return "info";
+  } else if (logLevel >= 0) {
+    return "debug";
   }
-  return line;
+  return "";
 }
 
 /**
- * Renders the log text - highlights errors, warnings, and info messages.
- * Adds line numbers to the log text.
- * @param {string[]} logLines - the log text to be rendered
- * @returns {string} - the formatted log text as HTML
+ * Renders the log line with the given index - highlights errors, warnings, and info messages
+ * based on the level of the record the line belongs to.
+ * Lines which have not been highlighted yet are rendered as plain text.
+ * @param {number} index
+ * @returns {string} - the formatted log line as HTML
  */
-function renderLogText(logLines) {
-  let formattedLog = "";
-  let lineCounter = 1;
-
-  state.currentError = -1;
-  state.errorCounter = 0;
-  state.warningCounter = 0;
-
-  for (let i = 0; i < logLines.length; i++) {
-    logLines[i] = renderLine(logLines[i], lineCounter) + "<br />";
-    logLines[i] = colorLogLevels(logLines[i]);
-    lineCounter++;
-  }
-  formattedLog = logLines.join("");
-  return `<span>${formattedLog}</span>`;
+function renderLogLine(index) {
+  const chunk = findTokenChunk(index);
+  const line = chunk ? renderTokens(index, chunk) : state.lines[index].replace(LEVEL_PREFIX_PATTERN, "");
+  const style = index === state.highlightedLine ? ' style="background-color: var(--highlight-color)"' : "";
+  return `<span class="${getLevelClass(state.lineLevels[index])}"${style}>${line}</span><br />`;
 }
 
 /**
@@ -785,8 +1953,15 @@ function copyElementToClipboard(HTMLElement) {
 function goToLineWidId(id) {
   try {
     const _id = parseInt(id);
-    const line = document.getElementById("line-" + _id);
-    scrollIntoView(line);
+    if (state.page && _id > 0 && (_id < state.page.start || _id > state.page.end)) {
+      const start = Math.max(1, _id - Math.floor(PAGE_SIZE / 2));
+      fetchLogWindow(state.lastSelectedHandlerName, start, _id);
+      return;
+    }
+    const index = findLineIndex(_id);
+    if (index >= 0) {
+      scrollToLineIndex(index);
+    }
   } catch {}
 }
 
@@ -796,11 +1971,19 @@ function goToLineWidId(id) {
  * @returns {void}
  */
 function goToError(errorNo) {
-  const errorElement = document.getElementById(`error-${errorNo}`);
-  scrollIntoView(errorElement);
-  errorElement.style.backgroundColor = "var(--highlight-color)";
+  const summary = getSummary();
+  const index = summary ? findLineIndex(summary.error_records[errorNo][0]) : state.errorLines[errorNo];
+  if (index < 0) {
+    goToLineWidId(String(summary.error_records[errorNo][0])); // fetches the window containing the error
+    return;
+  }
+  state.highlightedLine = index;
+  scrollToLineIndex(index);
   setTimeout(() => {
-    errorElement.style.backgroundColor = "";
+    if (state.highlightedLine === index) {
+      state.highlightedLine = -1;
+      requestRender();
+    }
   }, state.timeout);
 }
 
@@ -809,8 +1992,9 @@ function goToError(errorNo) {
  * @returns {void}
  */
 function goToLastError() {
-  if (state.errorCounter > 0) {
-    state.currentError = state.errorCounter - 1;
+  const errorCount = getErrorCount();
+  if (errorCount > 0) {
+    state.currentError = errorCount - 1;
     goToError(state.currentError);
   }
 }
@@ -820,7 +2004,7 @@ function goToLastError() {
  * @returns {void}
  */
 function goToNextError() {
-  if (state.currentError < state.errorCounter - 1) {
+  if (state.currentError < getErrorCount() - 1) {
     state.currentError++;
     goToError(state.currentError);
   }
@@ -842,7 +2026,8 @@ function goToPreviousError() {
  * - Parses the hash so that the page can be restored to its previous state
  * - Sets up event listeners
  * - Fetches file paths from the server
- * - Requests the timestamp of the log file so that the user can be notified if the log file has changed
+ * - Polls the timestamp of the log file so that the user can be notified if the log file has changed,
+ *   until a log file is loaded and its changes can be pushed by the server
  */
 function setUpPage() {
   try {
@@ -857,10 +2042,10 @@ function setUpPage() {
   bindElementAttr(btnAutoRefresh, "state", preservedState, "autoRefreshState", true, bindingObserverFn);
   window.onload = () => {
     setUpEventListeners();
+    startHighlighter();
+    setUpSharedPolling();
     fetchFilePaths();
-    setInterval(() => {
-      requestLogfileTimestamp();
-    }, 2 * state.timeout);
+    startPolling();
   };
   adjustLogContentMargin();
 }
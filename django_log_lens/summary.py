@@ -0,0 +1,143 @@
+import logging
+import mmap
+import os
+import threading
+from array import array
+from collections import Counter
+
+from .compressed import is_compressed, open_logfile
+from .files import CHUNK_SIZE, was_truncated
+from .jsonlog import parse_json_header
+from .metrics import metrics, timed
+from .query import TIMESTAMP_PATTERN, timestamp_key
+from .records import parse_header
+from .scan import count_lines, iter_header_lines, map_logfile
+
+MAX_SUMMARY_ERRORS = 10000
+
+
+class LogSummary:
+    """
+    Number of records per level and per minute of a log file along with the positions of its error records,
+    i.e. records with level ERROR or above. Records are recognized by their `[LVL:NN]` prefix,
+    in JSON-lines log files every line is a record.
+    Like the line index, the summary is built once, extended incrementally as the file grows
+    and rebuilt from scratch if the file has been rotated or truncated.
+    """
+
+    def __init__(self, filename: str, json_lines: bool = False):
+        self.filename = filename
+        self.json_lines = json_lines
+        self.lock = threading.Lock()
+        self.reset(None)
+
+    def reset(self, inode: int | None) -> None:
+        self.inode = inode
+        self.position = 0
+        self.line_count = 0
+        self.level_counts: Counter[int] = Counter()
+        self.minute_counts: dict[str, Counter[int]] = {}
+        self.error_lines = array('Q')
+        self.error_offsets = array('Q')
+
+    def update(self) -> os.stat_result:
+        """
+        Brings the summary up to date with the log file and returns the file's stat result.
+        Only complete lines are summarized.
+        """
+        with self.lock, open_logfile(self.filename) as f:
+            stat = os.fstat(f.fileno())
+            if is_compressed(self.filename):
+                if stat.st_ino == self.inode:
+                    return stat  # compressed backups are not written to
+                self.reset(stat.st_ino)
+            elif stat.st_ino != self.inode or was_truncated(f, stat, self.position):
+                self.reset(stat.st_ino)
+            with map_logfile(f) as buffer:
+                if buffer is not None and not self.json_lines:
+                    self.summarize_buffer(buffer)
+                    return stat
+            f.seek(self.position)
+            remainder = b""
+            while chunk := f.read(CHUNK_SIZE):
+                lines = (remainder + chunk).split(b"\n")
+                remainder = lines.pop()
+                for line in lines:
+                    if self.json_lines:
+                        self.add_record(parse_json_header(line))
+                    elif b"[LVL:" in line:
+                        self.add_record(parse_header(line))
+                    self.line_count += 1
+                    self.position += len(line) + 1
+        return stat
+
+    def summarize_buffer(self, buffer: mmap.mmap) -> None:
+        """
+        Summarizes the complete lines of the memory-mapped file following position, finding the records
+        by their `[LVL:NN]` prefix rather than splitting the file into lines.
+        Lines are only counted up to error records, whose line numbers are kept, and at the end.
+        """
+        end = buffer.rfind(b"\n", self.position) + 1
+        counted = self.position
+        for line_start, line_end, level in iter_header_lines(buffer, self.position, end):
+            if level >= logging.ERROR:
+                self.line_count += count_lines(buffer, counted, line_start)
+                counted = line_start
+            self.position = line_start
+            timestamp_match = TIMESTAMP_PATTERN.search(buffer, line_start, line_end)
+            self.add_record((level, timestamp_key(*timestamp_match.groups()) if timestamp_match else None))
+        self.line_count += count_lines(buffer, counted, end)
+        self.position = max(self.position, end)
+
+    def add_record(self, header: tuple[int, bytes | None] | None) -> None:
+        if header is None:
+            return
+        level, timestamp = header
+        self.level_counts[level] += 1
+        if timestamp is not None:
+            minute = timestamp[:16].decode()
+            counts = self.minute_counts.get(minute)
+            if counts is None:
+                counts = self.minute_counts[minute] = Counter()
+            counts[level] += 1
+        if level >= logging.ERROR:
+            self.error_lines.append(self.line_count + 1)
+            self.error_offsets.append(self.position)
+
+    def as_dict(self, max_errors: int = MAX_SUMMARY_ERRORS) -> dict:
+        """
+        Returns the summary as JSON-serializable dict. Only the last max_errors error records are listed.
+        """
+        with self.lock:
+            error_count = len(self.error_lines)
+            first_error = max(0, error_count - max_errors)
+            return {
+                "line_count": self.line_count,
+                "counts": {str(level): count for level, count in sorted(self.level_counts.items())},
+                "errors": error_count,
+                "warnings": sum(count for level, count in self.level_counts.items()
+                                if logging.WARNING <= level < logging.ERROR),
+                "minutes": {minute: {str(level): count for level, count in counts.items()}
+                            for minute, counts in self.minute_counts.items()},
+                "error_records": [[line, offset] for line, offset
+                                  in zip(self.error_lines[first_error:], self.error_offsets[first_error:])],
+                "error_records_truncated": first_error > 0,
+            }
+
+
+_summaries: dict[str, LogSummary] = {}
+_summaries_lock = threading.Lock()
+
+
+def get_summary(filename: str, json_lines: bool = False) -> LogSummary:
+    """
+    Returns the up-to-date summary of the given log file, building it if necessary.
+    """
+    with _summaries_lock:
+        summary = _summaries.get(filename)
+        metrics.count_cache("summary", summary is not None and summary.json_lines == json_lines)
+        if summary is None or summary.json_lines != json_lines:
+            summary = _summaries[filename] = LogSummary(filename, json_lines)
+    with timed("index"):
+        summary.update()
+    return summary
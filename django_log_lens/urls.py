@@ -3,7 +3,12 @@ from django.urls import path
 
 from .views import (clear_logfile, download_logfile, log_js_error,
                     log_lens_view, login_view, logout_view, request_logfile,
-                    request_logfile_paths, request_logfile_timestamp)
+                    request_logfile_backups, request_logfile_lines,
+                    request_logfile_paths, request_logfile_query,
+                    request_logfile_seek, request_logfile_summary,
+                    request_logfile_tail, request_logfile_templates,
+                    request_logfile_timestamp, request_metrics,
+                    search_logfiles_view, stream_logfile)
 
 app_name = "log-lens"
 
@@ -11,7 +16,17 @@ urlpatterns = [
     path('', lambda _: redirect('log-lens:view')),
     path('request/paths', request_logfile_paths, name="request-logfile-paths"),
     path('request/file', request_logfile, name="request-logfile"),
+    path('request/tail', request_logfile_tail, name="request-logfile-tail"),
+    path('stream', stream_logfile, name="stream-logfile"),
+    path('request/lines', request_logfile_lines, name="request-logfile-lines"),
+    path('request/backups', request_logfile_backups, name="request-logfile-backups"),
+    path('request/seek', request_logfile_seek, name="request-logfile-seek"),
+    path('request/summary', request_logfile_summary, name="request-logfile-summary"),
+    path('request/templates', request_logfile_templates, name="request-logfile-templates"),
+    path('request/query', request_logfile_query, name="request-logfile-query"),
+    path('search', search_logfiles_view, name="search-logfiles"),
     path('download', download_logfile, name="download-logfile"),
+    path('metrics', request_metrics, name="metrics"),
     path('request/timestamp', request_logfile_timestamp, name="request-logfile-timestamp"),
     path('post', log_js_error, name="post-log"),
     path('clear/file', clear_logfile, name="clear"),
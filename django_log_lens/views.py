@@ -1,36 +1,113 @@
+import hmac
 import json
-import logging
 import os
+from bisect import bisect_left
+from datetime import datetime, timezone
+from typing import Iterator
+from urllib.parse import urlencode
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import (REDIRECT_FIELD_NAME, authenticate, login,
+                                 logout)
 from django.contrib.auth.decorators import user_passes_test
-from django.http import (HttpResponse, HttpResponseBadRequest,
-                         HttpResponseForbidden, JsonResponse)
-from django.shortcuts import redirect, render
-from django.views.decorators.http import require_http_methods
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (FileResponse, HttpResponse, HttpResponseBadRequest,
+                         HttpResponseForbidden, HttpResponseNotAllowed,
+                         JsonResponse, StreamingHttpResponse)
+from django.shortcuts import redirect, render, resolve_url
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_http_methods
+
+from .aio import async_view
+from .cache import cache_chunks, get_file_identity, result_cache
+from .clustering import MAX_TEMPLATES_LISTED, get_template_miner
+from .compressed import (get_compressed_index, is_compressed, read_compressed,
+                         read_compressed_appended)
+from .encoding import accepts_encoding, compress_content, gzip_stream
+from .files import (Cursor, iter_file, make_etag, parse_range, read_appended,
+                    read_logfile)
+from .handlers import file_handlers, registry  # noqa: F401 (re-export)
+from .index import MAX_WINDOW_LINES, get_line_index
+from .ingest import (RATE_LIMIT_WINDOW, BatchTooLarge, consume_rate_limit,
+                     emit_batch, parse_batch)
+from .jsonlog import parse_json_header, render_lines, stream_json_query_results
+from .metrics import count_read, instrument, metrics, timed
+from .query import (MAX_QUERY_MATCHES, LogQuery, parse_timestamp,
+                    stream_query_results)
+from .records import (SEEK_RECORDS_AFTER, SEEK_RECORDS_BEFORE,
+                      get_record_index, get_record_window, parse_header,
+                      seek_timestamp, stream_record_results)
+from .search import search_logfiles
+from .summary import MAX_SUMMARY_ERRORS, get_summary
+from .watch import stream_events
 
 BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED = HttpResponseBadRequest("400 Bad Request: no handler name provided")
+BAD_REQUEST_INVALID_CURSOR = HttpResponseBadRequest("400 Bad Request: invalid cursor provided")
+BAD_REQUEST_INVALID_WINDOW = HttpResponseBadRequest("400 Bad Request: invalid line numbers provided")
+BAD_REQUEST_INVALID_LOG_ENTRIES = HttpResponseBadRequest("400 Bad Request: invalid log entries provided")
+BAD_REQUEST_INVALID_TIMESTAMP = HttpResponseBadRequest("400 Bad Request: invalid timestamp provided")
+
+
+def resolve_logfile(request) -> str:
+    """
+    Returns the path of the log file associated with the handler_name defined in the query string
+    or, if `backup` is given, of the rotated backup with that file name.
+    Raises a KeyError if there is no such log file.
+    """
+    return registry.get(request.GET['handler_name']).resolve(request.GET.get('backup'))
+
+
+def stat_logfile(request) -> os.stat_result | None:
+    """
+    Returns the stat of the log file (or backup) requested in the query string
+    or None if there is no such log file. The result is stored on the request
+    so that the validators of a conditional request share a single stat call.
+    """
+    if not hasattr(request, '_log_lens_stat'):
+        try:
+            with timed("stat"):
+                request._log_lens_stat = os.stat(resolve_logfile(request))
+        except (KeyError, OSError):
+            request._log_lens_stat = None
+    return request._log_lens_stat
+
 
-file_handlers = {
-    "logging.FileHandler",
-    "logging.handlers.RotatingFileHandler",
-    "logging.handlers.TimedRotatingFileHandler",
-    "logging.handlers.WatchedFileHandler",
-}
+def logfile_etag(request) -> str | None:
+    stat = stat_logfile(request)
+    return make_etag(stat) if stat else None
 
-client_logger = logging.getLogger("django_log_lens.client")
 
-log_level_functional_map = {
-    "DEBUG": client_logger.debug,
-    "INFO": client_logger.info,
-    "WARNING": client_logger.warning,
-    "ERROR": client_logger.error,
-    "CRITICAL": client_logger.critical,
-    "ASSERTION FAILED (CRITICAL)": client_logger.critical
-}
+def logfile_last_modified(request) -> datetime | None:
+    stat = stat_logfile(request)
+    return datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc) if stat else None
 
 
+conditional_logfile = condition(etag_func=logfile_etag, last_modified_func=logfile_last_modified)
+
+
+def logfile_response(request, text: str | Iterator[bytes], **metadata) -> HttpResponse | StreamingHttpResponse:
+    """
+    Returns the log text along with its metadata (timestamp, cursor, ...) as JSON object or, if requested
+    with `format=text`, as plain text body with the JSON encoded metadata in `X-Log-Lens-*` headers,
+    which spares escaping the text and allows streaming it.
+    """
+    if request.GET.get('format') != 'text':
+        if not isinstance(text, str):
+            text = b"".join(text).decode('utf-8', errors='replace')
+        with timed("encode"):
+            return JsonResponse({"text": text, **metadata})
+    if isinstance(text, str):
+        response = HttpResponse(text, content_type='text/plain; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(text, content_type='text/plain; charset=utf-8')
+    for key, value in metadata.items():
+        response[f"X-Log-Lens-{key.replace('_', '-').title()}"] = value if isinstance(value, str) else json.dumps(value)
+    return response
+
+
+@instrument
 @require_http_methods(["POST"])
 def logout_view(request):
     if request.user.is_authenticated:
@@ -38,6 +115,7 @@ def logout_view(request):
     return redirect('log-lens:login')
 
 
+@instrument
 @require_http_methods(["GET", "POST"])
 def login_view(request):
     if request.method == 'POST':
@@ -55,10 +133,13 @@ def login_view(request):
         return render(request, 'log-lens-login.html')
 
 
+@instrument
 @require_http_methods(["POST"])
 def log_js_error(request):
     """
-    Logs the error message and stack trace provided by the POST request.
+    Logs the batch of messages provided by the POST request, either as a JSON body
+    or as the `logs` field of a form as sent by `navigator.sendBeacon`.
+    Batches are limited in size and the number of entries per minute is limited per session.
     Only for development purposes, don't use in production.
     """
     try:
@@ -67,77 +148,515 @@ def log_js_error(request):
         allow_js_logging = False
     if not allow_js_logging:
         return HttpResponseForbidden("Client logger is disabled.")
-    log = json.loads(request.body.decode('utf-8'))
-    log_message = log['log_message']
-    log_level = log['severity']
-    log_level_functional_map.get(log_level, client_logger.error)(log_message)
+    if request.content_type in ('multipart/form-data', 'application/x-www-form-urlencoded'):
+        payload = request.POST.get('logs', '')
+    else:
+        payload = request.body
+    try:
+        entries = parse_batch(payload)
+    except BatchTooLarge as e:
+        metrics.count_client_logs("too_large")
+        return HttpResponse(f"413 Payload Too Large: {e}", status=413)
+    except ValueError:
+        metrics.count_client_logs("invalid")
+        return BAD_REQUEST_INVALID_LOG_ENTRIES
+    client_key = request.session.session_key or request.META.get('REMOTE_ADDR', '')
+    if consume_rate_limit(client_key, len(entries)):
+        metrics.count_client_logs("rate_limited")
+        response = HttpResponse("429 Too Many Requests: client log rate limit exceeded", status=429)
+        response['Retry-After'] = str(RATE_LIMIT_WINDOW)
+        return response
+    emit_batch(entries)
+    metrics.count_client_logs("accepted", len(entries))
     return HttpResponse("Log message processed.")
 
 
+@instrument
+@async_view
 @require_http_methods(["GET"])
 @user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
-def download_logfile(request) -> HttpResponse:
+@cache_control(private=True, no_cache=True)
+@conditional_logfile
+def download_logfile(request) -> HttpResponse | StreamingHttpResponse:
     """
     Allows downloading the log file associated with the handler_name
     defined in the query string.
+    The file is streamed in chunks, single byte ranges are supported so that
+    interrupted downloads can be resumed. Compressed backups are passed through as they are.
+    Supports conditional requests, an unchanged file is answered with 304 Not Modified.
     A logged in superuser is required.
     """
     handler_name = request.GET.get('handler_name', None)
     if handler_name is None:
         return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
     try:
-        filename = settings.LOGGING['handlers'][handler_name]['filename']
-        with open(filename, 'r') as f:
-            response = HttpResponse(f.read(), content_type='text/plain')
-            response['Content-Disposition'] = f'attachment; filename="{os.path.basename(filename)}"'
-            return response
+        filename = resolve_logfile(request)
+        size = os.path.getsize(filename)
     except (FileNotFoundError, KeyError):
         return HttpResponse("No logs available")
+    try:
+        byte_range = parse_range(request.headers.get('Range'), size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    content_type = 'text/plain'
+    if is_compressed(filename):
+        content_type = 'application/gzip' if filename.endswith('.gz') else 'application/zstd'
+    if byte_range is not None:
+        first, last = byte_range
+        response = StreamingHttpResponse(iter_file(filename, first, last - first + 1),
+                                         status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {first}-{last}/{size}'
+        response['Content-Length'] = str(last - first + 1)
+    elif is_compressed(filename):
+        response = FileResponse(open(filename, 'rb'), content_type=content_type)
+    elif getattr(settings, 'LOG_LENS_GZIP_DOWNLOADS', False) and accepts_encoding(request, 'gzip'):
+        response = StreamingHttpResponse(gzip_stream(iter_file(filename)), content_type='text/plain')
+        response['Content-Encoding'] = 'gzip'
+        response['ETag'] = f"W/{logfile_etag(request)}"  # the compressed bytes may differ between requests
+        patch_vary_headers(response, ('Accept-Encoding',))
+    else:
+        # FileResponse streams the file in chunks and uses the server's file wrapper (e.g. sendfile) if available
+        response = FileResponse(open(filename, 'rb'), content_type=content_type)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'attachment; filename="{os.path.basename(filename)}"'
+    return response
 
 
+@instrument
+@async_view
 @require_http_methods(["GET"])
 @user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
-def request_logfile(request) -> HttpResponse:
+@compress_content
+@cache_control(private=True, no_cache=True)
+@conditional_logfile
+def request_logfile(request) -> HttpResponse | StreamingHttpResponse:
     """
     Returns the contents of the log file associated with the handler_name
-    defined in the query string.
+    defined in the query string, as JSON or, with `format=text`, streamed as plain text.
+    If max_lines is given and the log file has more lines, no text is returned
+    but `too_large` is set so that the client can request windows of lines instead.
+    JSON-lines log files are rendered like LOG_FORMAT records.
+    The response is compressed with brotli or gzip if the client accepts it.
+    Supports conditional requests, an unchanged file is answered with 304 Not Modified.
     A logged in superuser is required.
     """
     handler_name = request.GET.get('handler_name', None)
     if handler_name is None:
         return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
     try:
-        filename = settings.LOGGING['handlers'][handler_name]['filename']
-        with open(filename, 'r') as f:
-            ti_m = os.path.getmtime(filename)
-            return JsonResponse({"text": f.read(), "timestamp": f"{ti_m}"})
+        max_lines = int(request.GET['max_lines']) if request.GET.get('max_lines') else None
+    except ValueError:
+        return BAD_REQUEST_INVALID_WINDOW
+    try:
+        info = registry.get(handler_name)
+        filename = info.resolve(request.GET.get('backup'))
+        if max_lines is not None:
+            line_index = get_line_index(filename)
+            if line_index.line_count > max_lines:
+                return logfile_response(request, "", timestamp=f"{os.path.getmtime(filename)}", cursor=None,
+                                        too_large=True, line_count=line_index.line_count)
+        if request.GET.get('format') == 'text' and not is_compressed(filename) and not info.json_lines:
+            stat = os.stat(filename)
+            return logfile_response(request, iter_file(filename, 0, stat.st_size), timestamp=f"{stat.st_mtime}",
+                                    cursor=Cursor(stat.st_size, stat.st_ino, stat.st_size).as_dict())
+        logfile = read_compressed(filename) if is_compressed(filename) else read_logfile(filename)
+        data = render_lines(logfile.data) if info.json_lines else logfile.data
+        return logfile_response(request, data.decode('utf-8', errors='replace'),
+                                timestamp=f"{logfile.mtime}",
+                                cursor=logfile.cursor.as_dict())
     except FileNotFoundError:
-        return JsonResponse({"text": f"Log file {filename} not found", "timestamp": "0"})
+        return logfile_response(request, f"Log file {filename} not found", timestamp="0")
+    except KeyError:
+        return logfile_response(request, "Improperly configured.\nPlease check the LOGGING configuration"
+                                " in your settings.py", timestamp="0")
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@compress_content
+def request_logfile_lines(request) -> HttpResponse:
+    """
+    Returns the lines start to end (one-based, both inclusive) of the log file
+    associated with the handler_name defined in the query string.
+    If start is omitted, the last lines of the log file are returned.
+    With `records=true`, the window is widened to whole records so that tracebacks are not cut.
+    At most MAX_WINDOW_LINES lines are returned per request. Supports `format=text` like request_logfile.
+    A logged in superuser is required.
+    """
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
+    try:
+        start = int(request.GET['start']) if request.GET.get('start') else None
+        end = int(request.GET['end']) if request.GET.get('end') else None
+    except ValueError:
+        return BAD_REQUEST_INVALID_WINDOW
+    records = request.GET.get('records', '').lower() in ('1', 'true')
+    stat = stat_logfile(request)
+    try:
+        info = registry.get(handler_name)
+        filename = info.resolve(request.GET.get('backup'))
+        if stat is None:
+            raise FileNotFoundError(filename)
+        identities = (get_file_identity(filename, stat),)
+        key = ("lines", start, end, records)
+        window = result_cache.get(identities, key)
+        if window is None:
+            window = read_lines_window(filename, info.json_lines, start, end, records)
+            result_cache.put(identities, key, window, len(window[0]))
+    except (FileNotFoundError, KeyError):
+        return logfile_response(request, "", timestamp="0", cursor=None, start=1, end=0, total=0)
+    text, cursor, start, end, total = window
+    return logfile_response(request, text, timestamp=f"{stat.st_mtime}", cursor=cursor,
+                            start=start, end=end, total=total)
+
+
+def read_lines_window(filename: str, json_lines: bool, start: int | None, end: int | None,
+                      records: bool) -> tuple[str, dict | None, int, int, int]:
+    """
+    Returns the text of the lines start to end of the log file as requested from request_logfile_lines,
+    along with the cursor pointing to its end, the actual start and end lines and the number of lines.
+    """
+    line_index = get_line_index(filename)
+    total = line_index.line_count
+    if start is None:
+        end = total if end is None else end
+        start = end - MAX_WINDOW_LINES + 1
+    elif end is None:
+        end = start + MAX_WINDOW_LINES - 1
+    start = max(start, 1)
+    end = min(end, total, start + MAX_WINDOW_LINES - 1)
+    if records and end >= start and not json_lines:
+        start, end = get_record_index(filename).align_window(start, end, MAX_WINDOW_LINES)
+        end = min(end, total)
+    if end < start:
+        data, cursor = b"", None
+    else:
+        data, cursor = line_index.read_lines(start - 1, end - 1)
+    if json_lines:
+        data = render_lines(data)
+    return (data.decode('utf-8', errors='replace'), cursor.as_dict() if cursor else None,
+            start, max(end, start - 1), total)
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@compress_content
+def request_logfile_seek(request) -> HttpResponse:
+    """
+    Returns the window of records around the first record at or after the timestamp (ISO 8601) of the log file
+    associated with the handler_name defined in the query string: up to `before` records preceding it
+    and up to `after` records starting with it. The record is found by binary searching the byte offsets
+    of the file rather than reading it. `offset` is the byte offset of the record, `start` and `end` those of
+    the window. With `lines=true`, the line numbers of the record and the window are returned as well,
+    which requires the line index of the file. Supports `format=text` like request_logfile.
+    A logged in superuser is required.
+    """
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
+    try:
+        key = parse_timestamp(request.GET['timestamp'])
+    except (KeyError, ValueError):
+        return BAD_REQUEST_INVALID_TIMESTAMP
+    try:
+        before = int(request.GET.get('before', SEEK_RECORDS_BEFORE))
+        after = int(request.GET.get('after', SEEK_RECORDS_AFTER))
+    except ValueError:
+        return BAD_REQUEST_INVALID_WINDOW
+    if before < 0 or after < 0:
+        return BAD_REQUEST_INVALID_WINDOW
+    try:
+        info = registry.get(handler_name)
+        filename = info.resolve(request.GET.get('backup'))
+        index = get_compressed_index(filename) if is_compressed(filename) else None
+        size = index.size if index else os.path.getsize(filename)
+        parse = parse_json_header if info.json_lines else parse_header
+        with (index.open() if index else open(filename, 'rb')) as f:
+            with timed("seek"):
+                offset, found = seek_timestamp(f, size, key, parse)
+                start, end = get_record_window(f, offset, size, before, after, parse)
+            with timed("read"):
+                f.seek(start)
+                data = f.read(end - start)
+                count_read(len(data))
+    except (FileNotFoundError, KeyError):
+        return logfile_response(request, "", timestamp="0", found=False, offset=0, record_timestamp=None,
+                                start=0, end=0, line=None, first_line=None)
+    if info.json_lines:
+        data = render_lines(data)
+    line = first_line = None
+    if request.GET.get('lines', '').lower() in ('1', 'true'):
+        line_offsets = get_line_index(filename).offsets
+        line, first_line = bisect_left(line_offsets, offset) + 1, bisect_left(line_offsets, start) + 1
+    return logfile_response(request, data.decode('utf-8', errors='replace'),
+                            timestamp=f"{os.path.getmtime(filename)}", found=found is not None, offset=offset,
+                            record_timestamp=found.decode() if found else None,
+                            start=start, end=end, line=line, first_line=first_line)
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@compress_content
+@cache_control(private=True, no_cache=True)
+@conditional_logfile
+def request_logfile_summary(request) -> HttpResponse:
+    """
+    Returns the number of records per level and per minute of the log file associated with the handler_name
+    defined in the query string, along with the line numbers and byte offsets of its error records
+    (at most max_errors, the most recent ones). The summary is kept up to date incrementally,
+    so it is cheap to request even for log files too large to be loaded in full.
+    Supports conditional requests, an unchanged file is answered with 304 Not Modified.
+    A logged in superuser is required.
+    """
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
+    try:
+        max_errors = int(request.GET.get('max_errors', MAX_SUMMARY_ERRORS))
+    except ValueError:
+        return HttpResponseBadRequest("400 Bad Request: invalid max_errors provided")
+    try:
+        info = registry.get(handler_name)
+        filename = info.resolve(request.GET.get('backup'))
+        summary = get_summary(filename, info.json_lines)
+    except (FileNotFoundError, KeyError):
+        return JsonResponse({"line_count": 0, "counts": {}, "errors": 0, "warnings": 0, "minutes": {},
+                             "error_records": [], "error_records_truncated": False, "timestamp": "0"})
+    return JsonResponse({**summary.as_dict(max(0, max_errors)), "timestamp": f"{os.path.getmtime(filename)}"})
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@compress_content
+@cache_control(private=True, no_cache=True)
+@conditional_logfile
+def request_logfile_templates(request) -> HttpResponse:
+    """
+    Returns the most frequent message templates (at most limit) of the log file associated with the handler_name
+    defined in the query string, i.e. the messages of its records with variable parts such as ids and numbers
+    replaced by `<*>`, along with their number of records, first and last timestamps and the line numbers
+    and byte offsets of their first records. The templates are mined incrementally as the file grows,
+    so they are cheap to request even for log files too large to be loaded in full.
+    Supports conditional requests, an unchanged file is answered with 304 Not Modified.
+    A logged in superuser is required.
+    """
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
+    try:
+        limit = int(request.GET.get('limit', MAX_TEMPLATES_LISTED))
+    except ValueError:
+        return HttpResponseBadRequest("400 Bad Request: invalid limit provided")
+    try:
+        info = registry.get(handler_name)
+        filename = info.resolve(request.GET.get('backup'))
+        miner = get_template_miner(filename, info.json_lines)
+    except (FileNotFoundError, KeyError):
+        return JsonResponse({"line_count": 0, "record_count": 0, "template_count": 0, "unclustered": 0,
+                             "templates": [], "templates_truncated": False, "timestamp": "0"})
+    return JsonResponse({**miner.as_dict(max(0, limit)), "timestamp": f"{os.path.getmtime(filename)}"})
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@compress_content
+def request_logfile_query(request) -> HttpResponse | StreamingHttpResponse:
+    """
+    Streams the lines of the log file associated with the handler_name that match the query
+    defined in the query string as JSON lines, each with its original line number.
+    Supported filters are the minimum level, a time range (since, until), the logger name
+    and a regular expression (pattern, ignore_case). At most `limit` lines are returned.
+    The logger name can only be filtered by if the handler's log format contains `%(name)s` or for JSON lines.
+    With `records=true`, whole records are returned instead of lines, along with their offset, length,
+    level and timestamp, and the pattern matches if any line of the record matches.
+    A logged in superuser is required.
+    """
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
+    try:
+        query = LogQuery.from_query_dict(request.GET)
+        limit = int(request.GET.get('limit', MAX_QUERY_MATCHES))
+    except ValueError as e:
+        return HttpResponseBadRequest(f"400 Bad Request: {e}")
+    try:
+        info = registry.get(handler_name)
+        filename = info.resolve(request.GET.get('backup'))
     except KeyError:
-        return JsonResponse(
-            {"text": "Improperly configured.\nPlease check the LOGGING configuration"
-             " in your settings.py", "timestamp": "0"})
+        return HttpResponseBadRequest("400 Bad Request: invalid handler name provided")
+    if not info.json_lines:
+        try:
+            query = query.for_format(info.log_format)
+        except ValueError as e:
+            return HttpResponseBadRequest(f"400 Bad Request: {e}")
+    if info.json_lines:
+        kind, stream_results = "json", stream_json_query_results
+    elif request.GET.get('records', '').lower() in ('1', 'true'):
+        kind, stream_results = "records", stream_record_results
+    else:
+        kind, stream_results = "lines", stream_query_results
+    try:
+        identities = (get_file_identity(filename),)
+    except OSError:
+        return StreamingHttpResponse(stream_results(filename, query, limit), content_type='application/x-ndjson')
+    key = ("query", kind, query.cache_key, limit)
+    cached = result_cache.get(identities, key)
+    if cached is not None:
+        return StreamingHttpResponse([cached], content_type='application/x-ndjson')
+    results = cache_chunks(identities, key, stream_results(filename, query, limit))
+    return StreamingHttpResponse(results, content_type='application/x-ndjson')
 
 
+@instrument
+@async_view
 @require_http_methods(["GET"])
 @user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@compress_content
+def search_logfiles_view(request) -> HttpResponse:
+    """
+    Searches the log files of all file handlers - or of the handlers given as comma-separated
+    handler_name - and their rotated backups (unless `rotated=false`) in parallel.
+    Accepts the same filters as request_logfile_query and returns the matches merged by timestamp.
+    When filtering by logger name, handlers whose log format has no `%(name)s` are not searched.
+    A logged in superuser is required.
+    """
+    try:
+        query = LogQuery.from_query_dict(request.GET)
+        limit = int(request.GET.get('limit', MAX_QUERY_MATCHES))
+    except ValueError as e:
+        return HttpResponseBadRequest(f"400 Bad Request: {e}")
+    handlers = list(registry.handlers.values())
+    if request.GET.get('handler_name'):
+        handler_names = request.GET['handler_name'].split(',')
+        handlers = [info for info in handlers if info.name in handler_names]
+    include_rotated = request.GET.get('rotated', 'true').lower() not in ('0', 'false')
+    with timed("search"):
+        result = search_logfiles(handlers, query, limit, include_rotated)
+    return JsonResponse({"matches": [match._asdict() for match in result.matches],
+                         "truncated": result.truncated,
+                         "cancelled": result.cancelled,
+                         "files": result.paths})
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@compress_content
+def request_logfile_tail(request) -> HttpResponse:
+    """
+    Returns the lines appended to the log file associated with the handler_name
+    since the cursor (offset and inode) defined in the query string,
+    along with the cursor to be used for the next request.
+    If the log file has been truncated or rotated in the meantime,
+    `resync` is set and the client should fetch the whole log file again.
+    Supports `format=text` like request_logfile.
+    A logged in superuser is required.
+    """
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
+    try:
+        offset = int(request.GET.get('offset', 0))
+        inode = int(request.GET['inode']) if request.GET.get('inode') else None
+    except ValueError:
+        return BAD_REQUEST_INVALID_CURSOR
+    if offset < 0:
+        return BAD_REQUEST_INVALID_CURSOR
+    try:
+        info = registry.get(handler_name)
+        filename = info.resolve(request.GET.get('backup'))
+        if is_compressed(filename):
+            tail = read_compressed_appended(filename, offset, inode)
+        else:
+            tail = read_appended(filename, offset, inode)
+        data = render_lines(tail.data) if info.json_lines else tail.data
+        return logfile_response(request, data.decode('utf-8', errors='replace'),
+                                timestamp=f"{tail.mtime}",
+                                cursor=tail.cursor.as_dict(),
+                                resync=tail.resync)
+    except (FileNotFoundError, KeyError):
+        return logfile_response(request, "", timestamp="0", cursor=None, resync=True)
+
+
+@instrument
+async def stream_logfile(request) -> HttpResponse | StreamingHttpResponse:
+    """
+    Pushes the lines appended to the log file associated with the handler_name as server-sent events,
+    starting at the cursor (offset and inode) defined in the query string or the Last-Event-ID header.
+    All viewers of the same log file share a single watcher.
+    Requires an ASGI server - under WSGI, 204 No Content is returned so that the client falls back to polling.
+    A logged in superuser is required.
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    if not await sync_to_async(lambda: request.user.is_superuser)():
+        login_url = resolve_url('log-lens:login')
+        return redirect(f"{login_url}?{urlencode({REDIRECT_FIELD_NAME: request.get_full_path()})}")
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
+    try:
+        last_event_id = request.headers.get('Last-Event-ID')
+        if last_event_id:
+            offset, inode = (int(value) for value in last_event_id.split(':'))
+        else:
+            offset = int(request.GET.get('offset', 0))
+            inode = int(request.GET['inode']) if request.GET.get('inode') else None
+    except ValueError:
+        return BAD_REQUEST_INVALID_CURSOR
+    try:
+        info = registry.get(handler_name)
+    except KeyError:
+        return HttpResponseBadRequest("400 Bad Request: invalid handler name provided")
+    filename = info.path
+    if not isinstance(request, ASGIRequest) or not os.path.exists(filename) or request.GET.get('backup'):
+        return HttpResponse(status=204)
+    events = stream_events(filename, offset, inode, render_lines if info.json_lines else None)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+@cache_control(private=True, no_cache=True)
+@conditional_logfile
 def request_logfile_timestamp(request) -> HttpResponse:
     """
     Returns the timestamp of the logfile associated with the handler_name
     defined in the query string.
+    Supports conditional requests, an unchanged file is answered with 304 Not Modified.
     A logged in superuser is required.
     """
     handler_name = request.GET.get('handler_name', None)
     if handler_name is None:
         return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
     try:
-        filename = settings.LOGGING['handlers'][handler_name]['filename']
-        ti_m = os.path.getmtime(filename)
+        ti_m = os.path.getmtime(resolve_logfile(request))
         return JsonResponse({"timestamp": f"{ti_m}"})
     except (FileNotFoundError, KeyError):
         return JsonResponse({"timestamp": "0"})
 
 
+@instrument
+@async_view
 @require_http_methods(["DELETE"])
 @user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
 def clear_logfile(request) -> HttpResponse:
@@ -148,37 +667,73 @@ def clear_logfile(request) -> HttpResponse:
     handler_name = request.GET.get('handler_name', None)
     if handler_name is None:
         return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
-    filename = settings.LOGGING.get('handlers', {}).get(handler_name, {}).get('filename')
-    if filename is None:
+    try:
+        filename = registry.get_filename(handler_name)
+    except KeyError:
         return HttpResponseBadRequest("400 Bad Request: invalid handler name provided")
     try:
         with open(filename, 'w') as f:
             f.write("")
+        result_cache.invalidate(filename)
         return HttpResponse(f"Log file {filename} cleared")
     except FileNotFoundError:
         return HttpResponse("No logs available")
 
 
+@instrument
+@require_http_methods(["GET"])
+def request_metrics(request) -> HttpResponse:
+    """
+    Returns the request counts, latencies, bytes read and served and index cache hits of the Log Lens views
+    in the Prometheus text format.
+    A logged in superuser is required unless the token set as LOG_LENS_METRICS_TOKEN
+    is passed as `Authorization: Bearer <token>`, e.g. by Prometheus.
+    """
+    token = getattr(settings, 'LOG_LENS_METRICS_TOKEN', None)
+    authorization = request.headers.get('Authorization', '').encode()
+    authorized = bool(token) and hmac.compare_digest(authorization, f"Bearer {token}".encode())
+    if not authorized and not request.user.is_superuser:
+        login_url = resolve_url('log-lens:login')
+        return redirect(f"{login_url}?{urlencode({REDIRECT_FIELD_NAME: request.get_full_path()})}")
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@instrument
 @require_http_methods(["GET"])
 @user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
 def request_logfile_paths(request) -> JsonResponse | HttpResponseBadRequest:
     """
     Returns a JSON object containing the paths of all log files
-    associated with any file handlers defined in the LOGGING configuration.
+    associated with any file handlers defined in the LOGGING configuration
+    or attached to a logger at runtime.
+    A logged in superuser is required.
+    """
+    return JsonResponse(registry.get_paths())
+
+
+@instrument
+@async_view
+@require_http_methods(["GET"])
+@user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
+def request_logfile_backups(request) -> HttpResponse:
+    """
+    Returns the rotated backups of the log file associated with the handler_name defined in the query string.
+    Pass the name of a backup as `backup` to the other endpoints to read it, compressed backups included.
     A logged in superuser is required.
     """
+    handler_name = request.GET.get('handler_name', None)
+    if handler_name is None:
+        return BAD_REQUEST_HANDLER_NAME_NOT_PROVIDED
     try:
-        paths = {}
-        for handler_name in settings.LOGGING['handlers']:
-            has_filename = 'filename' in settings.LOGGING['handlers'][handler_name]
-            is_file_handler = settings.LOGGING['handlers'][handler_name]['class'] in file_handlers
-            if has_filename and is_file_handler:
-                paths[handler_name] = settings.LOGGING['handlers'][handler_name]['filename']
-        return JsonResponse(paths)
+        backups = registry.get(handler_name).find_backups()
     except KeyError:
-        return JsonResponse({})
+        return HttpResponseBadRequest("400 Bad Request: invalid handler name provided")
+    return JsonResponse({"backups": [{"name": os.path.basename(path),
+                                      "size": os.path.getsize(path),
+                                      "compressed": is_compressed(path)} for path in backups]})
 
 
+@instrument
 @require_http_methods(["GET"])
 @user_passes_test(lambda user: user.is_superuser, login_url='log-lens:login')
 def log_lens_view(request) -> HttpResponse:
@@ -0,0 +1,236 @@
+import asyncio
+import ctypes
+import json
+import logging
+import os
+import sys
+from typing import AsyncIterator, Callable
+
+from django.conf import settings
+
+from .aio import run_blocking
+from .files import Cursor, Tail, end_cursor, read_appended
+
+DEFAULT_WATCH_INTERVAL = 1.0
+KEEP_ALIVE_INTERVAL = 15.0
+SUBSCRIBER_QUEUE_SIZE = 100
+
+watch_logger = logging.getLogger("django_log_lens.watch")
+
+IN_MODIFY = 0x002
+IN_ATTRIB = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+INOTIFY_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def open_inotify(directory: str) -> int | None:
+    """
+    Returns a non-blocking inotify file descriptor watching the given directory
+    or None if inotify is not available on this platform.
+    The directory rather than the file is watched so that rotations are noticed as well.
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher:
+    """
+    Watches a log file and publishes the appended data to all subscribers.
+    Changes are detected with inotify where available, falling back to polling the file's stat.
+    A single watcher is shared by all viewers of the same file within an event loop.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.subscribers: set[asyncio.Queue] = set()
+        self.interval = getattr(settings, 'LOG_LENS_WATCH_INTERVAL', DEFAULT_WATCH_INTERVAL)
+        self.changed = asyncio.Event()
+        self.inotify_fd: int | None = None
+        self.task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        self.inotify_fd = open_inotify(os.path.dirname(os.path.abspath(self.filename)))
+        if self.inotify_fd is not None:
+            loop.add_reader(self.inotify_fd, self._on_inotify_event)
+        self.task = loop.create_task(self._run())
+
+    def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+        if self.inotify_fd is not None:
+            asyncio.get_running_loop().remove_reader(self.inotify_fd)
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+    def _on_inotify_event(self) -> None:
+        try:
+            while os.read(self.inotify_fd, 4096):  # type: ignore
+                pass
+        except BlockingIOError:
+            pass
+        self.changed.set()
+
+    def _stat(self) -> tuple[int, int, int] | None:
+        try:
+            stat = os.stat(self.filename)
+            return stat.st_ino, stat.st_size, stat.st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    async def _wait_for_change(self) -> None:
+        # with inotify, polling is only a safety net for missed events
+        timeout = self.interval * 10 if self.inotify_fd is not None else self.interval
+        try:
+            await asyncio.wait_for(self.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self.changed.clear()
+
+    async def _run(self) -> None:
+        try:
+            await self._watch()
+        except Exception:
+            watch_logger.exception("Watching %s failed", self.filename)
+            # the subscribers read the file themselves after a resync, a new watcher is started for them
+            self.publish(Tail(b"", Cursor(0, 0, 0), True, 0))
+
+    async def _watch(self) -> None:
+        last_stat = self._stat()
+        cursor = await self._end_cursor()
+        while True:
+            await self._wait_for_change()
+            current_stat = self._stat()
+            if current_stat is None or current_stat == last_stat:
+                continue
+            last_stat = current_stat
+            while True:
+                try:
+                    tail = await run_blocking(read_appended, self.filename, cursor.offset, cursor.inode)
+                except FileNotFoundError:
+                    break
+                self.publish(tail)
+                if tail.resync:
+                    cursor = await self._end_cursor()
+                    break
+                cursor = tail.cursor
+                if not tail.data or cursor.offset >= cursor.size:
+                    break
+
+    async def _end_cursor(self) -> Cursor:
+        # the file may end with an incomplete line, so start behind the last complete one
+        try:
+            return await run_blocking(end_cursor, self.filename)
+        except FileNotFoundError:
+            return Cursor(0, 0, 0)
+
+    @property
+    def alive(self) -> bool:
+        return self.task is not None and not self.task.done()
+
+    def publish(self, tail: Tail) -> None:
+        for queue in self.subscribers:
+            try:
+                queue.put_nowait(tail)
+            except asyncio.QueueFull:
+                pass  # the subscriber will notice the gap and read the missed data itself
+
+
+_watchers: dict[tuple[int, str], FileWatcher] = {}
+
+
+def subscribe(filename: str) -> tuple[FileWatcher, asyncio.Queue]:
+    key = (id(asyncio.get_running_loop()), filename)
+    watcher = _watchers.get(key)
+    if watcher is None or not watcher.alive:
+        if watcher is not None:
+            watcher.stop()
+        watcher = _watchers[key] = FileWatcher(filename)
+        watcher.start()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    watcher.subscribers.add(queue)
+    return watcher, queue
+
+
+def unsubscribe(watcher: FileWatcher, queue: asyncio.Queue) -> None:
+    watcher.subscribers.discard(queue)
+    if not watcher.subscribers:
+        watcher.stop()
+        key = (id(asyncio.get_running_loop()), watcher.filename)
+        if _watchers.get(key) is watcher:
+            del _watchers[key]
+
+
+def format_event(event: str, tail: Tail | None = None, render: Callable[[bytes], bytes] | None = None) -> bytes:
+    """
+    Formats a server-sent event. Append events carry the cursor as event id
+    so that a reconnecting EventSource resumes where it left off.
+    The appended data is transformed with render, if given.
+    """
+    if tail is None:
+        return f"event: {event}\ndata: {{}}\n\n".encode()
+    data = json.dumps({"text": (render(tail.data) if render else tail.data).decode('utf-8', errors='replace'),
+                       "timestamp": f"{tail.mtime}",
+                       "cursor": tail.cursor.as_dict()})
+    return f"id: {tail.cursor.offset}:{tail.cursor.inode}\nevent: {event}\ndata: {data}\n\n".encode()
+
+
+async def stream_events(filename: str, offset: int, inode: int | None,
+                        render: Callable[[bytes], bytes] | None = None) -> AsyncIterator[bytes]:
+    """
+    Yields server-sent events with the lines appended to the log file after the given cursor,
+    transformed with render, if given.
+    A `resync` event is sent and the stream ends if the file has been truncated or rotated.
+    """
+    watcher, queue = subscribe(filename)
+    try:
+        while True:
+            # catch up with the file before relying on the data published by the watcher
+            tail = await run_blocking(read_appended, filename, offset, inode)
+            if tail.resync:
+                yield format_event("resync")
+                return
+            if tail.data:
+                yield format_event("append", tail, render)
+            offset, inode = tail.cursor.offset, tail.cursor.inode
+            if not tail.data or offset >= tail.cursor.size:
+                break
+        while True:
+            try:
+                tail = await asyncio.wait_for(queue.get(), KEEP_ALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                if not watcher.alive:
+                    yield format_event("resync")
+                    return
+                yield b": keep-alive\n\n"
+                continue
+            if tail.resync:
+                yield format_event("resync")
+                return
+            if tail.cursor.offset <= offset:
+                continue  # already sent while catching up
+            if tail.cursor.offset - len(tail.data) != offset:
+                tail = await run_blocking(read_appended, filename, offset, inode)
+                if tail.resync:
+                    yield format_event("resync")
+                    return
+            if tail.data:
+                yield format_event("append", tail, render)
+            offset, inode = tail.cursor.offset, tail.cursor.inode
+    finally:
+        unsubscribe(watcher, queue)
@@ -33,6 +33,7 @@ setuptools.setup(
     include_package_data=True,
     python_requires='>=3.10',
     install_requires=["Django>=4.1"],
+    extras_require={"orjson": ["orjson"], "brotli": ["brotli"]},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",